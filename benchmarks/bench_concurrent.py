@@ -0,0 +1,116 @@
+# Description: Benchmark - throughput of a map shared between threads: one global lock
+#              around hash_map_sc.HashMap vs the striped-lock ConcurrentHashMap
+#
+# Usage: python benchmarks/bench_concurrent.py [keys] [operations per run]      (default: 100000 200000)
+#
+# The map is filled with keys first, then 1, 2, 4, 8 and 16 threads each run their share of
+# operations on random existing keys:
+#   read-heavy   95% get, 5% put
+#   mixed        50% get, 25% put, 25% remove + put back
+# Throughput is total operations per second. On a regular (GIL) CPython build threads can't
+# run Python code in parallel, so expect flat numbers there and the scaling only on a
+# free-threaded build (python3.13t and later); the header line says which one is running.
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_map_sc import ConcurrentHashMap, HashMap
+
+THREADS = (1, 2, 4, 8, 16)
+
+
+class GlobalLockHashMap:
+    """
+    The baseline: every call on a HashMap wrapped in one lock
+    """
+
+    def __init__(self, capacity: int, function) -> None:
+        """Wrap a new HashMap."""
+        self._map = HashMap(capacity, function)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> object:
+        """HashMap.get under the lock."""
+        with self._lock:
+            return self._map.get(key)
+
+    def put(self, key: str, value: object) -> None:
+        """HashMap.put under the lock."""
+        with self._lock:
+            self._map.put(key, value)
+
+    def remove(self, key: str) -> None:
+        """HashMap.remove under the lock."""
+        with self._lock:
+            self._map.remove(key)
+
+
+def workload(name: str, keys: list, count: int, seed: int) -> list:
+    """
+    Returns count (operation, key) pairs for a thread
+    """
+    rng = random.Random(seed)
+    operations = []
+    for _ in range(count):
+        key = rng.choice(keys)
+        roll = rng.random()
+        if name == 'read-heavy':
+            operations.append(('get' if roll < 0.95 else 'put', key))
+        else:
+            operations.append(('get' if roll < 0.5 else 'put' if roll < 0.75 else 'remove', key))
+    return operations
+
+
+def run(m, operations: list) -> None:
+    """
+    Runs one thread's operations against the shared map
+    """
+    get, put, remove = m.get, m.put, m.remove
+    for operation, key in operations:
+        if operation == 'get':
+            get(key)
+        elif operation == 'put':
+            put(key, 1)
+        else:
+            remove(key)
+            put(key, 1)
+
+
+def throughput(cls, keys: list, name: str, threads: int, total: int) -> float:
+    """
+    Returns operations per second for threads threads sharing one map
+    """
+    m = cls(11, hash)
+    for key in keys:
+        m.put(key, 0)
+
+    work = [workload(name, keys, total // threads, seed) for seed in range(threads)]
+    workers = [threading.Thread(target=run, args=(m, operations)) for operations in work]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(map(len, work)) / (time.perf_counter() - start)
+
+
+def main(count: int, total: int) -> None:
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"{count} keys, {total} operations per run, {'GIL' if gil else 'free-threaded'} build\n")
+    keys = ['key' + str(i) for i in range(count)]
+
+    print(f"{'workload':<12}{'map':<20}" + ''.join(f"{str(t) + ' thr':>12}" for t in THREADS) + '   (ops/s)')
+    for name in ('read-heavy', 'mixed'):
+        for label, cls in (('global lock', GlobalLockHashMap), ('ConcurrentHashMap', ConcurrentHashMap)):
+            cells = ''.join(f"{throughput(cls, keys, name, t, total):>12,.0f}" for t in THREADS)
+            print(f"{name:<12}{label:<20}{cells}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
@@ -0,0 +1,66 @@
+# Description: Benchmark - DiskHashMap with a page cache much smaller than the map vs the
+#              in-memory separate chaining HashMap
+#
+# Usage: python benchmarks/bench_disk.py [keys] [cache_pages]      (default: 1000000 256)
+#
+# The same keys string -> int pairs (murmur64) are put into a hash_map_sc.HashMap and into
+# DiskHashMaps with 4 KiB pages and cache_pages cached pages (256 pages = 1 MiB, a small part of
+# the file). For each map the table shows put and random hit / miss get times; for the disk map
+# also the file size, the file pages read per get (cache misses) and one resize_table to double
+# the capacity, which rewrites the whole file with sequential I/O. The OS page cache still
+# sits under the file, so misses here are cheaper than on a cold disk.
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_sc
+from hash_map_disk import DiskHashMap
+
+
+def per_op(fn, items: list) -> float:
+    """
+    Returns the mean microseconds per call of fn over items
+    """
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main(count: int, cache_pages: int) -> None:
+    print(f"{count} keys, murmur64, {cache_pages} cached 4 KiB pages\n")
+    keys = ['key' + str(i) for i in range(count)]
+    rng = random.Random(1)
+    hits = [keys[rng.randrange(count)] for _ in range(min(count, 100_000))]
+    misses = ['missing' + str(i) for i in range(len(hits))]
+
+    print(f"{'map':<24}{'put (us)':>10}{'hit (us)':>10}{'miss (us)':>11}{'reads/get':>11}")
+    m = hash_map_sc.HashMap(11, 'murmur64')
+    put = per_op(lambda key: m.put(key, 1), keys)
+    print(f"{'sc.HashMap':<24}{put:>10.2f}{per_op(m.get, hits):>10.2f}{per_op(m.get, misses):>11.2f}{'-':>11}")
+    del m
+
+    for cache in (cache_pages, cache_pages * 16):
+        with DiskHashMap(11, 'murmur64', cache_pages=cache) as m:
+            put = per_op(lambda key: m.put(key, 1), keys)
+            before = m.get_page_stats()['cache_misses']
+            hit = per_op(m.get, hits)
+            miss = per_op(m.get, misses)
+            reads = (m.get_page_stats()['cache_misses'] - before) / (2 * len(hits))
+            print(f"{f'DiskHashMap ({cache} pages)':<24}{put:>10.2f}{hit:>10.2f}{miss:>11.2f}{reads:>11.2f}")
+
+            m.flush()
+            size = os.path.getsize(m._path) / 2 ** 20
+            start = time.perf_counter()
+            m.resize_table(m.get_capacity() * 2)
+            resize = time.perf_counter() - start
+            print(f"{'':<24}file {size:.1f} MiB, {m.get_page_stats()['pages']} pages, resize_table x2 {resize:.2f} s\n")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 256)
@@ -0,0 +1,71 @@
+# Description: Benchmark - distribution quality and throughput of the registered hash functions
+#
+# Usage: python benchmarks/bench_hash_functions.py [keys]      (default: 200000)
+#
+# For every key set and hash function it reports:
+#   Mkeys/s     hashing throughput (millions of keys per second)
+#   distinct    share of keys whose full hash is unique (1.000 = no full-hash collisions)
+#   chi2/m      chi-squared statistic of the bucket counts divided by the bucket count
+#               (about 1.0 for a uniform hash, much larger means keys pile into some buckets)
+#   max         longest bucket, for a prime table and a power of two table of about the same size
+
+import os
+import random
+import sys
+import time
+from itertools import islice, permutations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_functions import HASH_FUNCTIONS
+from primes import next_prime
+
+
+def key_sets(count: int) -> dict:
+    """
+    Returns the key sets to compare on, each with count keys
+    """
+    rng = random.Random(261)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    return {
+        'sequential': ['key' + str(i) for i in range(count)],
+        # every key is an anagram of the same 10 letters
+        'anagrams': [''.join(p) for p in islice(permutations('abcdefghij'), count)],
+        'random': [''.join(rng.choices(alphabet, k=rng.randrange(8, 17))) for _ in range(count)],
+    }
+
+
+def bucket_stats(hashes: list, capacity: int) -> tuple:
+    """
+    Returns (chi-squared / capacity, longest bucket) for the hashes spread over capacity buckets
+    """
+    counts = [0] * capacity
+    for hash in hashes:
+        counts[hash % capacity] += 1
+    expected = len(hashes) / capacity
+    chi2 = sum((count - expected) ** 2 for count in counts) / expected
+    return chi2 / capacity, max(counts)
+
+
+def main(count: int) -> None:
+    prime = next_prime(count)
+    power = 1 << (count - 1).bit_length()
+    print(f"{count} keys, prime table {prime}, power of two table {power}\n")
+    print(f"{'keys':<12}{'function':<17}{'Mkeys/s':>9}{'distinct':>10}"
+          f"{'chi2/m %':>10}{'max %':>7}{'chi2/m 2^k':>12}{'max 2^k':>9}")
+    for set_name, keys in key_sets(count).items():
+        for name, function in HASH_FUNCTIONS.items():
+            start = time.perf_counter()
+            hashes = [function(key) for key in keys]
+            elapsed = time.perf_counter() - start
+
+            distinct = len(set(hashes)) / len(hashes)
+            prime_chi2, prime_max = bucket_stats(hashes, prime)
+            power_chi2, power_max = bucket_stats(hashes, power)
+            print(f"{set_name:<12}{name:<17}{len(keys) / elapsed / 1e6:>9.2f}{distinct:>10.3f}"
+                  f"{prime_chi2:>10.2f}{prime_max:>7}{power_chi2:>12.2f}{power_max:>9}")
+        print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,96 @@
+# Description: Benchmark - startup cost of a read-only map: rebuilding it with put vs opening
+#              a file written by save() with hash_map_mmap.load_map
+#
+# Usage: python benchmarks/bench_mmap.py [keys] [lookups]      (default: 1000000 200000)
+#
+# An ArrayHashMap is filled with keys string -> int pairs (murmur64) by a put loop and by
+# put_many, which is what a process has to do at startup without a saved file. The map is then
+# saved once, and load_map opens the file: that only reads the header, so its time should not
+# depend on keys. The hit and miss columns time lookups on the rebuilt map and on the mapped
+# file; the first lookups on the file also page it in from the OS cache.
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_map_mmap import load_map
+from hash_map_oa import ArrayHashMap
+
+
+def timed(fn) -> tuple:
+    """
+    Returns (result, seconds) for a call of fn
+    """
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def put_loop(pairs: list) -> ArrayHashMap:
+    """
+    Returns a map filled one put at a time
+    """
+    m = ArrayHashMap(11, 'murmur64')
+    put = m.put
+    for key, value in pairs:
+        put(key, value)
+    return m
+
+
+def put_many(pairs: list) -> ArrayHashMap:
+    """
+    Returns a map filled with one put_many
+    """
+    m = ArrayHashMap(11, 'murmur64')
+    m.put_many(pairs)
+    return m
+
+
+def lookups(m, keys: list) -> float:
+    """
+    Returns the mean seconds per get over keys
+    """
+    get = m.get
+    start = time.perf_counter()
+    for key in keys:
+        get(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main(count: int, lookup_count: int) -> None:
+    print(f"{count} keys, {lookup_count} lookups, murmur64\n")
+    pairs = [('key' + str(i), i) for i in range(count)]
+    rng = random.Random(1)
+    hits = ['key' + str(rng.randrange(count)) for _ in range(lookup_count)]
+    misses = ['missing' + str(i) for i in range(lookup_count)]
+
+    _, loop = timed(lambda: put_loop(pairs))
+    m, batch = timed(lambda: put_many(pairs))
+
+    path = os.path.join(tempfile.mkdtemp(), 'map.hmap')
+    _, save = timed(lambda: m.save(path))
+    loaded, load = timed(lambda: load_map(path))
+    size = os.path.getsize(path) / 2 ** 20
+
+    print(f"{'startup':<24}{'seconds':>10}")
+    print(f"{'put loop':<24}{loop:>10.3f}")
+    print(f"{'put_many':<24}{batch:>10.3f}")
+    print(f"{'load_map':<24}{load:>10.6f}")
+    print(f"\nsave: {save:.3f} s, file: {size:.1f} MiB\n")
+
+    print(f"{'map':<24}{'hit (us)':>10}{'miss (us)':>11}")
+    for name, target in (('ArrayHashMap', m), ('MappedHashMap', loaded)):
+        hit = lookups(target, hits) * 1e6
+        miss = lookups(target, misses) * 1e6
+        print(f"{name:<24}{hit:>10.2f}{miss:>11.2f}")
+    loaded.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
@@ -0,0 +1,68 @@
+# Description: Benchmark - resize_table with the direct bulk rehash vs the
+#              old clear() + put() reinsertion path
+#
+# Usage: python benchmarks/bench_resize.py [size ...]      (default: 1000000 10000000)
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+
+
+def legacy_resize(m, new_capacity: int) -> None:
+    """
+    resize_table as it was before the bulk rehash: clear the map and put() every old entry back
+    """
+    oldData = m._buckets
+    m._capacity = m._round_capacity(new_capacity)
+    m.clear()
+    for i in range(oldData.length()):
+        bucket = oldData.get_at_index(i)
+        # OA buckets hold a single entry (or None), SC buckets hold a chain
+        items = [bucket] if isinstance(m, hash_map_oa.HashMap) else bucket
+        for item in items:
+            if item is not None and not getattr(item, 'is_tombstone', False):
+                m._put(item.key, item.value, item.hash)
+
+
+def build(cls, size: int):
+    """
+    Build a map of the given size, using the built-in hash so keys spread evenly
+    """
+    m = cls(11, hash)
+    for i in range(size):
+        m.put('key' + str(i), i)
+    return m
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes) -> None:
+    print(f"{'map':<18}{'entries':>12}{'capacity':>12}{'before (s)':>12}{'after (s)':>12}{'speedup':>9}")
+    for size in sizes:
+        for name, cls in (('sc.HashMap', hash_map_sc.HashMap),
+                          ('oa.HashMap', hash_map_oa.HashMap),
+                          ('oa.ArrayHashMap', hash_map_oa.ArrayHashMap)):
+            m = build(cls, size)
+            target = m.get_capacity() * 2
+            # both paths rehash the same entries into a table of the same capacity
+            after = timed(m.resize_table, target)
+            if name == 'oa.ArrayHashMap':
+                # has no put()-based path to compare against
+                print(f"{name:<18}{size:>12}{m.get_capacity():>12}{'-':>12}{after:>12.3f}{'-':>9}")
+            else:
+                before = timed(legacy_resize, m, target)
+                print(f"{name:<18}{size:>12}{m.get_capacity():>12}{before:>12.3f}{after:>12.3f}{before / after:>8.1f}x")
+            del m
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000])
@@ -0,0 +1,77 @@
+# Description: Benchmark - Robin Hood linear probing vs the default quadratic probing
+#              at load factors from 0.5 to 0.9
+#
+# Usage: python benchmarks/bench_robin_hood.py [capacity]      (default: 196613)
+#
+# Both maps get a fixed capacity and are filled to each load factor without resizing. For every
+# load it reports the time per put / hit get / miss get (in microseconds) and, from analyze(),
+# the mean, variance and maximum number of slots a hit or a miss examines.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_map_oa import ArrayHashMap, RobinHoodHashMap
+from hash_map_stats import histogram_mean
+
+LOADS = (0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+class DenseArrayHashMap(ArrayHashMap):
+    """
+    Quadratic probing map allowed to fill past the usual 0.5 load factor (for this benchmark only)
+    """
+    _max_load = 0.95
+
+
+def histogram_variance(histogram: dict) -> float:
+    """
+    Returns the variance of a {value: count} histogram
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return 0.0
+    mean = histogram_mean(histogram)
+    return sum((value - mean) ** 2 * count for value, count in histogram.items()) / total
+
+
+def per_op(fn, keys: list) -> float:
+    """
+    Returns the time fn takes per key, in microseconds
+    """
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main(capacity: int) -> None:
+    print(f"capacity {capacity}, built-in hash\n")
+    print(f"{'map':<13}{'load':>5}{'put us':>8}{'hit us':>8}{'miss us':>9}"
+          f"{'hit mean':>10}{'hit var':>9}{'hit max':>9}{'miss mean':>11}{'miss var':>10}{'miss max':>10}")
+    for load in LOADS:
+        count = int(capacity * load)
+        keys = ['key' + str(i) for i in range(count)]
+        missing = ['miss' + str(i) for i in range(count)]
+
+        for name, m in (('quadratic', DenseArrayHashMap(capacity, hash)),
+                        ('robin hood', RobinHoodHashMap(capacity, hash, max_load=0.95))):
+            start = time.perf_counter()
+            for value, key in enumerate(keys):
+                m.put(key, value)
+            put = (time.perf_counter() - start) / count * 1e6
+            hit = per_op(m.get, keys)
+            miss = per_op(m.get, missing)
+
+            report = m.analyze()
+            hits, misses = report['probe_lengths_hit'], report['probe_lengths_miss']
+            print(f"{name:<13}{load:>5}{put:>8.2f}{hit:>8.2f}{miss:>9.2f}"
+                  f"{report['average_probe_hit']:>10.2f}{histogram_variance(hits):>9.2f}{report['max_probe_hit']:>9}"
+                  f"{report['average_probe_miss']:>11.2f}{histogram_variance(misses):>10.2f}{max(misses):>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 196_613)
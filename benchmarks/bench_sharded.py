@@ -0,0 +1,73 @@
+# Description: Benchmark - time to build a map from scratch: one ArrayHashMap vs a
+#              ShardedHashMap built by 1, 2, 4, 8 and 16 worker processes
+#
+# Usage: python benchmarks/bench_sharded.py [keys] [shards]      (default: 2000000 16)
+#
+# Every run builds the same keys with murmur64. The baselines are a single ArrayHashMap filled
+# by a put loop and by put_many. ShardedHashMap.build then uses the same number of shards for
+# every process count, so only the parallelism changes; its times include starting the pool and
+# sending the chunks and finished shards between processes. Speedup is relative to put_many.
+# The header line shows how many CPUs the machine has: the build can't scale past that.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_map_oa import ArrayHashMap
+from hash_map_sharded import ShardedHashMap
+
+PROCESSES = (1, 2, 4, 8, 16)
+
+
+def timed(fn) -> tuple:
+    """
+    Returns (result, seconds) for a call of fn
+    """
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def put_loop(pairs: list) -> ArrayHashMap:
+    """
+    Returns a single map filled one put at a time
+    """
+    m = ArrayHashMap(11, 'murmur64')
+    put = m.put
+    for key, value in pairs:
+        put(key, value)
+    return m
+
+
+def put_many(pairs: list) -> ArrayHashMap:
+    """
+    Returns a single map filled with one put_many
+    """
+    m = ArrayHashMap(11, 'murmur64')
+    m.put_many(pairs)
+    return m
+
+
+def main(count: int, shards: int) -> None:
+    print(f"{count} keys, {shards} shards, murmur64, {os.cpu_count()} CPUs\n")
+    pairs = [('key' + str(i), i) for i in range(count)]
+
+    print(f"{'build':<28}{'seconds':>10}{'speedup':>10}")
+    _, loop = timed(lambda: put_loop(pairs))
+    _, batch = timed(lambda: put_many(pairs))
+    print(f"{'ArrayHashMap put loop':<28}{loop:>10.2f}{batch / loop:>10.2f}")
+    print(f"{'ArrayHashMap put_many':<28}{batch:>10.2f}{1:>10.2f}")
+
+    for processes in PROCESSES:
+        m, seconds = timed(lambda: ShardedHashMap.build(pairs, shards, processes, function='murmur64'))
+        assert m.get_size() == count
+        del m
+        label = f"sharded, {processes} process{'es' if processes > 1 else ''}"
+        print(f"{label:<28}{seconds:>10.2f}{batch / seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 16)
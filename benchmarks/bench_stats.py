@@ -0,0 +1,78 @@
+# Description: Benchmark - put / hit / miss times of every map with stats mode off and on
+#
+# Usage: python benchmarks/bench_stats.py [keys]      (default: 100000)
+#
+# Each map gets keys entries (built-in hash, so the timings show the table work rather than
+# hash_function_1), then every key is put again (an update), looked up (hits), and as many keys
+# that were never inserted are looked up (misses). Times are per operation in microseconds, the
+# best of five rounds. With stats off the walks don't count anything, so the "off" columns are
+# the plain engines; the "on" columns add the instrumented methods and the step counting.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_cuckoo
+import hash_map_oa
+import hash_map_sc
+
+MAPS = (
+    ('oa.HashMap', hash_map_oa.HashMap),
+    ('oa.ArrayHashMap', hash_map_oa.ArrayHashMap),
+    ('oa.RobinHood', hash_map_oa.RobinHoodHashMap),
+    ('oa.Swiss', hash_map_oa.SwissHashMap),
+    ('sc.HashMap', hash_map_sc.HashMap),
+    ('sc.ArrayChain', hash_map_sc.ArrayChainHashMap),
+    ('sc.Treeify', hash_map_sc.TreeifyHashMap),
+    ('cuckoo', hash_map_cuckoo.HashMap),
+)
+
+ROUNDS = 5
+
+
+def per_call(method, keys: list) -> float:
+    """
+    Returns the best time (over ROUNDS rounds) one call of method(key) takes, in microseconds
+    """
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for key in keys:
+            method(key)
+        best = min(best, time.perf_counter() - start)
+    return best / len(keys) * 1e6
+
+
+def times(m, keys: list, missing: list) -> tuple:
+    """
+    Returns the (put, hit, miss) times of the map
+    """
+    put = m.put
+    return (per_call(lambda key: put(key, 0), keys),
+            per_call(m.get, keys),
+            per_call(m.get, missing))
+
+
+def main(count: int) -> None:
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['miss' + str(i) for i in range(count)]
+
+    print(f"{count} keys, built-in hash, microseconds per operation\n")
+    print(f"{'map':<16}" + ''.join(f"{op + ' off':>10}{op + ' on':>9}" for op in ('put', 'hit', 'miss')))
+    for name, cls in MAPS:
+        m = cls(11, 'builtin')
+        for value, key in enumerate(keys):
+            m.put(key, value)
+
+        off = times(m, keys, missing)
+        m.enable_stats()
+        on = times(m, keys, missing)
+        m.disable_stats()
+        print(f"{name:<16}" + ''.join(f"{a:>10.3f}{b:>9.3f}" for a, b in zip(off, on)))
+        del m
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,78 @@
+# Description: Benchmark - hit and miss lookups with the Swiss table control bytes
+#              vs the entry-per-slot and parallel-array open addressing maps
+#
+# Usage: python benchmarks/bench_swiss.py [capacity]      (default: 393241)
+#
+# All maps get the same fixed capacity and are filled to each load factor without resizing.
+# Then every key is looked up once (hits), and as many keys that were never inserted (misses).
+# Times are per get() in microseconds; "slots" is the mean number of slots a hit / miss walks
+# from analyze() (SwissHashMap looks at them GROUP_WIDTH control bytes at a time).
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_map_oa import ArrayHashMap, HashMap, SwissHashMap
+
+LOADS = (0.25, 0.5, 0.75, 0.85)
+
+
+class DenseHashMap(HashMap):
+    """
+    Quadratic probing map allowed to fill past the usual 0.5 load factor (for this benchmark only)
+    """
+    _max_load = 0.95
+
+
+class DenseArrayHashMap(ArrayHashMap):
+    """
+    Parallel-array map allowed to fill past the usual 0.5 load factor (for this benchmark only)
+    """
+    _max_load = 0.95
+
+
+class DenseSwissHashMap(SwissHashMap):
+    """
+    Swiss table map allowed to fill past its usual 0.875 load factor (for this benchmark only)
+    """
+    _max_load = 0.95
+
+
+def per_get(m, keys: list) -> float:
+    """
+    Returns the time one get takes, in microseconds
+    """
+    get = m.get
+    start = time.perf_counter()
+    for key in keys:
+        get(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main(capacity: int) -> None:
+    print(f"capacity {capacity}, built-in hash\n")
+    print(f"{'map':<14}{'load':>6}{'hit us':>8}{'miss us':>9}{'hit slots':>11}{'miss slots':>12}")
+    for load in LOADS:
+        count = int(capacity * load)
+        keys = ['key' + str(i) for i in range(count)]
+        missing = ['miss' + str(i) for i in range(count)]
+
+        for name, cls in (('HashMap', DenseHashMap), ('ArrayHashMap', DenseArrayHashMap),
+                          ('SwissHashMap', DenseSwissHashMap)):
+            m = cls(capacity, hash)
+            for value, key in enumerate(keys):
+                m.put(key, value)
+
+            hit = per_get(m, keys)
+            miss = per_get(m, missing)
+            report = m.analyze()
+            print(f"{name:<14}{load:>6}{hit:>8.2f}{miss:>9.2f}"
+                  f"{report['average_probe_hit']:>11.2f}{report['average_probe_miss']:>12.2f}")
+            del m
+        print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 393_241)
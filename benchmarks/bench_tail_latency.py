@@ -0,0 +1,62 @@
+# Description: Benchmark - per-put latency while a map grows from empty, with the usual
+#              stop-the-world resize vs incremental resizing
+#
+# Usage: python benchmarks/bench_tail_latency.py [keys]      (default: 10000000)
+#
+# Every put is timed on its own. The percentiles show the typical put, the max shows the
+# single worst one: for the plain maps that is the put that triggered the last (biggest)
+# resize, for the incremental maps it should stay within a small multiple of the typical put.
+# The garbage collector is switched off while timing: its full collections walk every chain
+# node and would otherwise dwarf the resize pauses being compared.
+
+import gc
+import os
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+
+PERCENTILES = (50, 99, 99.9, 99.99)
+
+
+def put_latencies(m, count: int) -> array:
+    """
+    Puts count keys into the map and returns each put's time in nanoseconds
+    """
+    times = array('q', bytes(8 * count))
+    put = m.put
+    clock = time.perf_counter_ns
+    for i in range(count):
+        key = 'key' + str(i)
+        start = clock()
+        put(key, i)
+        times[i] = clock() - start
+    return times
+
+
+def main(count: int) -> None:
+    print(f"{count} puts, built-in hash, times in microseconds\n")
+    print(f"{'map':<22}" + ''.join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>12}{'total (s)':>11}")
+    for name, cls in (('sc.HashMap', hash_map_sc.HashMap),
+                      ('sc.IncrementalHashMap', hash_map_sc.IncrementalHashMap),
+                      ('oa.ArrayHashMap', hash_map_oa.ArrayHashMap),
+                      ('oa.IncrementalHashMap', hash_map_oa.IncrementalHashMap)):
+        m = cls(11, hash)
+        gc.disable()
+        times = put_latencies(m, count)
+        gc.enable()
+        total = sum(times) / 1e9
+        del m
+
+        ordered = sorted(times)
+        cells = ''.join(f"{ordered[min(count - 1, int(count * p / 100))] / 1e3:>10.2f}" for p in PERCENTILES)
+        print(f"{name:<22}{cells}{ordered[-1] / 1e3:>12.1f}{total:>11.2f}")
+        del times, ordered
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
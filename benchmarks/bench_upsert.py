@@ -0,0 +1,103 @@
+# Description: Benchmark - counting tokens with the single-walk increment() vs the
+#              contains_key + get + put pattern the old find_mode used
+#
+# Usage: python benchmarks/bench_upsert.py [tokens] [distinct]      (default: 10000000 100000)
+#
+# The input is tokens random picks out of distinct words. Each map counts every token twice:
+# once with three lookups per token (contains_key, then get, then put: three hashes and three
+# walks of the same chain / probe sequence), once with increment (one hash, one walk). The maps
+# use the built-in hash so the timings show the table work rather than hash_function_1.
+# find_mode is then timed on the same tokens in a DynamicArray, before (the three-call version,
+# copied below) and after the rewrite; both use hash_function_1, as find_mode always has.
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray
+
+
+def count_three_walks(m, tokens: list) -> None:
+    """
+    Counts the tokens the way find_mode used to
+    """
+    contains_key, get, put = m.contains_key, m.get, m.put
+    for token in tokens:
+        num = 1
+        if contains_key(token):
+            num = get(token) + 1
+        put(token, num)
+
+
+def count_increment(m, tokens: list) -> None:
+    """
+    Counts the tokens with increment
+    """
+    increment = m.increment
+    for token in tokens:
+        increment(token)
+
+
+def find_mode_three_walks(da: DynamicArray) -> tuple:
+    """
+    find_mode as it was before increment (counting part and mode scan)
+    """
+    map = hash_map_sc.HashMap()
+    for i in range(da.length()):
+        key = da.get_at_index(i)
+        num = 1
+        if map.contains_key(key):
+            num = map.get(key) + 1
+        map.put(key, num)
+
+    mode = DynamicArray()
+    max = -1
+    map_values = map.get_keys_and_values()
+    for i in range(map_values.length()):
+        item = map_values.get_at_index(i)
+        if item[1] > max:
+            mode = DynamicArray()
+            max = item[1]
+        if item[1] == max:
+            mode.append(item[0])
+    return mode, max
+
+
+def seconds(fn, *args) -> float:
+    """
+    Returns how long fn(*args) takes
+    """
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(count: int, distinct: int) -> None:
+    print(f"{count} tokens, {distinct} distinct\n")
+    rng = random.Random(1)
+    words = ['word' + str(i) for i in range(distinct)]
+    tokens = [words[rng.randrange(distinct)] for _ in range(count)]
+
+    print(f"{'map':<20}{'3 walks (s)':>13}{'increment (s)':>15}{'speedup':>9}")
+    for name, cls in (('sc.HashMap', hash_map_sc.HashMap),
+                      ('sc.ArrayChainHashMap', hash_map_sc.ArrayChainHashMap),
+                      ('oa.HashMap', hash_map_oa.HashMap),
+                      ('oa.ArrayHashMap', hash_map_oa.ArrayHashMap)):
+        before = seconds(count_three_walks, cls(11, hash), tokens)
+        after = seconds(count_increment, cls(11, hash), tokens)
+        print(f"{name:<20}{before:>13.2f}{after:>15.2f}{before / after:>9.2f}")
+
+    da = DynamicArray(tokens)
+    before = seconds(find_mode_three_walks, da)
+    after = seconds(hash_map_sc.find_mode, da)
+    print(f"{'find_mode':<20}{before:>13.2f}{after:>15.2f}{before / after:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
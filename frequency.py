@@ -0,0 +1,305 @@
+# Description: Mode (most frequent value) of inputs too big for a DynamicArray - exact
+#              streaming / parallel counting, and an approximate bounded-memory version
+
+# <-- Notes -->
+# hash_map_sc.find_mode needs every value in one DynamicArray and counts them in one pass. The
+# functions here take any iterable of tokens, a DynamicArray, or a text file (a path or an open
+# file, split on whitespace), and never hold more than one chunk of the input at a time.
+#
+# find_mode_stream is exact: its memory grows with the number of DISTINCT tokens.
+#
+#   processes = 1     every token is counted straight into one map with increment
+#   processes > 1     chunks of chunk_size tokens go to a ProcessPoolExecutor, every worker
+#                     counts its chunk into its own map and sends back the (token, count) pairs,
+#                     and those are merged into the total with increment(token, count). At most
+#                     two chunks per process are in flight, so a fast reader can't fill memory
+#
+# approximate_mode uses a fixed amount of memory however many distinct tokens there are:
+#
+#   Space-Saving  (counters)  monitors at most k tokens, each with a count and an error. A new
+#                             token takes over the counter with the smallest count m and starts
+#                             at m + 1 with error m. A monitored token's true count is between
+#                             count - error and count, and every token that occurs more than
+#                             N / k times (N = tokens seen) is guaranteed to be monitored
+#   count-min sketch          depth rows of width counters. A token adds 1 to one counter per
+#                             row, and its estimate is the smallest of its counters: never below
+#                             the true count, and at most e * N / width above it with
+#                             probability 1 - e^-depth
+#
+# A candidate's frequency is the smaller of its two upper bounds (Space-Saving count, sketch
+# estimate), and the error is how far that can be above the true count (frequency minus the
+# Space-Saving lower bound). The modes are the candidates with the highest frequency.
+
+import math
+import os
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from heapq import heappop, heappush, heapreplace
+from itertools import islice
+
+from a6_include import DynamicArray
+from hash_functions import get_hash_function, require_stable_hash
+from hash_map_helpers import to_list
+from hash_map_oa import ArrayHashMap
+from hash_map_sc import ArrayChainHashMap
+
+_MASK_32 = (1 << 32) - 1
+
+
+def read_tokens(source, encoding: str = 'utf-8'):
+    """
+    Yields the whitespace separated tokens of a text file (a path or an open file), one line at a time
+    """
+    if hasattr(source, 'read'):
+        for line in source:
+            yield from line.split()
+        return
+    with open(source, encoding=encoding) as file:
+        for line in file:
+            yield from line.split()
+
+
+def _tokens(source):
+    """
+    Returns an iterable over the tokens of a DynamicArray, a file (path or open file) or any iterable
+    """
+    # a DynamicArray is in memory already, so listing it only copies references
+    if isinstance(source, DynamicArray):
+        return to_list(source)
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+        return read_tokens(source)
+    return source
+
+
+def _chunks(tokens, size: int):
+    """
+    Yields lists of up to size tokens
+    """
+    iterator = iter(tokens)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _modes(counts) -> tuple[DynamicArray, int]:
+    """
+    Returns (the keys with the highest count, that count) for an iterable of (key, count) pairs, (empty, -1) if there are none
+    """
+    mode = DynamicArray()
+    max = -1
+    for key, count in counts:
+        # if new max is found
+        if count > max:
+            mode = DynamicArray()
+            max = count
+        if count == max:
+            mode.append(key)
+    return mode, max
+
+
+def _count_chunk(chunk: list, function) -> list:
+    """
+    Returns the (token, count) pairs of one chunk
+
+    Note: Runs in a worker process for find_mode_stream
+    """
+    counts = ArrayChainHashMap(11, function)
+    increment = counts.increment
+    for token in chunk:
+        increment(token)
+    return list(counts.items())
+
+
+def find_mode_stream(tokens,
+                     chunk_size: int = 1_000_000,
+                     processes: int = 1,
+                     function='murmur64') -> tuple[DynamicArray, int]:
+    """
+    Return a tuple containing a dynamic array of the mode value(s) of the tokens and their frequency, like find_mode
+
+    Notes: tokens can be any iterable, a DynamicArray, or a text file (path or open file). With processes > 1 chunks of chunk_size tokens are counted in a process pool and merged. Memory grows with the number of distinct tokens
+    """
+    function = get_hash_function(function)
+    if processes > 1:
+        require_stable_hash(function)
+
+    counts = ArrayChainHashMap(11, function)
+    increment = counts.increment
+    if processes <= 1:
+        for token in _tokens(tokens):
+            increment(token)
+        return _modes(counts.items())
+
+    def merge(done) -> None:
+        for future in done:
+            for token, count in future.result():
+                increment(token, count)
+
+    with ProcessPoolExecutor(processes) as pool:
+        pending = set()
+        for chunk in _chunks(_tokens(tokens), chunk_size):
+            # keep at most two chunks per process queued or running
+            if len(pending) >= 2 * processes:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                merge(done)
+            pending.add(pool.submit(_count_chunk, chunk, function))
+        merge(wait(pending).done)
+    return _modes(counts.items())
+
+
+class CountMinSketch:
+    """
+    depth x width table of counters that over-estimates token frequencies by a bounded amount
+
+    Each row picks its counter with double hashing, (h1 + row * h2) % width, from the two halves
+    of one 64 bit hash, so a token is hashed once however deep the sketch is
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, function='murmur64') -> None:
+        """
+        Initialize an empty sketch with depth rows of width counters
+        """
+        self._width = width
+        self._depth = depth
+        self._hash_function = get_hash_function(function)
+        self._rows = [array('q', bytes(8 * width)) for _ in range(depth)]
+        self._total = 0
+
+    def _indexes(self, hash: int) -> list:
+        """
+        Returns the counter index in every row for a token with this hash
+        """
+        hash1, hash2 = hash & _MASK_32, (hash >> 32) & _MASK_32 | 1
+        return [(hash1 + row * hash2) % self._width for row in range(self._depth)]
+
+    def add(self, token: str, count: int = 1) -> None:
+        """
+        Counts the token count more times
+        """
+        self._total += count
+        for row, index in zip(self._rows, self._indexes(self._hash_function(token))):
+            row[index] += count
+
+    def estimate(self, token: str) -> int:
+        """
+        Returns the estimated frequency of the token (never below the true one)
+        """
+        indexes = self._indexes(self._hash_function(token))
+        return min(row[index] for row, index in zip(self._rows, indexes))
+
+    def error_bound(self) -> float:
+        """
+        Returns how far an estimate can be above the true count (with probability 1 - e^-depth): e * tokens / width
+        """
+        return math.e * self._total / self._width
+
+    def get_total(self) -> int:
+        """
+        Return the number of tokens counted
+        """
+        return self._total
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary: the (at most) k most frequent tokens, each with a count and its maximum over-estimate
+
+    The counters live in an ArrayHashMap (token -> [count, error]) and a min-heap of
+    (count, token) finds the smallest one to replace. Counts only go up, so the heap entries
+    are allowed to lag: a stale top is pushed back with its current count until the top is exact
+    """
+
+    def __init__(self, k: int = 1000, function='murmur64') -> None:
+        """
+        Initialize an empty summary with room for k counters
+        """
+        if k < 1:
+            raise ValueError("Space-Saving needs at least one counter")
+        self._k = k
+        self._counters = ArrayHashMap(11, function)
+        self._heap = []
+
+    def add(self, token: str) -> None:
+        """
+        Counts one occurrence of the token
+        """
+        counter = self._counters.get(token)
+        if counter is not None:
+            counter[0] += 1
+            return
+
+        if self._counters.get_size() < self._k:
+            self._counters.put(token, [1, 0])
+            heappush(self._heap, (1, token))
+            return
+
+        # replace the smallest counter: the new token inherits its count as error
+        heap, counters = self._heap, self._counters
+        while True:
+            count, smallest = heap[0]
+            current = counters.get(smallest)[0]
+            if current == count:
+                break
+            heapreplace(heap, (current, smallest))
+        heappop(heap)
+        counters.remove(smallest)
+        counters.put(token, [count + 1, count])
+        heappush(heap, (count + 1, token))
+
+    def items(self):
+        """
+        Yields (token, count, error) for every monitored token: its true count is between count - error and count
+        """
+        for token, (count, error) in self._counters.items():
+            yield token, count, error
+
+    def __len__(self) -> int:
+        """Return the number of monitored tokens."""
+        return self._counters.get_size()
+
+
+def approximate_mode(tokens,
+                     counters: int = 1000,
+                     width: int = 1 << 16,
+                     depth: int = 4,
+                     function='murmur64') -> tuple[DynamicArray, int, int]:
+    """
+    Return a tuple containing a dynamic array of the (estimated) mode value(s) of the tokens, their estimated frequency, and the error: each mode's true frequency is between frequency - error and frequency
+
+    Notes: tokens can be any iterable, a DynamicArray, or a text file (path or open file). Memory is fixed by counters (Space-Saving) and width * depth (count-min sketch). The true mode is guaranteed to be a candidate if it makes up more than 1 / counters of the tokens
+    """
+    summary = SpaceSaving(counters, function)
+    sketch = CountMinSketch(width, depth, function)
+    summary_add, sketch_add = summary.add, sketch.add
+    for token in _tokens(tokens):
+        summary_add(token)
+        sketch_add(token)
+
+    # both counts are upper bounds, Space-Saving also gives a lower one
+    bounds = [(token, min(count, sketch.estimate(token)), count - error)
+              for token, count, error in summary.items()]
+    mode, frequency = _modes((token, upper) for token, upper, _ in bounds)
+    error = max((upper - lower for _, upper, lower in bounds if upper == frequency), default=0)
+    return mode, frequency, error
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nfind_mode_stream example")
+    print("------------------------")
+    words = ['apple', 'banana', 'apple', 'cherry', 'banana', 'apple', 'date']
+    mode, frequency = find_mode_stream(words)
+    print(f"Input: {words}\nMode : {mode}, Frequency: {frequency}")
+
+    print("\nparallel example (2 processes, chunks of 1000)")
+    print("----------------------------------------------")
+    tokens = [str(i % 97) for i in range(20000)] + ['5'] * 3
+    mode, frequency = find_mode_stream(tokens, chunk_size=1000, processes=2)
+    print(f"Mode : {mode}, Frequency: {frequency}")
+
+    print("\napproximate_mode example (50 counters)")
+    print("--------------------------------------")
+    tokens = [str(i % 500) for i in range(20000)] + ['42'] * 200
+    mode, frequency, error = approximate_mode(tokens, counters=50, width=1024)
+    print(f"Mode : {mode}, Frequency: {frequency} (true count within {error} below)")
@@ -0,0 +1,320 @@
+# Description: Hash function helpers for the HashMaps - a registry of well-distributed
+#              (optionally seeded) hash functions, and batch (vectorized) hashing
+
+# <-- Notes -->
+# hash_function_1 adds up code points, so every anagram ("key12" / "key21") collides, and
+# hash_function_2 only spreads keys a little better. The registry adds functions that mix every
+# byte into the whole 64 bit result:
+#
+#   "fnv1a"     FNV-1a (64 bit) over the UTF-8 bytes of the key
+#   "murmur64"  MurmurHash64A, eight bytes at a time
+#   "builtin"   Python's own hash(). Fast, but for strings it changes from one process to the
+#               next unless PYTHONHASHSEED is set
+#
+# HashMaps take either a function or one of these names:  HashMap(53, "fnv1a")
+# Seeded variants come from get_hash_function:  HashMap(53, get_hash_function("murmur64", seed=7))
+# Anything that hashes keys in one process and looks them up in another (worker pools, saved
+# files) calls require_stable_hash first, which refuses "builtin" unless PYTHONHASHSEED is set.
+#
+# hash_function_1 and hash_function_2 walk each key one character at a time in Python. For
+# batch operations (put_many / get_many / remove_many) hash_batch hashes the whole batch at once
+# with NumPy instead:
+#
+#   keys:     "ab"        "c"     ""     "de"
+#   codes:    [97, 98,    99,            100, 101]        <- every key's code points in one uint32 buffer
+#   starts:   [0,         2,      3,     3]               <- offset of each key in the buffer
+#   ends:     [2,         3,      3,     5]
+#
+#   hash_function_1(key) = sum(codes[start:end])
+#   hash_function_2(key) = sum(codes[start:end] * (1, 2, 3, ...))
+#
+# Each per-key sum is the difference of two prefix sums. The prefix sums are uint64 and may wrap
+# around, but the difference is still exact as long as the key's own sum fits in 64 bits, so the
+# results are identical to the scalar functions. NumPy is optional: without it (or for functions
+# that have no vectorized version) hash_batch just calls the function on every key.
+
+import os
+import struct
+from functools import partial
+
+from a6_include import hash_function_1, hash_function_2
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_MASK_64 = (1 << 64) - 1
+
+_FNV_OFFSET_BASIS = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+
+_MURMUR_M = 0xc6a4a7935bd1e995
+_MURMUR_R = 47
+
+
+def _key_bytes(key: str) -> bytes:
+    """
+    Returns the bytes hashed for a key (UTF-8, keeping lone surrogates)
+    """
+    return key.encode('utf-8', 'surrogatepass')
+
+
+def fnv1a(key: str, seed: int = 0) -> int:
+    """
+    64 bit FNV-1a hash of the key; a seed is folded into the offset basis
+    """
+    hash = (_FNV_OFFSET_BASIS ^ seed) & _MASK_64
+    for byte in _key_bytes(key):
+        hash = ((hash ^ byte) * _FNV_PRIME) & _MASK_64
+    return hash
+
+
+def murmur64(key: str, seed: int = 0) -> int:
+    """
+    MurmurHash64A of the key, mixing eight bytes at a time
+    """
+    data = _key_bytes(key)
+    m, r = _MURMUR_M, _MURMUR_R
+    hash = (seed ^ (len(data) * m)) & _MASK_64
+
+    # whole 8 byte words
+    body = len(data) - len(data) % 8
+    for (k,) in struct.iter_unpack('<Q', data[:body]):
+        k = (k * m) & _MASK_64
+        k ^= k >> r
+        k = (k * m) & _MASK_64
+        hash = ((hash ^ k) * m) & _MASK_64
+
+    # remaining 1-7 bytes
+    if body < len(data):
+        hash = ((hash ^ int.from_bytes(data[body:], 'little')) * m) & _MASK_64
+
+    hash ^= hash >> r
+    hash = (hash * m) & _MASK_64
+    hash ^= hash >> r
+    return hash
+
+
+def builtin_hash(key: str, seed: int = 0) -> int:
+    """
+    Python's built-in hash of the key, or of (seed, key) for a non-zero seed
+    """
+    if seed:
+        return hash((seed, key))
+    return hash(key)
+
+
+# name -> hash function. Functions that take a seed accept it as a "seed" keyword argument
+HASH_FUNCTIONS = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+    'fnv1a': fnv1a,
+    'murmur64': murmur64,
+    'builtin': builtin_hash,
+}
+
+# registered functions that can't take a seed
+_UNSEEDED = {'hash_function_1', 'hash_function_2'}
+
+
+def register_hash_function(name: str, function, seeded: bool = False) -> None:
+    """
+    Adds a hash function to the registry under the given name
+
+    Note: seeded functions must accept a "seed" keyword argument
+    """
+    HASH_FUNCTIONS[name] = function
+    if seeded:
+        _UNSEEDED.discard(name)
+    else:
+        _UNSEEDED.add(name)
+
+
+def get_hash_function(function, seed: int = None):
+    """
+    Returns the hash function for a registered name (or the function itself if one is passed)
+
+    Note: With a seed the result is a seeded variant of the named function. Raises ValueError for unknown names or for a seed on a function that can't take one
+    """
+    if callable(function):
+        if seed is not None:
+            raise ValueError("a seed can only be given with a registered function name")
+        return function
+
+    if function not in HASH_FUNCTIONS:
+        raise ValueError(f"unknown hash function {function!r}, expected one of {sorted(HASH_FUNCTIONS)}")
+    if seed is None:
+        return HASH_FUNCTIONS[function]
+    if function in _UNSEEDED:
+        raise ValueError(f"hash function {function!r} does not take a seed")
+    # partial objects pickle, so seeded maps can still be sent to other processes
+    return partial(HASH_FUNCTIONS[function], seed=seed)
+
+
+def hash_function_name(function) -> str:
+    """
+    Returns the registry name of a hash function, or None if it is not registered
+
+    Note: Seeded variants report the name of the function they wrap
+    """
+    if isinstance(function, partial):
+        function = function.func
+    for name, registered in HASH_FUNCTIONS.items():
+        if registered is function:
+            return name
+    return None
+
+
+def is_salted(function) -> bool:
+    """
+    Returns True if the function is Python's built-in hash (registered or not), whose results differ between processes unless PYTHONHASHSEED is set
+    """
+    return function is hash or hash_function_name(function) == 'builtin'
+
+
+def python_hash_seed() -> int:
+    """
+    Returns this process's PYTHONHASHSEED as an int, or None if Python's own hash is randomized
+    """
+    seed = os.environ.get('PYTHONHASHSEED')
+    if seed in (None, 'random'):
+        return None
+    return int(seed)
+
+
+def require_stable_hash(function) -> None:
+    """
+    Raises ValueError if the function would hash keys differently in another process (Python's built-in hash without PYTHONHASHSEED set)
+    """
+    if is_salted(function) and python_hash_seed() is None:
+        raise ValueError("the builtin hash differs between processes, set PYTHONHASHSEED or use another hash function")
+
+
+# longest key the vectorized hash_function_2 handles exactly (code point * weight sum < 2^64)
+_MAX_BATCH_KEY_LENGTH = 1 << 21
+
+
+def hash_batch(function, keys: list) -> list:
+    """
+    Returns a list with function(key) for every key, in order
+
+    Note: Uses the NumPy version of hash_function_1 / hash_function_2 when NumPy is installed, otherwise (or for any other function) calls the function per key
+    """
+    batch_function = _BATCH_FUNCTIONS.get(function) if np is not None else None
+    if batch_function is not None and keys:
+        hashes = batch_function(keys)
+        if hashes is not None:
+            return hashes
+    return list(map(function, keys))
+
+
+def _code_points(keys: list):
+    """
+    Returns (codes, starts, ends, lengths): the code points of all keys in one uint32 array and where each key starts and ends in it, or None if the keys can't be encoded that way
+    """
+    try:
+        # surrogatepass keeps lone surrogates as their own code point, like ord() does
+        buffer = ''.join(keys).encode('utf-32-le', 'surrogatepass')
+    except TypeError:
+        # not all keys are strings
+        return None
+
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    if lengths.max() > _MAX_BATCH_KEY_LENGTH:
+        return None
+
+    codes = np.frombuffer(buffer, dtype='<u4')
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    return codes, starts, ends, lengths
+
+
+def _segment_sums(values, starts, ends) -> list:
+    """
+    Returns sum(values[start:end]) for every (start, end) pair as Python ints
+    """
+    prefix = np.zeros(len(values) + 1, dtype=np.uint64)
+    np.cumsum(values, dtype=np.uint64, out=prefix[1:])
+    return (prefix[ends] - prefix[starts]).tolist()
+
+
+def _hash_function_1_batch(keys: list):
+    """
+    Vectorized hash_function_1: the sum of each key's code points
+    """
+    encoded = _code_points(keys)
+    if encoded is None:
+        return None
+    codes, starts, ends, _ = encoded
+    return _segment_sums(codes, starts, ends)
+
+
+def _hash_function_2_batch(keys: list):
+    """
+    Vectorized hash_function_2: the sum of each key's code points weighted by (index + 1)
+    """
+    encoded = _code_points(keys)
+    if encoded is None:
+        return None
+    codes, starts, ends, lengths = encoded
+
+    # position of every character inside its own key, starting at 1
+    weights = np.arange(1, len(codes) + 1, dtype=np.uint64)
+    weights -= np.repeat(starts, lengths).astype(np.uint64)
+    return _segment_sums(codes.astype(np.uint64) * weights, starts, ends)
+
+
+# scalar function -> vectorized version
+_BATCH_FUNCTIONS = {
+    hash_function_1: _hash_function_1_batch,
+    hash_function_2: _hash_function_2_batch,
+}
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nregistry example 1")
+    print("------------------")
+    print(sorted(HASH_FUNCTIONS))
+    print(get_hash_function('fnv1a') is fnv1a, get_hash_function(murmur64) is murmur64)
+    # published FNV-1a 64 test vectors
+    print(fnv1a('') == 0xcbf29ce484222325, fnv1a('a') == 0xaf63dc4c8601ec8c, fnv1a('foobar') == 0x85944171f73967e8)
+    for name, seed in (('unknown', None), ('hash_function_1', 7), (fnv1a, 7)):
+        try:
+            get_hash_function(name, seed)
+        except ValueError as error:
+            print(error)
+
+    print("\nseeded example 1")
+    print("----------------")
+    seeded = get_hash_function('murmur64', seed=7)
+    # the same seed always gives the same hash, another seed (almost always) a different one
+    print(seeded('key') == get_hash_function('murmur64', seed=7)('key'), seeded('key') != murmur64('key'),
+          seeded('key') != get_hash_function('murmur64', seed=8)('key'))
+    print(hash_function_name(seeded), hash_function_name(fnv1a), hash_function_name(len))
+    print(is_salted(hash), is_salted(get_hash_function('builtin', seed=3)), is_salted(seeded))
+
+    print("\nrequire_stable_hash example 1")
+    print("-----------------------------")
+    require_stable_hash(murmur64)
+    require_stable_hash(hash_function_1)
+    try:
+        require_stable_hash(get_hash_function('builtin'))
+        raised = False
+    except ValueError:
+        raised = True
+    # the builtin hash is only refused while PYTHONHASHSEED is unset or "random"
+    print(raised == (python_hash_seed() is None))
+
+    print("\nhash_batch example 1")
+    print("--------------------")
+    keys = ['ab', 'c', '', 'de', 'key12', 'key21', '\U0001f600x', 'a' * 1000]
+    for function in (hash_function_1, hash_function_2, fnv1a, seeded):
+        print(hash_batch(function, keys) == [function(key) for key in keys])
+    # anagrams collide under hash_function_1 but not under hash_function_2
+    print(hash_batch(hash_function_1, ['key12', 'key21']), hash_batch(hash_function_2, ['key12', 'key21']))
+    print(hash_batch(hash_function_1, []))
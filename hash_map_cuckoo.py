@@ -0,0 +1,749 @@
+# Description: HashMap Implementation - Bucketized cuckoo hashing with a stash
+
+# <-- Notes -->
+# Cuckoo hashing gives every key exactly two candidate buckets, one from each of two hash
+# functions, and a key is always stored in one of them (or in a small overflow "stash"). A get
+# therefore looks at no more than
+#
+#       2 buckets * BUCKET_SLOTS slots + STASH_SIZE stash entries
+#
+# no matter how full the table is or how unlucky the keys are. Inserting does the extra work:
+#
+#       Buckets: 5, 2 slots each      key "a": buckets 1 / 3      key "d": buckets 1 / 4
+#       bucket 1: [b, c]  full    bucket 3: [x, y]  full
+#       --> evict a resident (say c, whose other bucket is 4) and put "a" in its slot
+#       --> c moves to bucket 4, and if that is full it evicts someone in turn ("kicks")
+#
+# An insert that is still carrying an evicted entry after _MAX_KICKS kicks has most likely hit
+# a cycle. The homeless entry goes into the stash; once the stash is full the table is rehashed
+# at the same capacity with a new salt (the salt is mixed into both bucket indices, so keys that
+# fought over the same buckets get split up). If _MAX_REHASHES salts can't fit everything into
+# the buckets plus STASH_SIZE stash entries, the table grows to the next prime on the ladder and
+# tries again, up to _MAX_GROWS times. Apart from that, growth happens on the load factor, like
+# the other maps.
+#
+# The default hash functions are hash_function_1 and hash_function_2 from a6_include. They are
+# cheap but weak: strings built from the same characters often share BOTH hashes ("ahha", "bggb"
+# and "cffc" all do), and keys like that share both buckets at every capacity and salt. At most
+# 2 * BUCKET_SLOTS of them fit in their buckets and the rest need the stash, which no amount of
+# growing changes. A put that still finds no room raises ValueError and leaves the map as it was
+# (the stash never holds more than STASH_SIZE entries), so for large or adversarial key sets pass
+# two registry functions instead, e.g. HashMap(53, "murmur64", "fnv1a").
+
+from random import Random
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from hash_functions import get_hash_function, hash_batch
+from hash_map_helpers import to_list
+from hash_map_stats import (collision_rates, disable_stats, enable_stats,
+                            histogram_mean, sorted_histogram)
+from hash_map_views import ItemsView, KeysView, MapIterator, ValuesView
+from primes import grow_capacity, is_prime, ladder_capacity, next_prime
+
+# slots in every bucket
+BUCKET_SLOTS = 4
+# entries the stash holds before a failed insert rehashes the table
+STASH_SIZE = 4
+# evictions an insert tries before it gives up on the table
+_MAX_KICKS = 100
+# attempts (first with the current salt, then with new ones) a rehash makes to place every entry
+_MAX_REHASHES = 3
+# times a rehash grows the table when no salt works, before it gives up
+_MAX_GROWS = 3
+
+_MASK_64 = (1 << 64) - 1
+
+
+class HashMap:
+    # highest share of the slots put fills before the table grows
+    _max_load = 0.9
+    # bumped by every write, so iterators can tell the map changed under them
+    _version = 0
+    # slots and stash entries examined, added up by the walks while stats mode sets _counting (it
+    # zeroes _steps around each operation). With _counting off the walks don't count at all
+    _steps = 0
+    _counting = False
+
+    def __init__(self, capacity: int = 11, function=hash_function_1, function2=None) -> None:
+        """
+        Initialize new HashMap that uses cuckoo hashing
+        for collision resolution
+
+        function and function2 can be hash functions or names from the hash_functions registry.
+        function2 defaults to whichever of hash_function_1 / hash_function_2 function is not
+        """
+        # capacity (number of buckets) must be a prime number
+        self._capacity = self._next_prime(capacity)
+
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
+        if function2 is None:
+            function2 = hash_function_1 if self._hash_function is hash_function_2 else hash_function_2
+        self._hash_function_2 = get_hash_function(function2)
+        if self._hash_function_2 is self._hash_function:
+            raise ValueError("cuckoo hashing needs two different hash functions")
+
+        # mixed into both bucket indices, changed when a rehash has to split up a cycle
+        self._salt = 0
+        # picks which resident an insert evicts
+        self._random = Random(self._capacity)
+
+        self._size = 0
+        self._cycle_rehashes = 0
+        self._make_tables()
+
+    def _make_tables(self) -> None:
+        """
+        Creates empty slot arrays for the current capacity, and an empty stash
+        """
+        slots = self._capacity * BUCKET_SLOTS
+        # parallel arrays, slot i of bucket b lives at index b * BUCKET_SLOTS + i (key None = empty)
+        self._keys = [None] * slots
+        self._values = [None] * slots
+        # both full hashes of every key are cached, an evicted entry needs its other bucket
+        self._hashes1 = [0] * slots
+        self._hashes2 = [0] * slots
+        # entries that didn't fit in either bucket (HashEntry with hash = (hash1, hash2))
+        self._stash = []
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for bucket in range(self._capacity):
+            start = bucket * BUCKET_SLOTS
+            entries = [f"{self._keys[i]}: {self._values[i]}"
+                       for i in range(start, start + BUCKET_SLOTS) if self._keys[i] is not None]
+            out += str(bucket) + ': ' + str(entries) + '\n'
+        out += 'stash: ' + str([f"{item.key}: {item.value}" for item in self._stash]) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        return next_prime(capacity)
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        return is_prime(capacity)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map (number of buckets)
+        """
+        return self._capacity
+
+    def get_stash_size(self) -> int:
+        """
+        Return number of entries in the stash
+        """
+        return len(self._stash)
+
+    # ------------------------------------------------------------------ #
+
+    def _hash_pair(self, key: str) -> tuple:
+        """
+        Returns the key's two full (un-modded) hashes
+        """
+        return self._hash_function(key), self._hash_function_2(key)
+
+    def _buckets_for(self, hash1: int, hash2: int) -> tuple:
+        """
+        Returns the key's two candidate buckets (always two different ones)
+        """
+        capacity = self._capacity
+        bucket1 = (hash1 ^ self._salt) % capacity
+        bucket2 = (hash2 ^ self._salt) % capacity
+        if bucket2 == bucket1:
+            bucket2 = bucket1 + 1 if bucket1 + 1 < capacity else 0
+        return bucket1, bucket2
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists in the hash map, its associated value must be replaced with the new value. If the given key is not in the hash map, a new key/value pair must be added
+
+        Note: If the slots are 90% full the table grows to the next (roughly double) prime on the ladder. Raises ValueError (and leaves the map unchanged) if no salt or growth finds room for a new key, see the notes above
+        """
+        self._version += 1
+        self._put(key, value, self._hash_pair(key))
+
+    def _put(self, key: str, value: object, hash: tuple) -> None:
+        """
+        Same as put, but takes the key's already computed (hash1, hash2) pair
+        """
+        if self._size >= self._capacity * BUCKET_SLOTS * self._max_load:
+            self.resize_table(grow_capacity(self._capacity))
+
+        self._insert(key, value, hash)
+
+    def _insert(self, key: str, value: object, hash: tuple) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        index = self._find(key, hash)
+        if index >= 0:
+            slots = len(self._keys)
+            if index < slots:
+                self._values[index] = value
+            else:
+                self._stash[index - slots].value = value
+            return
+
+        self._size += 1
+        hash1, hash2 = hash
+        kicked = []
+        homeless = self._cuckoo(key, value, hash1, hash2, kicked)
+        if homeless is None:
+            return
+
+        if len(self._stash) < STASH_SIZE:
+            self._stash.append(HashEntry(homeless[0], homeless[1], homeless[2:]))
+            return
+
+        # the stash is full too: split up the cycle with a new salt
+        self._cycle_rehashes += 1
+        salt = self._salt
+        self._salt = self._next_salt()
+        if self._rehash(homeless):
+            return
+
+        # nothing fits the key in: put the evicted entries back where they were and leave it out
+        self._salt = salt
+        self._unkick(homeless, kicked)
+        self._size -= 1
+        raise ValueError(f"no room for {key!r}: too many keys share its buckets at every capacity tried, use two registry hash functions")
+
+    def _cuckoo(self, key: str, value: object, hash1: int, hash2: int, kicked: list = None):
+        """
+        Stores an entry that is not in the table, evicting residents into their other bucket as needed
+
+        Note: Returns None once every entry has a slot, or the (key, value, hash1, hash2) still left over after _MAX_KICKS evictions. If kicked is given, the slot of every eviction is appended to it (see _unkick)
+        """
+        keys = self._keys
+        values = self._values
+        hashes1 = self._hashes1
+        hashes2 = self._hashes2
+        capacity = self._capacity
+        salt = self._salt
+        randrange = self._random.randrange
+
+        for kick in range(_MAX_KICKS):
+            bucket1 = (hash1 ^ salt) % capacity
+            bucket2 = (hash2 ^ salt) % capacity
+            if bucket2 == bucket1:
+                bucket2 = bucket1 + 1 if bucket1 + 1 < capacity else 0
+
+            # first free slot in either bucket
+            for start in (bucket1 * BUCKET_SLOTS, bucket2 * BUCKET_SLOTS):
+                for index in range(start, start + BUCKET_SLOTS):
+                    if keys[index] is None:
+                        keys[index] = key
+                        values[index] = value
+                        hashes1[index] = hash1
+                        hashes2[index] = hash2
+                        if self._counting:
+                            # every kick before this one looked at both buckets
+                            self._steps += self._slots_checked(kick, index, bucket1)
+                        return None
+
+            # both full: take a random resident's slot and carry it to its other bucket
+            index = (bucket1 if randrange(2) else bucket2) * BUCKET_SLOTS + randrange(BUCKET_SLOTS)
+            if kicked is not None:
+                kicked.append(index)
+            keys[index], key = key, keys[index]
+            values[index], value = value, values[index]
+            hashes1[index], hash1 = hash1, hashes1[index]
+            hashes2[index], hash2 = hash2, hashes2[index]
+
+        if self._counting:
+            self._steps += _MAX_KICKS * 2 * BUCKET_SLOTS
+        return key, value, hash1, hash2
+
+    @staticmethod
+    def _slots_checked(kicks: int, index: int, bucket1: int) -> int:
+        """
+        Returns the slots a walk examined to stop at index after kicks evictions (stats mode only): both buckets for every eviction, then the first bucket before the second
+        """
+        steps = kicks * 2 * BUCKET_SLOTS + index % BUCKET_SLOTS + 1
+        if index // BUCKET_SLOTS != bucket1:
+            steps += BUCKET_SLOTS
+        return steps
+
+    def _unkick(self, homeless: tuple, kicked: list) -> None:
+        """
+        Undoes the evictions of a _cuckoo call that left homeless over, so every evicted entry is back in its old slot
+        """
+        key, value, hash1, hash2 = homeless
+        keys = self._keys
+        values = self._values
+        hashes1 = self._hashes1
+        hashes2 = self._hashes2
+        for index in reversed(kicked):
+            keys[index], key = key, keys[index]
+            values[index], value = value, values[index]
+            hashes1[index], hash1 = hash1, hashes1[index]
+            hashes2[index], hash2 = hash2, hashes2[index]
+
+    def _next_salt(self) -> int:
+        """
+        Returns a new salt (64 bit linear congruential step from the current one)
+        """
+        return (self._salt * 6364136223846793005 + 1442695040888963407) & _MASK_64
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the number of buckets. All existing key/value pairs are placed into the new table
+
+        Note: If new_capacity is 1 or more, make sure it is a prime number. If not, change it to the next highest prime number
+        """
+        if new_capacity < 1:
+            return
+
+        if not self._is_prime(new_capacity):
+            new_capacity = self._next_prime(new_capacity)
+        # keep growing (like put would) until the entries fit under the maximum load
+        while self._size - 1 >= new_capacity * BUCKET_SLOTS * self._max_load:
+            new_capacity = grow_capacity(new_capacity)
+        capacity = self._capacity
+        self._capacity = new_capacity
+        self._version += 1
+
+        if not self._rehash():
+            # the entries can't be placed (weak hash functions, see the notes above), so the old table stays
+            self._capacity = capacity
+
+    def _rehash(self, extra: tuple = None) -> bool:
+        """
+        Places every entry (plus extra, a homeless (key, value, hash1, hash2)) into fresh arrays sized to the (already updated) capacity
+
+        Note: Tries _MAX_REHASHES salts, and if the stash still overflows, grows the table to the next prime on the ladder (up to _MAX_GROWS times) and tries again. Returns False, with the arrays, capacity and salt back as they were when it was called, if nothing worked
+        """
+        entries = list(self._entries())
+        if extra is not None:
+            entries.append(extra)
+        old = (self._capacity, self._salt, self._keys, self._values, self._hashes1, self._hashes2, self._stash)
+
+        for grows in range(_MAX_GROWS + 1):
+            if grows:
+                # no salt splits up the cycles at this capacity
+                self._capacity = grow_capacity(self._capacity)
+            for attempt in range(_MAX_REHASHES):
+                if attempt:
+                    self._salt = self._next_salt()
+                self._make_tables()
+                stash = self._stash
+                cuckoo = self._cuckoo
+                for entry in entries:
+                    homeless = cuckoo(*entry)
+                    if homeless is None:
+                        continue
+                    if len(stash) == STASH_SIZE:
+                        break
+                    stash.append(HashEntry(homeless[0], homeless[1], homeless[2:]))
+                else:
+                    return True
+
+        self._capacity, self._salt, self._keys, self._values, self._hashes1, self._hashes2, self._stash = old
+        return False
+
+    def _entries(self):
+        """
+        Yields (key, value, hash1, hash2) for every entry, table first and then the stash
+        """
+        keys, values = self._keys, self._values
+        hashes1, hashes2 = self._hashes1, self._hashes2
+        for index in range(len(keys)):
+            if keys[index] is not None:
+                yield keys[index], values[index], hashes1[index], hashes2[index]
+        for item in self._stash:
+            yield (item.key, item.value) + item.hash
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, table first and then the stash
+        """
+        return ((key, value) for key, value, _, _ in self._entries())
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+
+        Note: Like the chaining map this is entries per bucket, so it goes up to BUCKET_SLOTS * 0.9
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of buckets with no entries in them
+        """
+        keys = self._keys
+        count = 0
+        for start in range(0, len(keys), BUCKET_SLOTS):
+            if keys[start:start + BUCKET_SLOTS].count(None) == BUCKET_SLOTS:
+                count += 1
+        return count
+
+    def _find(self, key: str, hash: tuple) -> int:
+        """
+        Returns the key's slot, len(slots) + its stash position if it is in the stash, or -1 if it is not in the map
+        """
+        hash1, hash2 = hash
+        keys = self._keys
+        hashes1 = self._hashes1
+        bucket1, bucket2 = self._buckets_for(hash1, hash2)
+
+        # at most 2 * BUCKET_SLOTS slots (cheap hash check first)
+        for start in (bucket1 * BUCKET_SLOTS, bucket2 * BUCKET_SLOTS):
+            for index in range(start, start + BUCKET_SLOTS):
+                if hashes1[index] == hash1 and keys[index] == key:
+                    if self._counting:
+                        self._steps += self._slots_checked(0, index, bucket1)
+                    return index
+
+        for position, item in enumerate(self._stash):
+            if item.hash == hash and item.key == key:
+                if self._counting:
+                    self._steps += 2 * BUCKET_SLOTS + position + 1
+                return len(keys) + position
+        if self._counting:
+            self._steps += 2 * BUCKET_SLOTS + len(self._stash)
+        return -1
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, the method returns None
+        """
+        return self._get(key, self._hash_pair(key))
+
+    def _get(self, key: str, hash: tuple) -> object:
+        """
+        Same as get, but takes the key's already computed (hash1, hash2) pair
+        """
+        index = self._find(key, hash)
+        if index < 0:
+            return None
+        slots = len(self._keys)
+        if index < slots:
+            return self._values[index]
+        return self._stash[index - slots].value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False. An empty hash map does not contain any keys
+        """
+        return self.get(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map. If the key is not in the hash map, the method does nothing (no exception needs to be raised)
+        """
+        self._version += 1
+        self._remove(key, self._hash_pair(key))
+
+    def _remove(self, key: str, hash: tuple) -> None:
+        """
+        Same as remove, but takes the key's already computed (hash1, hash2) pair
+
+        Note: Freeing a slot lets stashed entries move back into the table
+        """
+        index = self._find(key, hash)
+        if index < 0:
+            return
+
+        self._size -= 1
+        slots = len(self._keys)
+        if index >= slots:
+            self._stash.pop(index - slots)
+        else:
+            self._keys[index] = None
+            self._values[index] = None
+            if self._stash:
+                self._unstash()
+
+    def _unstash(self) -> None:
+        """
+        Moves stashed entries that have a free slot in one of their buckets back into the table
+        """
+        keys = self._keys
+        remaining = []
+        for item in self._stash:
+            hash1, hash2 = item.hash
+            for bucket in self._buckets_for(hash1, hash2):
+                start = bucket * BUCKET_SLOTS
+                if None in keys[start:start + BUCKET_SLOTS]:
+                    index = keys.index(None, start, start + BUCKET_SLOTS)
+                    keys[index] = item.key
+                    self._values[index] = item.value
+                    self._hashes1[index] = hash1
+                    self._hashes2[index] = hash2
+                    break
+            else:
+                remaining.append(item)
+        self._stash = remaining
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the hash map. The order of the keys in the dynamic array does not matter
+        """
+        return DynamicArray([(key, value) for key, value, _, _ in self._entries()])
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. It does not change the underlying hash table capacity
+        """
+        self._make_tables()
+        self._size = 0
+        self._version += 1
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair into the hash map, same as calling put on each pair in order
+
+        Note: pairs can be a DynamicArray or any iterable. The table is sized once up front for all of them, so the loop never has to check the load factor or resize
+        """
+        self._version += 1
+        pairs = to_list(pairs)
+        self.reserve(self._size + len(pairs))
+
+        # hash the whole batch at once with both functions, then hoist the lookup out of the loop
+        keys = [pair[0] for pair in pairs]
+        hashes = zip(hash_batch(self._hash_function, keys), hash_batch(self._hash_function_2, keys))
+        insert = self._insert
+        for (key, value), hash in zip(pairs, hashes):
+            insert(key, value, hash)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        keys = to_list(keys)
+        hashes = zip(hash_batch(self._hash_function, keys), hash_batch(self._hash_function_2, keys))
+        get = self._get
+        return DynamicArray([get(key, hash) for key, hash in zip(keys, hashes)])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key that is in the hash map
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        self._version += 1
+        keys = to_list(keys)
+        hashes = zip(hash_batch(self._hash_function, keys), hash_batch(self._hash_function_2, keys))
+        remove = self._remove
+        for key, hash in zip(keys, hashes):
+            remove(key, hash)
+
+    def reserve(self, count: int) -> None:
+        """
+        Makes sure the hash map can hold count entries in total without resizing again
+
+        Note: Grows straight to the ladder prime that keeps the slots under 90% full, and never shrinks the table
+        """
+        if count >= self._capacity * BUCKET_SLOTS * self._max_load:
+            self.resize_table(ladder_capacity(int(count / (BUCKET_SLOTS * self._max_load)) + 1))
+
+    def analyze(self) -> dict:
+        """
+        Returns a report on how the entries are laid out:
+
+            bucket_fill                 histogram {entries in the bucket: number of buckets}
+            probe_lengths_hit           histogram {slots examined: count} for a get of every stored key
+                                        (1 - BUCKET_SLOTS in the first bucket, then the second bucket, then the stash)
+            average_probe_hit / max_probe_hit   mean and worst of that histogram
+            probe_length_miss           slots every get of a missing key examines (both buckets and the whole stash)
+            stash_size                  entries in the stash
+            first_bucket_share          share of the table's entries that sit in their first bucket
+            cycle_rehashes              rehashes that inserts caused by running into a cycle
+            expected_collision_rate     share of keys expected to share their first bucket with a uniform hash
+            observed_collision_rate     share of keys that actually share their first bucket with an earlier key
+        """
+        capacity = self._capacity
+        keys = self._keys
+        fill = {}
+        hits = {}
+        homes = bytearray(capacity)
+        first = 0
+
+        # one pass over the buckets
+        for bucket in range(capacity):
+            start = bucket * BUCKET_SLOTS
+            count = 0
+            for index in range(start, start + BUCKET_SLOTS):
+                if keys[index] is None:
+                    continue
+                count += 1
+                bucket1, _ = self._buckets_for(self._hashes1[index], self._hashes2[index])
+                homes[bucket1] = 1
+                steps = index - start + 1
+                if bucket == bucket1:
+                    first += 1
+                else:
+                    steps += BUCKET_SLOTS
+                hits[steps] = hits.get(steps, 0) + 1
+            fill[count] = fill.get(count, 0) + 1
+
+        stash = self._stash
+        for position, item in enumerate(stash):
+            homes[self._buckets_for(*item.hash)[0]] = 1
+            steps = 2 * BUCKET_SLOTS + position + 1
+            hits[steps] = hits.get(steps, 0) + 1
+
+        in_table = self._size - len(stash)
+        expected, observed = collision_rates(self._size, capacity, sum(homes))
+        return {
+            'size': self._size,
+            'capacity': capacity,
+            'load': self.table_load(),
+            'slot_load': self._size / (capacity * BUCKET_SLOTS),
+            'bucket_fill': sorted_histogram(fill),
+            'probe_lengths_hit': sorted_histogram(hits),
+            'average_probe_hit': histogram_mean(hits),
+            'max_probe_hit': max(hits, default=0),
+            'probe_length_miss': 2 * BUCKET_SLOTS + len(stash),
+            'stash_size': len(stash),
+            'first_bucket_share': first / in_table if in_table else 0.0,
+            'cycle_rehashes': self._cycle_rehashes,
+            'expected_collision_rate': expected,
+            'observed_collision_rate': observed,
+        }
+
+    def enable_stats(self) -> None:
+        """
+        Starts counting operations, hits/misses, probe steps and resizes (see hash_map_stats)
+
+        Note: Instrumented methods are swapped in on this map only, and its walks only count steps while they are, so a map with stats off pays nothing. Probe steps are the ones the operations themselves walked, so counting them never repeats a lookup
+        """
+        enable_stats(self)
+
+    def disable_stats(self) -> None:
+        """
+        Stops counting and restores the uninstrumented methods
+        """
+        disable_stats(self)
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the counters, or None if stats are not enabled
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is None:
+            return None
+        snapshot = stats.snapshot()
+        snapshot['cycle_rehashes'] = self._cycle_rehashes
+        return snapshot
+
+    def reset_stats(self) -> None:
+        """
+        Sets all counters back to zero (stats stay enabled)
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is not None:
+            stats.reset()
+
+    def keys(self) -> KeysView:
+        """
+        Returns a live view of the keys in the hash map
+
+        Note: The view walks the table only while it is iterated, nothing is copied. len() and "in" on it answer straight from the map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a live view of the values in the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a live view of the (key, value) pairs in the hash map
+        """
+        return ItemsView(self)
+
+    def __iter__(self) -> MapIterator:
+        """
+        Enables the hash map to iterate across itself, yielding a HashEntry (built on demand) per item, table slots first and then the stash
+
+        Note: Every call returns a new iterator with its own position. Writing to the map while iterating makes the next step raise RuntimeError
+        """
+        return MapIterator(self, (HashEntry(key, value, (hash1, hash2))
+                                  for key, value, hash1, hash2 in self._entries()))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput example")
+    print("-----------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity(), m.get_stash_size())
+
+    print("\nget / contains_key / remove example")
+    print("-----------------------------------")
+    m = HashMap(11, hash_function_1)
+    m.put('key1', 10)
+    m.put('key2', 20)
+    m.put('key3', 30)
+    print(m.get('key1'), m.get('key4'), m.contains_key('key2'))
+    m.remove('key2')
+    print(m.contains_key('key2'), m.get_size())
+
+    print("\nresize example")
+    print("--------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+        result = True
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nworst-case lookup (two registry hash functions)")
+    print("-----------------------------------------------")
+    m = HashMap(11, 'murmur64', 'fnv1a')
+    for i in range(10000):
+        m.put('key' + str(i), i)
+    report = m.analyze()
+    print(report['size'], report['capacity'], round(report['slot_load'], 2),
+          report['max_probe_hit'], report['probe_length_miss'], report['stash_size'])
+
+    print("\nkeys that share both hashes")
+    print("---------------------------")
+    # every one of these has hash_function_1 == 402 and hash_function_2 == 1005, so they share both
+    # buckets at any capacity: 2 * BUCKET_SLOTS fit in the buckets and STASH_SIZE in the stash
+    keys = ['ahha', 'bggb', 'bhec', 'cehb', 'cffc', 'cgdd', 'chbe', 'ddgc', 'deed', 'dfce', 'dgaf', 'ebhc', 'ecfd']
+    m = HashMap(11)
+    try:
+        for key in keys:
+            m.put(key, key.upper())
+    except ValueError:
+        print('no room for', key)
+    print(m.get_size(), m.get_stash_size(), m.get_capacity(), m.get('ahha'), m.get('ecfd'))
+    print(all(m.get(key) == key.upper() for key in keys[:12]))
@@ -0,0 +1,701 @@
+# Description: HashMap Implementation - Separate chaining map whose chains live in pages of a
+#              local file, behind a bounded LRU page cache
+
+# <-- Notes -->
+# hash_map_sc.HashMap keeps every chain in memory. DiskHashMap keeps only the bucket directory in
+# memory (one 8 byte page number per bucket) and stores the chains in fixed-size pages of a file,
+# so the map can be several times larger than RAM:
+#
+#   directory   [ 0 | -1 | 1 | 3 | ... ]          first page of each bucket's chain, -1 = empty bucket
+#   file        | page 0 | page 1 | page 2 | page 3 | ...         page_size bytes each
+#   page        | next page (8) | bytes used (4) | record | record | ... |
+#
+# The records are the packed (hash, key length, value length, value type, key, value) records of
+# hash_map_mmap. A bucket is meant to hold about one page of them, so there are far fewer buckets
+# than entries: the table grows when the records would fill more than max_fill of one page per
+# bucket. When a bucket's page is full, a new overflow page is linked in front of its chain, so a
+# lookup usually reads one page and only an unlucky bucket costs more. That is also what stats mode
+# counts: the probe steps of an operation are the pages it read (its chain walk, plus the page
+# before one it unlinks), not records.
+#
+# Pages are read through an LRU cache holding at most cache_pages decoded pages. A write changes
+# the cached page and marks it dirty; dirty pages go back to the file only when the cache evicts
+# them, or on flush() / close() (write-back). Pages that remove empties go on a free list and are
+# reused before the file grows.
+#
+# resize_table bypasses the cache and moves whole files instead of single pages:
+#
+#   1. the old file is read front to back, _SCAN_PAGES pages per read
+#   2. if the records don't fit in the cache's memory budget, they are first written out to
+#      temporary partition files, one per range of new buckets (sequential writes)
+#   3. each partition is sorted by new bucket and the new file is written front to back, every
+#      chain in consecutive pages
+#
+# The directory is rebuilt while writing and the new file replaces the old one. Files the map
+# creates itself (no path given) are deleted by close().
+
+import os
+import struct
+import tempfile
+from array import array
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+
+from a6_include import DynamicArray, hash_function_1
+from hash_functions import get_hash_function
+from hash_map_helpers import MISSING, updated_value
+from hash_map_mmap import RECORD, decode_value, encode_value
+from hash_map_sc import HashMap
+
+_MASK_64 = (1 << 64) - 1
+
+# next page of the chain (-1 for the last one), bytes of records in the page
+_PAGE = struct.Struct('<qI')
+
+# pages read at once when the whole file is scanned (iteration and resize_table)
+_SCAN_PAGES = 256
+
+# record size reserve() assumes before the map has any records to measure
+_RECORD_GUESS = 64
+
+
+def _key_bytes(key: str) -> bytes:
+    """
+    Returns the bytes a key is stored as
+    """
+    return key.encode('utf-8', 'surrogatepass')
+
+
+def _record_key(record: bytes) -> str:
+    """
+    Returns the key of a packed record
+    """
+    _, key_length, _, _ = RECORD.unpack_from(record)
+    return record[RECORD.size:RECORD.size + key_length].decode('utf-8', 'surrogatepass')
+
+
+def _record_value(record: bytes) -> object:
+    """
+    Returns the decoded value of a packed record
+    """
+    _, key_length, _, kind = RECORD.unpack_from(record)
+    return decode_value(kind, record[RECORD.size + key_length:])
+
+
+def _records(data: bytes, start: int, end: int):
+    """
+    Yields (hash, record) for the packed records in data[start:end]
+    """
+    while start < end:
+        hash, key_length, value_length, _ = RECORD.unpack_from(data, start)
+        size = RECORD.size + key_length + value_length
+        yield hash, data[start:start + size]
+        start += size
+
+
+class _Page:
+    """
+    One page of a chain, decoded: its records and their hashes, the next page and the bytes used
+    """
+
+    __slots__ = ('next', 'hashes', 'records', 'used', 'dirty')
+
+    def __init__(self, next: int = -1) -> None:
+        self.next = next
+        self.hashes = []
+        self.records = []
+        self.used = 0
+        # True once the page differs from its copy in the file
+        self.dirty = False
+
+    @classmethod
+    def parse(cls, data: bytes, offset: int) -> "_Page":
+        """
+        Returns the page stored at data[offset:]
+        """
+        next, used = _PAGE.unpack_from(data, offset)
+        page = cls(next)
+        start = offset + _PAGE.size
+        for hash, record in _records(data, start, start + used):
+            page.hashes.append(hash)
+            page.records.append(record)
+        page.used = used
+        return page
+
+    def to_bytes(self, page_size: int) -> bytes:
+        """
+        Returns the page as page_size bytes
+        """
+        data = _PAGE.pack(self.next, self.used) + b''.join(self.records)
+        return data + bytes(page_size - len(data))
+
+
+class DiskHashMap(HashMap):
+    """
+    HashMap that uses separate chaining like HashMap, but keeps only its bucket directory in
+    memory: the chains are stored in fixed-size pages of a file and read through a bounded LRU
+    page cache with write-back, so the map can hold more entries than fit in RAM.
+
+    Capacity is the number of buckets, and each bucket holds about a page of entries, so
+    table_load() (entries per bucket) is far above 1. Keys are strings; values are stored like
+    hash_map_mmap stores them (None, bools, 64 bit ints, floats, str and bytes as they are,
+    anything else pickled), so a get returns a copy, not the object that was put.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 path=None,
+                 page_size: int = 4096,
+                 cache_pages: int = 1024,
+                 max_fill: float = 0.75) -> None:
+        """
+        Initialize new empty DiskHashMap with its pages in the file at path
+
+        path is created (or truncated); without one the map uses a temporary file that close()
+        deletes. At most cache_pages pages (cache_pages * page_size bytes) are held in memory.
+        max_fill is how full the pages get, on average, before the table grows
+        """
+        if page_size < _PAGE.size + RECORD.size + 1:
+            raise ValueError(f"page_size must be at least {_PAGE.size + RECORD.size + 1} bytes")
+        if cache_pages < 1:
+            raise ValueError("the page cache needs room for at least one page")
+
+        # capacity must be a prime number
+        self._capacity = self._round_capacity(capacity)
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
+        self._size = 0
+
+        self._page_size = page_size
+        # bytes of records a page holds
+        self._payload = page_size - _PAGE.size
+        self._cache_pages = cache_pages
+        self._max_fill = max_fill
+        # total bytes of all records, which is what the load is measured in
+        self._bytes = 0
+
+        # first page of each bucket's chain, -1 for an empty bucket
+        self._directory = array('q', [-1]) * self._capacity
+
+        self._temporary = path is None
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix='.pages')
+            os.close(handle)
+        self._path = os.fspath(path)
+        self._file = open(self._path, 'w+b')
+        # pages in the file (including free ones), and the free ones
+        self._pages = 0
+        self._free = []
+
+        # page number -> _Page, least recently used first
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        # page reads when stats mode last zeroed _steps
+        self._steps_start = 0
+
+    # every page an operation walks is read through _page, which counts it as a cache hit or miss,
+    # so the probe steps stats mode records are read off those counters and the walks count nothing
+    @property
+    def _steps(self) -> int:
+        return self._hits + self._misses - self._steps_start
+
+    @_steps.setter
+    def _steps(self, value: int) -> None:
+        self._steps_start = self._hits + self._misses - value
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            entries = [f"({_record_key(record)}: {_record_value(record)})" for record in self._chain(i)]
+            out += str(i) + ': [' + ' -> '.join(entries) + ']\n'
+        return out
+
+    def __enter__(self) -> "DiskHashMap":
+        """Return the map, for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Close the map at the end of a with statement."""
+        self.close()
+
+    def flush(self) -> None:
+        """
+        Writes every dirty cached page back to the file, in page order
+        """
+        for number in sorted(number for number, page in self._cache.items() if page.dirty):
+            self._write_page(number, self._cache[number])
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Writes back the dirty pages and closes the file (deleting it if the map created it). The map can't be used afterwards
+        """
+        if self._temporary:
+            self._file.close()
+            os.remove(self._path)
+            return
+        self.flush()
+        self._file.close()
+
+    def get_page_stats(self) -> dict:
+        """
+        Returns the page file and cache counters:
+
+            pages           pages in use in the file
+            free_pages      emptied pages waiting to be reused
+            cached_pages    pages in the cache (dirty_pages of them not written back yet)
+            cache_hits      page reads served by the cache
+            cache_misses    page reads that went to the file
+            page_writes     pages written to the file (evictions, flush, resize_table)
+        """
+        return {
+            'pages': self._pages - len(self._free),
+            'free_pages': len(self._free),
+            'cached_pages': len(self._cache),
+            'dirty_pages': sum(1 for page in self._cache.values() if page.dirty),
+            'cache_hits': self._hits,
+            'cache_misses': self._misses,
+            'page_writes': self._writes,
+        }
+
+    # ----------------------- page file and cache ----------------------- #
+
+    def _page(self, number: int) -> _Page:
+        """
+        Returns the page with this number, from the cache or else from the file
+        """
+        page = self._cache.get(number)
+        if page is not None:
+            self._cache.move_to_end(number)
+            self._hits += 1
+            return page
+
+        self._misses += 1
+        self._file.seek(number * self._page_size)
+        page = _Page.parse(self._file.read(self._page_size), 0)
+        self._cache_page(number, page)
+        return page
+
+    def _cache_page(self, number: int, page: _Page) -> None:
+        """
+        Puts the page in the cache as the most recently used one, evicting (and writing back if dirty) the least recently used pages beyond cache_pages
+        """
+        cache = self._cache
+        cache[number] = page
+        cache.move_to_end(number)
+        while len(cache) > self._cache_pages:
+            old_number, old = cache.popitem(last=False)
+            if old.dirty:
+                self._write_page(old_number, old)
+
+    def _dirty(self, number: int, page: _Page) -> None:
+        """
+        Marks a changed page dirty (and caches it again, in case reading other pages evicted it meanwhile)
+        """
+        page.dirty = True
+        self._cache_page(number, page)
+
+    def _write_page(self, number: int, page: _Page) -> None:
+        """
+        Writes the page to its place in the file
+        """
+        self._file.seek(number * self._page_size)
+        self._file.write(page.to_bytes(self._page_size))
+        page.dirty = False
+        self._writes += 1
+
+    def _new_page(self, next: int) -> tuple:
+        """
+        Returns (number, page) of an empty page linked to next, reusing a free page if there is one
+        """
+        if self._free:
+            number = self._free.pop()
+        else:
+            number = self._pages
+            self._pages += 1
+        page = _Page(next)
+        self._dirty(number, page)
+        return number, page
+
+    def _free_page(self, number: int) -> None:
+        """
+        Drops an emptied page from the cache (without writing it) and puts it on the free list
+        """
+        self._cache.pop(number, None)
+        self._free.append(number)
+
+    def _peek(self, number: int) -> _Page:
+        """
+        Returns the page with this number without touching the cache: no LRU reordering, no caching of a page read from the file, no hit / miss count
+        """
+        page = self._cache.get(number)
+        if page is not None:
+            return page
+        self._file.seek(number * self._page_size)
+        return _Page.parse(self._file.read(self._page_size), 0)
+
+    def _chain(self, index: int):
+        """
+        Yields every record of the bucket at index, page by page
+
+        Note: Reads the pages with _peek, so diagnostics (__str__, analyze) leave the cache and its counters as they were
+        """
+        number = self._directory[index]
+        while number >= 0:
+            page = self._peek(number)
+            yield from page.records
+            number = page.next
+
+    def _scan(self):
+        """
+        Yields (hash, record) for every record, reading the file front to back _SCAN_PAGES pages at a time
+
+        Note: A cached page is used instead of its (possibly older) copy in the file
+        """
+        free = set(self._free)
+        size = self._page_size
+        for first in range(0, self._pages, _SCAN_PAGES):
+            self._file.seek(first * size)
+            block = self._file.read(_SCAN_PAGES * size)
+            # pick every page of the block before handing out records, so the cache can't change in between
+            pages = []
+            for number in range(first, min(first + _SCAN_PAGES, self._pages)):
+                if number in free:
+                    continue
+                page = self._cache.get(number)
+                pages.append(page if page is not None else _Page.parse(block, (number - first) * size))
+            for page in pages:
+                yield from zip(page.hashes, page.records)
+
+    # ----------------------- chains ----------------------- #
+
+    def _record(self, key_bytes: bytes, value: object, hash: int) -> bytes:
+        """
+        Returns the packed record for an entry, raising ValueError if it is too big for a page
+        """
+        kind, value_bytes = encode_value(value)
+        record = RECORD.pack(hash, len(key_bytes), len(value_bytes), kind) + key_bytes + value_bytes
+        if len(record) > self._payload:
+            raise ValueError(f"an entry of {len(record)} bytes does not fit in a {self._page_size} byte page")
+        return record
+
+    def _find(self, index: int, hash: int, key_bytes: bytes) -> tuple:
+        """
+        Walks the bucket's chain for the key and returns (previous page number, page number, page, position) of its record
+
+        Note: position is -1 if the key is not in the chain
+        """
+        previous, number = -1, self._directory[index]
+        while number >= 0:
+            page = self._page(number)
+            hashes = page.hashes
+            # list.index finds the records whose hash matches, only their key bytes are compared
+            position = -1
+            for _ in range(hashes.count(hash)):
+                position = hashes.index(hash, position + 1)
+                record = page.records[position]
+                _, key_length, _, _ = RECORD.unpack_from(record)
+                if key_length == len(key_bytes) and record[RECORD.size:RECORD.size + key_length] == key_bytes:
+                    return previous, number, page, position
+            previous, number = number, page.next
+        return -1, -1, None, -1
+
+    def _add(self, index: int, hash: int, record: bytes) -> None:
+        """
+        Adds a record to the first page of the bucket's chain with room for it, or to a new page at the front of the chain
+        """
+        size = len(record)
+        number = self._directory[index]
+        while number >= 0:
+            page = self._page(number)
+            if page.used + size <= self._payload:
+                break
+            number = page.next
+        else:
+            # every page of the chain is full (or the bucket is empty)
+            number, page = self._new_page(self._directory[index])
+            self._directory[index] = number
+
+        page.hashes.append(hash)
+        page.records.append(record)
+        page.used += size
+        self._bytes += size
+        self._dirty(number, page)
+
+    def _delete(self, index: int, previous: int, number: int, page: _Page, position: int) -> None:
+        """
+        Removes the record at position from its page, unlinking the page from the chain if that empties it
+        """
+        record = page.records.pop(position)
+        page.hashes.pop(position)
+        page.used -= len(record)
+        self._bytes -= len(record)
+        if page.records:
+            self._dirty(number, page)
+            return
+
+        if previous < 0:
+            self._directory[index] = page.next
+        else:
+            before = self._page(previous)
+            before.next = page.next
+            self._dirty(previous, before)
+        self._free_page(number)
+
+    def _replace(self, index: int, previous: int, number: int, page: _Page, position: int, record: bytes) -> None:
+        """
+        Replaces the record at position, moving it to another page if the new one no longer fits in this one
+        """
+        grow = len(record) - len(page.records[position])
+        if page.used + grow <= self._payload:
+            page.records[position] = record
+            page.used += grow
+            self._bytes += grow
+            self._dirty(number, page)
+            return
+
+        hash = page.hashes[position]
+        self._delete(index, previous, number, page, position)
+        self._add(index, hash, record)
+
+    # ----------------------- HashMap engine ----------------------- #
+
+    def _make_room(self) -> None:
+        """
+        Grows the table before one more key goes in, if the records fill max_fill of a page per bucket
+        """
+        if self._needs_room():
+            self.resize_table(self._grow_capacity(self._capacity))
+
+    def _needs_room(self) -> bool:
+        """
+        Returns True if one more key needs _make_room first: the records fill max_fill of a page per bucket
+        """
+        return self._bytes >= self._capacity * self._payload * self._max_fill
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        hash &= _MASK_64
+        index = hash % self._capacity
+        key_bytes = _key_bytes(key)
+        record = self._record(key_bytes, value, hash)
+
+        previous, number, page, position = self._find(index, hash, key_bytes)
+        if position >= 0:
+            self._replace(index, previous, number, page, position, record)
+            return
+        self._add(index, hash, record)
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's record, or adds the key to its bucket, in one walk of the chain (without checking the load factor)
+        """
+        hash &= _MASK_64
+        index = hash % self._capacity
+        key_bytes = _key_bytes(key)
+
+        previous, number, page, position = self._find(index, hash, key_bytes)
+        if position >= 0:
+            value = updated_value(_record_value(page.records[position]), fn, default)
+            self._replace(index, previous, number, page, position, self._record(key_bytes, value, hash))
+            return value
+
+        value = updated_value(MISSING, fn, default)
+        self._add(index, hash, self._record(key_bytes, value, hash))
+        self._size += 1
+        return value
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        hash &= _MASK_64
+        _, _, page, position = self._find(hash % self._capacity, hash, _key_bytes(key))
+        if position < 0:
+            return default
+        return _record_value(page.records[position])
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        hash &= _MASK_64
+        index = hash % self._capacity
+        previous, number, page, position = self._find(index, hash, _key_bytes(key))
+        if position >= 0:
+            self._delete(index, previous, number, page, position)
+            self._size -= 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the number of buckets and rewrites the page file with every chain in consecutive pages
+
+        Note: new_capacity is moved up to a prime, and further up the ladder until the records fill less than max_fill of a page per bucket. The old file is read and the new one written sequentially, in bulk
+        """
+        if new_capacity < 1:
+            return
+
+        if not self._valid_capacity(new_capacity):
+            new_capacity = self._round_capacity(new_capacity)
+        while self._bytes >= new_capacity * self._payload * self._max_fill:
+            new_capacity = self._grow_capacity(new_capacity)
+        self._capacity = new_capacity
+        self._version += 1
+
+        self._rehash()
+
+    def _rehash(self) -> None:
+        """
+        Writes a new page file for the (already updated) capacity from a sequential scan of the old one, and swaps it in
+        """
+        capacity = self._capacity
+        payload = self._payload
+        page_size = self._page_size
+
+        # a partition (and the pages written from it) may take as much memory as the cache
+        partitions = max(1, -(-self._bytes // (self._cache_pages * payload)))
+        spills = []
+        if partitions == 1:
+            parts = [list(self._scan())]
+        else:
+            spills = [tempfile.TemporaryFile() for _ in range(partitions)]
+            for hash, record in self._scan():
+                spills[hash % capacity * partitions // capacity].write(record)
+            parts = (self._read_spill(spill) for spill in spills)
+
+        directory = array('q', [-1]) * capacity
+        pages = 0
+        new_path = self._path + '.resize'
+        with open(new_path, 'wb') as file:
+            for part in parts:
+                # one partition covers a range of buckets, in order, so the file is written front to back
+                part = sorted(((hash % capacity, record) for hash, record in part), key=itemgetter(0))
+                block = []
+                for index, group in groupby(part, key=itemgetter(0)):
+                    directory[index] = pages
+                    page = _Page()
+                    for _, record in group:
+                        if page.used + len(record) > payload:
+                            # the chain continues in the very next page
+                            page.next = pages + 1
+                            block.append(page.to_bytes(page_size))
+                            pages += 1
+                            page = _Page()
+                        page.records.append(record)
+                        page.used += len(record)
+                    block.append(page.to_bytes(page_size))
+                    pages += 1
+                file.write(b''.join(block))
+        for spill in spills:
+            spill.close()
+
+        self._file.close()
+        os.replace(new_path, self._path)
+        self._file = open(self._path, 'r+b')
+        self._directory = directory
+        self._pages = pages
+        self._free = []
+        self._cache.clear()
+        self._writes += pages
+
+    @staticmethod
+    def _read_spill(spill) -> list:
+        """
+        Returns the (hash, record) pairs of a partition file written by _rehash
+        """
+        spill.seek(0)
+        data = spill.read()
+        return list(_records(data, 0, len(data)))
+
+    def reserve(self, count: int) -> None:
+        """
+        Makes sure the hash map can hold count entries in total without resizing again
+
+        Note: Entry size is estimated from the records already in the map (or _RECORD_GUESS bytes while it is empty). Never shrinks the table
+        """
+        record = self._bytes / self._size if self._size else _RECORD_GUESS
+        capacity = self._fit_capacity(int(count * record / (self._payload * self._max_fill)) + 1)
+        if capacity > self._capacity:
+            self.resize_table(capacity)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._directory.count(-1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the hash map, in file order
+        """
+        return DynamicArray(list(self._pairs()))
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, reading the page file front to back
+        """
+        for _, record in self._scan():
+            yield _record_key(record), _record_value(record)
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every entry, reading the page file front to back (the hash is the record's 64 bit one)
+        """
+        for hash, record in self._scan():
+            yield _record_key(record), _record_value(record), hash
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map and empties the page file. It does not change the underlying hash table capacity
+        """
+        self._size = 0
+        self._bytes = 0
+        self._version += 1
+        self._directory = array('q', [-1]) * self._capacity
+        self._cache.clear()
+        self._free = []
+        self._pages = 0
+        self._file.truncate(0)
+
+    def _chain_length(self, index: int) -> int:
+        """
+        Returns the number of entries in the bucket at index
+        """
+        return sum(1 for _ in self._chain(index))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get example (512 byte pages, 4 page cache)")
+    print("------------------------------------------------")
+    with DiskHashMap(11, 'murmur64', page_size=512, cache_pages=4) as m:
+        for i in range(2000):
+            m.put('str' + str(i), i * 100)
+        print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.empty_buckets())
+        print(m.get('str0'), m.get('str1999'), m.get('str2000'), m.contains_key('str42'))
+        print(m.get_page_stats()['pages'], m.get_page_stats()['cached_pages'])
+
+        print("\nremove / increment example")
+        print("--------------------------")
+        for i in range(0, 2000, 2):
+            m.remove('str' + str(i))
+        print(m.get_size(), m.get('str2'), m.get('str3'))
+        print(m.increment('str3'), m.increment('new', 5), m.setdefault('other', [1, 2]))
+
+        print("\nresize example")
+        print("--------------")
+        m.resize_table(97)
+        print(m.get_size(), m.get_capacity(), m.get('str1999'), m.get('new'))
+        print(sorted(m.keys())[:5])
@@ -0,0 +1,36 @@
+# Description: Small helpers shared by the HashMaps that don't belong in the provided
+#              a6_include module
+
+# <-- Notes -->
+# updated_value is the one rule every map's _upsert applies once it has found (or not found)
+# the key, so increment / setdefault / update_with behave the same on all of them. A missing key
+# is passed as MISSING rather than None, so a key that is mapped to None still counts as present
+# (setdefault keeps the None, update_with calls fn(None)), like it would in a dict.
+#
+# to_list lets put_many / get_many / remove_many (and the other batch entry points) take a
+# DynamicArray or any other iterable.
+
+from a6_include import DynamicArray
+
+# Stands in for the value of a key that is not in the map (None is a value a key can have)
+MISSING = object()
+
+
+def updated_value(current: object, fn, default: object) -> object:
+    """
+    Return the value an upsert stores for a key whose value is current (MISSING if the key is missing):
+    fn(current), or fn(default) for a missing key. Without fn (setdefault) the current value stays
+    """
+    if current is MISSING:
+        return default if fn is None else fn(default)
+    return current if fn is None else fn(current)
+
+
+def to_list(items) -> list:
+    """
+    Return the elements of a DynamicArray or of any other iterable as a list
+    (DynamicArray itself can't be iterated)
+    """
+    if isinstance(items, DynamicArray):
+        return [items.get_at_index(i) for i in range(items.length())]
+    return list(items)
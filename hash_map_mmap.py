@@ -0,0 +1,461 @@
+# Description: On-disk format for the HashMaps, and a read-only map served straight from the
+#              memory-mapped file (no rebuild on load)
+
+# <-- Notes -->
+# Loading a map with put costs one hash and one insert per entry, every time a process starts.
+# save_map writes the entries in a layout that can be searched where it lies, and MappedHashMap
+# mmaps that file and answers get / contains_key from the mapped bytes: opening it only reads
+# the header, and the OS pages in the parts of the file that lookups touch.
+#
+#   header     magic "HMAP", format version, flags, capacity, size, seed, PYTHONHASHSEED,
+#              hash function name
+#   offsets    capacity + 1 unsigned 64 bit offsets into the heap: bucket i's records are
+#              heap[offsets[i]:offsets[i + 1]], so an empty bucket has two equal offsets
+#   heap       the records, grouped by bucket (the 64 bit hash % capacity):
+#
+#                 | hash (8) | key length (4) | value length (4) | value type (1) | key | value |
+#
+# save_map writes the full hash every entry of the map already caches, so nothing is hashed
+# again and the file holds exactly the hashes the map used. The hash is stored (and bucketed)
+# as 64 unsigned bits, like DiskHashMap's page records, so both write the same hashes.
+#
+# A lookup hashes the key with the function named in the header, reads the two offsets of its
+# bucket and walks that bucket's records, comparing the stored hash first and the key bytes only
+# when the hashes match. Values are decoded only for the record that is returned: None, bools,
+# 64 bit ints, floats, str and bytes are stored as they are, anything else is pickled. Unpickling
+# can run any code the file asks for, so only load map files that come from a trusted source.
+#
+# A saved map is read back with the hash function it was saved with, so the function has
+# to be in the hash_functions registry (seeded variants keep their seed). Python's own hash
+# differs between processes, so "builtin" (seeded or not) is refused unless PYTHONHASHSEED is
+# set; its value goes in a field of its own next to the seed, and a process started with
+# another PYTHONHASHSEED can't load the file (every lookup would silently miss).
+
+import mmap
+import os
+import pickle
+import secrets
+import stat
+import struct
+import sys
+from array import array
+from functools import partial
+from operator import itemgetter
+
+from a6_include import DynamicArray
+from hash_functions import (get_hash_function, hash_batch, hash_function_name, is_salted,
+                            python_hash_seed, require_stable_hash)
+from hash_map_helpers import to_list
+from hash_map_views import ItemsView, KeysView, ValuesView
+
+_MAGIC = b'HMAP'
+_FORMAT_VERSION = 2
+_MASK_64 = (1 << 64) - 1
+
+# longest hash function name the header holds (ASCII, padded with zero bytes)
+_NAME_SIZE = 32
+# magic, format version, flags, capacity, size, seed, PYTHONHASHSEED, hash function name
+_HEADER = struct.Struct(f'<4sHHQQqq{_NAME_SIZE}s')
+# set in flags when the hash function is a seeded variant (the seed field holds its seed)
+_SEEDED = 1
+# set in flags when the hash function is Python's own hash (the PYTHONHASHSEED field holds it)
+_HASH_SEED = 2
+
+_OFFSET = struct.Struct('<Q')
+_BUCKET = struct.Struct('<QQ')
+# hash, key length, value length, value type (hash_map_disk fills its pages with the same records)
+RECORD = struct.Struct('<QIIB')
+
+# value types
+_NONE, _BOOL, _INT, _FLOAT, _STR, _BYTES, _PICKLE = range(7)
+_INT_VALUE = struct.Struct('<q')
+_FLOAT_VALUE = struct.Struct('<d')
+
+
+def encode_value(value: object) -> tuple:
+    """
+    Returns (value type, bytes) for a value
+    """
+    if value is None:
+        return _NONE, b''
+    if isinstance(value, bool):
+        return _BOOL, b'\x01' if value else b'\x00'
+    if type(value) is int and -(1 << 63) <= value < (1 << 63):
+        return _INT, _INT_VALUE.pack(value)
+    if type(value) is float:
+        return _FLOAT, _FLOAT_VALUE.pack(value)
+    if type(value) is str:
+        return _STR, value.encode('utf-8', 'surrogatepass')
+    if type(value) is bytes:
+        return _BYTES, value
+    return _PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode_value(kind: int, data) -> object:
+    """
+    Returns the value stored as (value type, bytes)
+    """
+    if kind == _INT:
+        return _INT_VALUE.unpack(data)[0]
+    if kind == _STR:
+        return data.decode('utf-8', 'surrogatepass')
+    if kind == _NONE:
+        return None
+    if kind == _BOOL:
+        return data == b'\x01'
+    if kind == _FLOAT:
+        return _FLOAT_VALUE.unpack(data)[0]
+    if kind == _BYTES:
+        return data
+    return pickle.loads(data)
+
+
+def _function_id(function) -> tuple:
+    """
+    Returns (registry name, seed, PYTHONHASHSEED, flags) of a hash function, raising ValueError if a file can't name it
+    """
+    name = hash_function_name(function)
+    if name is None:
+        raise ValueError("only hash functions in the hash_functions registry can be saved")
+    if not name.isascii() or len(name) > _NAME_SIZE:
+        raise ValueError(f"hash function name {name!r} can't be saved, it must be ASCII and at most {_NAME_SIZE} characters")
+    seed, hash_seed, flags = 0, 0, 0
+    # a seeded builtin hash needs both: its own seed and the process's PYTHONHASHSEED
+    if isinstance(function, partial) and function.keywords.get('seed') is not None:
+        seed = function.keywords['seed']
+        if not -(1 << 63) <= seed < (1 << 63):
+            raise ValueError(f"seed {seed} can't be saved, it must fit in 64 bits")
+        flags |= _SEEDED
+    if is_salted(function):
+        require_stable_hash(function)
+        hash_seed = python_hash_seed()
+        flags |= _HASH_SEED
+    return name, seed, hash_seed, flags
+
+
+def save_map(hash_map, path) -> None:
+    """
+    Writes every entry of a separate chaining or open addressing map to path in the format MappedHashMap reads
+
+    Notes: The file keeps the map's capacity and hash function. It is written to a uniquely named file next to path and renamed over it, so readers never see a half-written file and two saves to the same path can't mix. Raises ValueError before writing anything if the hash function can't be named in the file
+    """
+    name, seed, hash_seed, flags = _function_id(hash_map._hash_function)
+    capacity = max(1, hash_map.get_capacity())
+
+    # encode every entry with the hash the map cached for it, then group the records by bucket
+    records = []
+    for key, value, hash in hash_map._hashed_pairs():
+        hash &= _MASK_64
+        key_bytes = key.encode('utf-8', 'surrogatepass')
+        kind, value_bytes = encode_value(value)
+        record = RECORD.pack(hash, len(key_bytes), len(value_bytes), kind) + key_bytes + value_bytes
+        records.append((hash % capacity, record))
+    records.sort(key=itemgetter(0))
+
+    # offsets[i] = heap position of bucket i's first record
+    offsets = array('Q', bytes(8 * (capacity + 1)))
+    position = 0
+    bucket = 0
+    for index, record in records:
+        while bucket <= index:
+            offsets[bucket] = position
+            bucket += 1
+        position += len(record)
+    while bucket <= capacity:
+        offsets[bucket] = position
+        bucket += 1
+    if sys.byteorder == 'big':
+        # array uses the machine's byte order, the file is little endian
+        offsets.byteswap()
+
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, flags, capacity, len(records),
+                          seed, hash_seed, name.encode('ascii'))
+    directory, base = os.path.split(os.path.abspath(path))
+    name, file = _create_temporary(directory, base)
+    try:
+        with file:
+            file.write(header)
+            file.write(offsets.tobytes())
+            file.writelines(record for _, record in records)
+        # a file that is replaced keeps its permissions, a new one gets what open() would give it
+        if os.path.exists(path):
+            os.chmod(name, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(name, path)
+    except BaseException:
+        os.unlink(name)
+        raise
+
+
+def _create_temporary(directory: str, base: str) -> tuple:
+    """
+    Returns (path, binary file open for writing) of a new, uniquely named file in directory
+
+    Note: Created with mode 0o666 like open() does, so the process's umask applies (tempfile's files are owner-only)
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        name = os.path.join(directory, f'{base}.{secrets.token_hex(4)}.tmp')
+        try:
+            return name, os.fdopen(os.open(name, flags, 0o666), 'wb')
+        except FileExistsError:
+            continue
+
+
+def load_map(path) -> "MappedHashMap":
+    """
+    Returns a read-only MappedHashMap over a file written by save_map
+
+    Note: Values that aren't None, bools, 64 bit ints, floats, str or bytes are unpickled, which can run arbitrary code, so only load files from a trusted source
+    """
+    return MappedHashMap(path)
+
+
+class MappedHashMap:
+    """
+    Read-only HashMap served from a memory-mapped file written by save_map
+
+    Opening it reads only the header, however many entries the file holds; get and
+    contains_key read one bucket's offsets and records straight from the mapping
+
+    Values of other types than None, bools, 64 bit ints, floats, str and bytes are pickled in the
+    file and unpickled when read, which can run arbitrary code: only open files from a trusted source
+    """
+
+    # never written to, so iterators never see it change
+    _version = 0
+
+    def __init__(self, path) -> None:
+        """
+        Map the file at path and read its header
+
+        Note: Raises ValueError if the file is not in the save_map format, or uses the builtin hash and this process has another PYTHONHASHSEED
+        """
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{os.fspath(path)!r} is not a saved hash map")
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, capacity, count, seed, hash_seed, name = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"{os.fspath(path)!r} is not a saved hash map (version {_FORMAT_VERSION})")
+        if flags & _HASH_SEED and python_hash_seed() != hash_seed:
+            self._buffer.close()
+            raise ValueError(f"{os.fspath(path)!r} was saved with the builtin hash and PYTHONHASHSEED={hash_seed}, "
+                             f"start Python with the same PYTHONHASHSEED to load it")
+        name = name.rstrip(b'\x00').decode('ascii')
+        self._hash_function = get_hash_function(name, seed if flags & _SEEDED else None)
+        self._capacity = capacity
+        self._size = count
+        # the offsets table follows the header, the heap follows the table
+        self._table = _HEADER.size
+        self._heap = self._table + _OFFSET.size * (capacity + 1)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return f'MappedHashMap({self._size} entries / {self._capacity} buckets, {hash_function_name(self._hash_function)})'
+
+    def __enter__(self) -> "MappedHashMap":
+        """Return the map, for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """Unmap the file at the end of a with statement."""
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the file. The map can't be read afterwards
+        """
+        self._buffer.close()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map (number of buckets in the file)
+        """
+        return self._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the heap position of the key's record, or -1 if the key is not in the file
+        """
+        buffer = self._buffer
+        hash &= _MASK_64
+        start, end = _BUCKET.unpack_from(buffer, self._table + _OFFSET.size * (hash % self._capacity))
+        position = self._heap + start
+        end += self._heap
+        key_bytes = None
+        while position < end:
+            stored, key_length, value_length, _ = RECORD.unpack_from(buffer, position)
+            # compare the key bytes only when the hash matches
+            if stored == hash:
+                if key_bytes is None:
+                    key_bytes = key.encode('utf-8', 'surrogatepass')
+                key_start = position + RECORD.size
+                if key_length == len(key_bytes) and buffer[key_start:key_start + key_length] == key_bytes:
+                    return position
+            position += RECORD.size + key_length + value_length
+        return -1
+
+    def _value(self, position: int) -> object:
+        """
+        Returns the decoded value of the record at position
+        """
+        _, key_length, value_length, kind = RECORD.unpack_from(self._buffer, position)
+        start = position + RECORD.size + key_length
+        return decode_value(kind, self._buffer[start:start + value_length])
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, the method returns None
+        """
+        return self._get(key, self._hash_function(key))
+
+    def _get(self, key: str, hash: int) -> object:
+        """
+        Same as get, but takes the key's already computed (un-modded) hash
+        """
+        position = self._find(key, hash)
+        if position < 0:
+            return None
+        return self._value(position)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False
+        """
+        return self._find(key, self._hash_function(key)) >= 0
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        keys = to_list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        get = self._get
+        return DynamicArray([get(key, hash) for key, hash in zip(keys, hashes)])
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry, bucket by bucket
+        """
+        return DynamicArray(list(self._pairs()))
+
+    def keys(self) -> KeysView:
+        """
+        Returns a view of the keys in the file
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a view of the values in the file
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a view of the (key, value) pairs in the file
+        """
+        return ItemsView(self)
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, reading the heap front to back
+        """
+        buffer = self._buffer
+        position = self._heap
+        end = len(buffer)
+        while position < end:
+            _, key_length, value_length, kind = RECORD.unpack_from(buffer, position)
+            key_start = position + RECORD.size
+            value_start = key_start + key_length
+            position = value_start + value_length
+            yield (buffer[key_start:value_start].decode('utf-8', 'surrogatepass'),
+                   decode_value(kind, buffer[value_start:position]))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import tempfile
+
+    import hash_map_oa
+    import hash_map_sc
+
+    directory = tempfile.mkdtemp()
+
+    print("\nsave / load example (separate chaining)")
+    print("---------------------------------------")
+    m = hash_map_sc.HashMap(11, 'murmur64')
+    for i in range(100):
+        m.put('str' + str(i), i * 100)
+    path = os.path.join(directory, 'sc.hmap')
+    m.save(path)
+    with load_map(path) as loaded:
+        print(loaded)
+        print(loaded.get('str0'), loaded.get('str99'), loaded.get('str100'))
+        print(loaded.contains_key('str42'), loaded.contains_key('missing'))
+
+    print("\nsave / load example (open addressing, mixed values)")
+    print("---------------------------------------------------")
+    m = hash_map_oa.ArrayHashMap(11, 'fnv1a')
+    values = [None, True, -7, 2 ** 70, 3.5, 'text', b'raw', (1, 2), ['a']]
+    for i, value in enumerate(values):
+        m.put('key' + str(i), value)
+    path = os.path.join(directory, 'oa.hmap')
+    m.save(path)
+    with load_map(path) as loaded:
+        print(loaded.get_size(), loaded.get_capacity())
+        print(loaded.get_many(['key' + str(i) for i in range(len(values))]))
+        print(sorted(loaded.keys()))
+
+    print("\nsave errors example")
+    print("-------------------")
+    from hash_functions import fnv1a, register_hash_function
+
+    def long_named_fnv1a(key: str) -> int:
+        return fnv1a(key)
+
+    register_hash_function('fnv1a_with_a_name_too_long_for_the_header', long_named_fnv1a)
+    for function in (long_named_fnv1a, lambda key: 0):
+        m = hash_map_sc.HashMap(11, function)
+        m.put('key', 1)
+        try:
+            m.save(os.path.join(directory, 'error.hmap'))
+        except ValueError as error:
+            print(error)
+    # nothing was written, not even a temporary file
+    print(sorted(os.listdir(directory)))
+
+    print("\nsave permissions example")
+    print("------------------------")
+    m = hash_map_sc.HashMap(11, 'fnv1a')
+    m.put('key', 1)
+    path = os.path.join(directory, 'mode.hmap')
+    # a new file gets 0o666 less the umask, like open() would give it
+    umask = os.umask(0o027)
+    m.save(path)
+    os.umask(umask)
+    print(oct(stat.S_IMODE(os.stat(path).st_mode)))
+    # saving over an existing file keeps that file's permissions
+    os.chmod(path, 0o600)
+    m.save(path)
+    print(oct(stat.S_IMODE(os.stat(path).st_mode)))
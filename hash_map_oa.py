@@ -26,27 +26,62 @@
 #
 
 
+import copy
+
 from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
                         hash_function_1, hash_function_2)
+from hash_functions import get_hash_function, hash_batch
+from hash_map_helpers import MISSING, to_list, updated_value
+from hash_map_mmap import save_map
+from hash_map_stats import (collision_rates, disable_stats, enable_stats,
+                            histogram_mean, sorted_histogram)
+from hash_map_views import ItemsView, KeysView, MapIterator, ValuesView
+from primes import (grow_capacity, is_power_of_two, is_prime, ladder_capacity,
+                    next_power_of_two, next_prime)
+
+# slot states reported by _slot_state
+_EMPTY, _LIVE, _DELETED = 0, 1, 2
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    # highest load factor (live entries plus tombstones) put allows before it makes room;
+    # quadratic probing on a prime table is only sure to find a free slot up to 0.5
+    _max_load = 0.5
+    # True while a snapshot shares the slot arrays (the next write copies them first)
+    _shared = False
+    # bumped by every write, so iterators can tell the map changed under them
+    _version = 0
+    # slots examined, added up by the probe walks while stats mode sets _counting (it zeroes _steps
+    # around each operation). With _counting off the walks don't count at all
+    _steps = 0
+    _counting = False
+
+    def __init__(self, capacity: int, function,
+                 tombstone_fraction: float = 0.25) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+
+        function can be a hash function or the name of one in the hash_functions registry
+        tombstone_fraction is the share of the capacity that deleted slots may
+        take up before remove cleans them out with a same-capacity rehash
         """
         self._buckets = DynamicArray()
 
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        self._capacity = self._round_capacity(capacity)
         for _ in range(self._capacity):
             self._buckets.append(None)
 
-        self._hash_function = function
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
         self._size = 0
 
+        # deleted slot accounting
+        self._tombstones = 0
+        self._tombstone_fraction = tombstone_fraction
+        self._compactions = 0
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
@@ -60,35 +95,39 @@ class HashMap:
     def _next_prime(self, capacity: int) -> int:
         """
         Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if capacity == 2 or capacity == 3:
-            return True
+        return is_prime(capacity)
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity used for a requested one: the next prime (Pow2HashMap rounds to a power of two instead)
+        """
+        return self._next_prime(capacity)
 
-        if capacity == 1 or capacity % 2 == 0:
-            return False
+    def _valid_capacity(self, capacity: int) -> bool:
+        """
+        Returns True if capacity can be used as it is: a prime (a power of two for Pow2HashMap)
+        """
+        return self._is_prime(capacity)
 
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
+    def _grow_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity a full table grows to: the next (roughly double) prime on the ladder
+        """
+        return grow_capacity(capacity)
 
-        return True
+    def _fit_capacity(self, count: int) -> int:
+        """
+        Returns the smallest capacity on the prime ladder that is at least count
+        """
+        return ladder_capacity(count)
 
     def get_size(self) -> int:
         """
@@ -104,6 +143,18 @@ class HashMap:
         """
         return self._capacity
 
+    def get_tombstone_count(self) -> int:
+        """
+        Return number of deleted (tombstone) slots in the table
+        """
+        return self._tombstones
+
+    def get_compaction_count(self) -> int:
+        """
+        Return number of same-capacity cleanup rehashes that have run
+        """
+        return self._compactions
+
     # ------------------------------------------------------------------ #
 
     # ALL METHODS should be kept in 0(1) runtime complexity
@@ -112,37 +163,184 @@ class HashMap:
         """
         Updates the key/value pair in the hash map. If the given key already exists in the hash map, its associated value must be replaced with the new value. If the given key is not in the hash map, a new key/value pair must be added
 
-        Notes: If the current load factor of the table is greater than or equal to 0.5, the table must be resized to double its current capacity
+        Notes: If the current load factor of the table (counting tombstones, since they lengthen probe chains just like live entries) is greater than or equal to 0.5, the table is rehashed: at the next capacity on the prime ladder (roughly double, see primes.grow_capacity: 53 -> 97, 113 -> 193), or at the same capacity when most of the occupied slots are tombstones
         """
-        # if table load is greater than half double table size
-        if self.table_load() >= 0.5:
-            # doube capacity
-            self.resize_table(self.get_capacity() * 2)
-        
-        # get the key's hash and set step to 0
-        hash = self._hash_function(key) % self.get_capacity()
+        # get the key's full hash, it is cached in the entry
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash: int) -> None:
+        """
+        Same as put, but takes the key's already computed (un-modded) hash
+        """
+        self._prepare_insert()
+        self._insert(key, value, hash)
+
+    def _prepare_insert(self) -> None:
+        """
+        Gets the map ready for one more key: copies slot arrays a snapshot still shares, bumps the version and makes room if the table is at its maximum load
+        """
+        if self._shared:
+            self._unshare()
+        self._version += 1
+
+        # if effective table load is greater than half make room
+        if self._needs_room():
+            self._make_room()
+
+    def _needs_room(self) -> bool:
+        """
+        Returns True if the table is at its maximum load (live entries plus tombstones), so one more key needs _make_room first
+        """
+        return self._size + self._tombstones >= self._capacity * self._max_load
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+
+        Note: Callers make sure there is room (put checks the load, put_many presizes)
+        """
+        # get the key's home bucket and set step to 0
+        home = hash % self.get_capacity()
         step = 0
+        # first reusable spot found (empty or deleted)
+        free = None
 
         # loop through all buckets
         for step in range(self.get_capacity()):
 
             #  i = iinitial + j^(2)
             # calculate index with quadratic probing
-            index = (hash + step * step) % self.get_capacity()
+            index = (home + step * step) % self.get_capacity()
             
-            # if we find an empty spot or a spot with a deleted value (is_tombstone)
+            # an empty spot ends the probe chain, so the key is new
             item = self._buckets.get_at_index(index)
-            if item is None or \
-                item.is_tombstone:
-                # set the value at that spot to the item and increment the size
-                self._buckets.set_at_index(index, HashEntry(key, value))
-                self._size += 1
-                return
-            # else if same key is found update the value
-            elif item.key == key:
+            if item is None:
+                if free is None:
+                    free = index
+                break
+            # remember a spot with a deleted value (is_tombstone), but the key
+            # may still be further along the chain
+            elif item.is_tombstone:
+                if free is None:
+                    free = index
+            # else if same key is found update the value (cheap hash check first)
+            elif item.hash == hash and item.key == key:
                 item.value = value
+                if self._counting:
+                    self._steps += step + 1
                 return
 
+        if self._counting:
+            self._steps += step + 1
+        # reusing a deleted spot takes it out of the tombstone count
+        if self._buckets.get_at_index(free) is not None:
+            self._tombstones -= 1
+        # set the value at that spot to the item and increment the size
+        self._buckets.set_at_index(free, HashEntry(key, value, hash))
+        self._size += 1
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the key's value (a missing key starts at 0) and returns the new value
+
+        Note: The key's slot is located once and the value changed in place, instead of contains_key + get + put walking the probe chain three times
+        """
+        return self._update(key, self._hash_function(key), lambda value: value + delta, 0)
+
+    def setdefault(self, key: str, default: object) -> object:
+        """
+        Returns the key's value, first putting default there if the key is missing
+        """
+        return self._update(key, self._hash_function(key), None, default)
+
+    def update_with(self, key: str, fn, default: object = None) -> object:
+        """
+        Replaces the key's value with fn(value), or puts fn(default) if the key is missing, and returns the new value
+
+        Note: A key mapped to None is present, so fn gets None (get can't tell such a key from a missing one)
+        """
+        return self._update(key, self._hash_function(key), fn, default)
+
+    def _update(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Same as update_with (fn None meaning setdefault), but takes the key's already computed (un-modded) hash
+
+        Note: Only a new key copies shared slot arrays, grows the table or bumps the version. Changing an existing key's value leaves open iterators alone, and a setdefault hit only reads
+        """
+        # a full or shared table must not be grown or copied for a key that is already there,
+        # so look first (the extra walk is only paid in those rare cases)
+        if self._shared or self._needs_room():
+            current = type(self)._get(self, key, hash, MISSING)
+            if current is MISSING:
+                self._prepare_insert()
+                return self._upsert(key, hash, fn, default)
+            if fn is None:
+                return current
+            if self._shared:
+                self._unshare()
+
+        size = self._size
+        value = self._upsert(key, hash, fn, default)
+        # only a new key changes what iterators walk
+        if self._size != size:
+            self._version += 1
+        return value
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place, or places the key in the first free slot of its probe chain, in one walk (without checking the load factor)
+        """
+        buckets = self._buckets
+        capacity = self._capacity
+        home = hash % capacity
+        free = None
+
+        # same walk as _insert
+        for step in range(capacity):
+            index = (home + step * step) % capacity
+            item = buckets.get_at_index(index)
+            if item is None:
+                if free is None:
+                    free = index
+                break
+            elif item.is_tombstone:
+                if free is None:
+                    free = index
+            elif item.hash == hash and item.key == key:
+                item.value = value = updated_value(item.value, fn, default)
+                if self._counting:
+                    self._steps += step + 1
+                return value
+
+        if self._counting:
+            self._steps += step + 1
+        value = updated_value(MISSING, fn, default)
+        if buckets.get_at_index(free) is not None:
+            self._tombstones -= 1
+        buckets.set_at_index(free, HashEntry(key, value, hash))
+        self._size += 1
+        return value
+
+    def _make_room(self) -> None:
+        """
+        Rehashes a table whose live entries plus tombstones reached the maximum load (half the capacity)
+
+        Note: If live entries alone fill at least half of that (a quarter of the table) it grows to the next ladder prime, otherwise it is compacted at the same capacity
+        """
+        if self._size >= self._capacity * self._max_load * 0.5:
+            # grow to the next (roughly double) prime on the ladder
+            self.resize_table(self._grow_capacity(self._capacity))
+        else:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Rehashes the table at its current capacity, dropping every tombstone
+        """
+        self._rehash()
+        self._tombstones = 0
+        self._compactions += 1
+
     def resize_table(self, new_capacity: int) -> None:
         """
         Changes the capacity of the underlying table. All active key/value pairs must be put into the new table, meaning all non-tombstone hash table links must be rehashed
@@ -153,20 +351,43 @@ class HashMap:
         if new_capacity < self.get_size():
             return
         
-        # store old bucket data
-        oldData = self._buckets
-
-        # update capacity and clear buckets
+        # update capacity (must be prime), growing it like put would until
+        # the load factor stays below the maximum (0.5) once every entry is placed
+        if not self._valid_capacity(new_capacity):
+            new_capacity = self._round_capacity(new_capacity)
+        while self.get_size() - 1 >= new_capacity * self._max_load:
+            new_capacity = self._grow_capacity(new_capacity)
         self._capacity = new_capacity
-        if not self._is_prime(new_capacity):
-            self._capacity = self._next_prime(new_capacity)
-        self.clear()
+        self._version += 1
+
+        # tombstones are not carried over
+        self._rehash()
+        self._tombstones = 0
+
+    def _rehash(self) -> None:
+        """
+        Moves every live entry of the current buckets straight into a fresh bucket array sized to the (already updated) capacity
+
+        Notes: Keys in the old buckets are already unique, so there are no duplicate or load factor checks. Entries are moved as is (cached hash included) and tombstones are dropped
+        """
+        oldData = self._buckets
+        capacity = self._capacity
+        buckets = [None] * capacity
 
-        # loop through old data and reinsert into new data
+        # loop through old data and place each live entry in the first empty slot
         for i in range(oldData.length()):
             item = oldData.get_at_index(i)
-            if item is not None and not item.is_tombstone:
-                self.put(item.key, item.value)
+            if item is None or item.is_tombstone:
+                continue
+            home = item.hash % capacity
+            index = home
+            step = 0
+            while buckets[index] is not None:
+                step += 1
+                index = (home + step * step) % capacity
+            buckets[index] = item
+
+        self._buckets = DynamicArray(buckets)
 
                 
 
@@ -196,22 +417,35 @@ class HashMap:
         Returns the value associated with the given key. If the key is not in the hash map, the method returns None
         """
         # calculate hash
-        hash = self._hash_function(key) % self.get_capacity()
+        return self._get(key, self._hash_function(key))
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        home = hash % self.get_capacity()
         step = 0
 
         # loop through buckets
         for step in range(self.get_capacity()):
             # calculate index with quadratic probing
-            index = (hash + step * step) % self.get_capacity()
+            index = (home + step * step) % self.get_capacity()
             # get item index
             item = self._buckets.get_at_index(index)
-            # return None if not found
+            # return default if not found
             if item is None:
-                return None
-            # if key is found and item is not dead
-            elif item.key == key and not item.is_tombstone:
+                if self._counting:
+                    self._steps += step + 1
+                return default
+            # if key is found (cheap hash check first) and item is not dead
+            elif item.hash == hash and item.key == key and not item.is_tombstone:
+                if self._counting:
+                    self._steps += step + 1
                 # return value associated with key
                 return item.value
+        if self._counting:
+            self._steps += self._capacity
+        return default
 
     def contains_key(self, key: str) -> bool:
         """
@@ -226,24 +460,43 @@ class HashMap:
 
         Notes: Same process as put but removing instead of putting
         """
+        if self._shared:
+            self._unshare()
+        self._version += 1
         # calculate hash
-        hash = self._hash_function(key) % self.get_capacity()
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        home = hash % self.get_capacity()
         step = 0
 
         # loop through buckets
         for step in range(self.get_capacity()):
             # calculate index with quadratic probing
-            index = (hash + step * step) % self.get_capacity()
+            index = (home + step * step) % self.get_capacity()
             # get item index
             item = self._buckets.get_at_index(index)
              # return None if not found
             if item is None:
+                if self._counting:
+                    self._steps += step + 1
                 return
-            # if key is found update size and "kill" the value/key
-            elif item.key == key:
+            # if key is found (and not already dead) update size and "kill" the value/key
+            elif item.hash == hash and item.key == key and not item.is_tombstone:
+                if self._counting:
+                    self._steps += step + 1
                 self._size -= 1
                 item.is_tombstone = True
+                self._tombstones += 1
+                # clean up once dead slots take up too much of the table
+                if self._tombstones > self._capacity * self._tombstone_fraction:
+                    self._compact()
                 return
+        if self._counting:
+            self._steps += self._capacity
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -264,44 +517,1712 @@ class HashMap:
         """
         Clears the contents of the hash map. It does not change the underlying hash table capacity
         """
-        # reset bucket data (emptying)
+        # reset bucket data (emptying), a snapshot keeps the old array so there is nothing to copy later
         self._buckets = DynamicArray()
-        # reset size
+        self._shared = False
+        # reset size and tombstones
         self._size = 0
+        self._tombstones = 0
+        self._version += 1
         # set bucket contents to None
         for _ in range(self._capacity):
             self._buckets.append(None)
 
-    def __iter__(self):
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair into the hash map, same as calling put on each pair in order
+
+        Note: pairs can be a DynamicArray or any iterable. The table is sized once up front for all of them, so the loop never has to check the load factor or resize
         """
-        Enables the hash map to iterate across itself (similiar to Encapsulation and Iterators exploration)
+        if self._shared:
+            self._unshare()
+        self._version += 1
+        pairs = to_list(pairs)
+        self.reserve(self._size + len(pairs))
+
+        # hash the whole batch at once, then hoist the lookup out of the loop
+        hashes = hash_batch(self._hash_function, [pair[0] for pair in pairs])
+        insert = self._insert
+        for (key, value), hash in zip(pairs, hashes):
+            insert(key, value, hash)
+
+    def get_many(self, keys) -> DynamicArray:
         """
-        # initialize iter value
-        self._iterVal = 0
-        return self
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
 
-    def __next__(self):
+        Note: keys can be a DynamicArray or any iterable
         """
-        Return the next item in the hash map, based on the current location of the iterator
+        keys = to_list(keys)
+        # hash the whole batch at once, then hoist the lookup out of the loop
+        hashes = hash_batch(self._hash_function, keys)
+        get = self._get
+        return DynamicArray([get(key, hash) for key, hash in zip(keys, hashes)])
 
-        Note: Only needs to iterate over active items
+    def remove_many(self, keys) -> None:
         """
-        # if we've iterated to the end of the map
-        if self._iterVal >= self._capacity:
-            # stop
-            raise StopIteration
-        
-        # while were still in the map
-        while self._iterVal < self.get_capacity():
-            # iterate through map
-            item = self._buckets.get_at_index(self._iterVal)
-            self._iterVal += 1
-            # if next item exists and is not dead (only active items)
+        Removes every given key that is in the hash map
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        if self._shared:
+            self._unshare()
+        self._version += 1
+        keys = to_list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        remove = self._remove
+        for key, hash in zip(keys, hashes):
+            remove(key, hash)
+
+    def reserve(self, count: int) -> None:
+        """
+        Makes sure the hash map can hold count entries in total without resizing again
+
+        Note: Grows straight to the ladder prime that keeps the load factor (counting tombstones) below 0.5, and never shrinks the table
+        """
+        if count + self._tombstones >= self._capacity * self._max_load:
+            self.resize_table(self._fit_capacity(int(count / self._max_load) + 1))
+
+    def analyze(self) -> dict:
+        """
+        Returns a report on how well the table is laid out, without building the key/value array:
+
+            probe_lengths_hit / _miss   histograms {slots examined: count} for a get of every stored key,
+                                        and for a get of a missing key starting at each possible home slot
+            average_probe_hit / _miss   means of those histograms, max_probe_hit the worst stored key
+            tombstone_density           deleted slots / capacity
+            longest_cluster             longest run of occupied (live or deleted) slots, wrapping around
+            expected_collision_rate     share of keys expected to land on an occupied home slot with a uniform hash
+            observed_collision_rate     share of keys that actually share their home slot with an earlier key
+        """
+        capacity = self._capacity
+        hits = {}
+        homes = bytearray(capacity)
+        tombstones = 0
+        longest = run = leading = 0
+
+        # one pass over the slots
+        for index in range(capacity):
+            state, hash = self._slot_state(index)
+
+            if state == _EMPTY:
+                # a run that started at slot 0 may join the one at the end of the table
+                if run == index:
+                    leading = run
+                run = 0
+                continue
+
+            run += 1
+            longest = max(longest, run)
+            if state == _DELETED:
+                tombstones += 1
+                continue
+
+            # count the slots a get of this key examines before it gets here
+            home = self._home(hash)
+            homes[home] = 1
+            steps = 1
+            for probe in self._probe_from(home):
+                if probe == index:
+                    break
+                steps += 1
+            hits[steps] = hits.get(steps, 0) + 1
+
+        # wrap the last run around into the first one
+        if run == capacity:
+            longest = capacity
+        else:
+            longest = max(longest, run + leading)
+
+        # a miss starting from each possible home slot
+        misses = {}
+        for home in range(capacity):
+            steps = self._miss_steps(home)
+            misses[steps] = misses.get(steps, 0) + 1
+
+        expected, observed = collision_rates(self._size, capacity, sum(homes))
+        return {
+            'size': self._size,
+            'capacity': capacity,
+            'load': self.table_load(),
+            'probe_lengths_hit': sorted_histogram(hits),
+            'average_probe_hit': histogram_mean(hits),
+            'max_probe_hit': max(hits, default=0),
+            'probe_lengths_miss': sorted_histogram(misses),
+            'average_probe_miss': histogram_mean(misses),
+            'tombstones': tombstones,
+            'tombstone_density': tombstones / capacity,
+            'longest_cluster': longest,
+            'expected_collision_rate': expected,
+            'observed_collision_rate': observed,
+        }
+
+    def snapshot(self) -> "HashMapSnapshot":
+        """
+        Returns a read-only view of the map as it is right now
+
+        Note: The view shares the slot arrays with the map, so taking it copies nothing. The map's next put / remove copies the arrays first (copy-on-write), so later writes never show up in the view and scanning the view never blocks writers
+        """
+        return HashMapSnapshot(self)
+
+    def _unshare(self) -> None:
+        """
+        Gives the map its own copy of the slot arrays, which a snapshot still shares
+        """
+        self._copy_slots()
+        self._shared = False
+
+    def _copy_slots(self) -> None:
+        """
+        Replaces the slot arrays with copies (entries too, since put and remove change them in place)
+        """
+        buckets = []
+        for i in range(self._buckets.length()):
+            item = self._buckets.get_at_index(i)
+            if item is not None:
+                entry = HashEntry(item.key, item.value, item.hash)
+                entry.is_tombstone = item.is_tombstone
+                item = entry
+            buckets.append(item)
+        self._buckets = DynamicArray(buckets)
+
+    def save(self, path) -> None:
+        """
+        Writes the map to path in the on-disk format that hash_map_mmap.load_map maps back in without rebuilding it
+
+        Note: The file keeps the capacity and hash function (which must be a registered one, see hash_map_mmap)
+        """
+        save_map(self, path)
+
+    def enable_stats(self) -> None:
+        """
+        Starts counting operations, hits/misses, probe steps and resizes (see hash_map_stats)
+
+        Note: Instrumented methods are swapped in on this map only, and its walks only count steps while they are, so a map with stats off pays nothing. Probe steps are the ones the operations themselves walked, so counting them never repeats a lookup
+        """
+        enable_stats(self)
+
+    def disable_stats(self) -> None:
+        """
+        Stops counting and restores the uninstrumented methods
+        """
+        disable_stats(self)
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the counters, or None if stats are not enabled
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is None:
+            return None
+        snapshot = stats.snapshot()
+        snapshot['compactions'] = self._compactions
+        return snapshot
+
+    def reset_stats(self) -> None:
+        """
+        Sets all counters back to zero (stats stay enabled)
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is not None:
+            stats.reset()
+
+    def _miss_steps(self, home: int) -> int:
+        """
+        Returns the slots a get of a missing key examines from a home slot: up to and including the first empty one
+        """
+        steps = 1
+        for index in self._probe_from(home):
+            if self._slot_state(index)[0] == _EMPTY:
+                break
+            steps += 1
+        return steps
+
+    def _slot_state(self, index: int) -> tuple:
+        """
+        Returns (state, cached hash) of the slot at index, state being _EMPTY, _LIVE or _DELETED
+        """
+        item = self._buckets.get_at_index(index)
+        if item is None:
+            return _EMPTY, None
+        return (_DELETED if item.is_tombstone else _LIVE), item.hash
+
+    def _home(self, hash: int) -> int:
+        """
+        Returns the first slot probed for a hash
+        """
+        return hash % self._capacity
+
+    def _probe_from(self, home: int):
+        """
+        Yields the slots probed from a home slot, in order (quadratic probing)
+        """
+        capacity = self._capacity
+        for step in range(capacity):
+            yield (home + step * step) % capacity
+
+    def keys(self) -> KeysView:
+        """
+        Returns a live view of the keys in the hash map
+
+        Note: The view walks the table only while it is iterated, nothing is copied. len() and "in" on it answer straight from the map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a live view of the values in the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a live view of the (key, value) pairs in the hash map
+        """
+        return ItemsView(self)
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every active entry, in slot order
+        """
+        buckets = self._buckets
+        # the walk reads the bucket array the generator started with (a write ends the iteration anyway)
+        for i in range(buckets.length()):
+            item = buckets.get_at_index(i)
+            # only active items
+            if item is not None and not item.is_tombstone:
+                yield item.key, item.value
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every active entry, in slot order, with each entry's cached (un-modded) hash
+        """
+        buckets = self._buckets
+        for i in range(buckets.length()):
+            item = buckets.get_at_index(i)
             if item is not None and not item.is_tombstone:
-                # return the next item in map
-                return item
-        # stop when we've iterated through completely
-        raise StopIteration
+                yield item.key, item.value, item.hash
+
+    def __iter__(self) -> MapIterator:
+        """
+        Enables the hash map to iterate across itself, yielding a HashEntry per active item
+
+        Note: Every call returns a new iterator with its own position, so loops can be nested. Writing to the map while iterating makes the next step raise RuntimeError
+        """
+        return MapIterator(self, (HashEntry(key, value) for key, value in self._pairs()))
+
+
+class HashMapSnapshot:
+    """
+    Read-only view of an open addressing HashMap (any of the variants) at the moment
+    snapshot() was called.
+
+    It holds a shallow copy of the map that shares its slot arrays, and the live map copies
+    those arrays before its next write. Reads on the view use the same engine code as the map,
+    and every iteration gets its own cursor, so any number of scans can run side by side
+    """
+
+    def __init__(self, hash_map: HashMap) -> None:
+        """
+        Take a snapshot of hash_map
+        """
+        view = copy.copy(hash_map)
+        # stats mode lives on the instance, don't count reads of the view on the live map
+        disable_stats(view)
+        self._map = view
+        hash_map._shared = True
+
+    def get_size(self) -> int:
+        """
+        Return size of the map when the snapshot was taken
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of the map when the snapshot was taken
+        """
+        return self._map.get_capacity()
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor of the map when the snapshot was taken
+        """
+        return self._map.table_load()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets when the snapshot was taken
+        """
+        return self._map.empty_buckets()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value the key had when the snapshot was taken, or None
+        """
+        return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the key was in the map when the snapshot was taken
+        """
+        return self._map.contains_key(key)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
+        """
+        return self._map.get_many(keys)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry when the snapshot was taken
+        """
+        return self._map.get_keys_and_values()
+
+    def analyze(self) -> dict:
+        """
+        Returns the map's analyze() report for the table when the snapshot was taken
+        """
+        return self._map.analyze()
+
+    def keys(self) -> KeysView:
+        """
+        Returns a view of the keys when the snapshot was taken
+        """
+        return self._map.keys()
+
+    def values(self) -> ValuesView:
+        """
+        Returns a view of the values when the snapshot was taken
+        """
+        return self._map.values()
+
+    def items(self) -> ItemsView:
+        """
+        Returns a view of the (key, value) pairs when the snapshot was taken
+        """
+        return self._map.items()
+
+    def __iter__(self) -> MapIterator:
+        """
+        Returns a new iterator over the entries when the snapshot was taken (each with its own cursor)
+        """
+        return iter(self._map)
+
+
+
+# Marks a slot in ArrayHashMap whose entry has been removed ("deleted" slot)
+_TOMBSTONE = object()
+
+
+class ArrayHashMap(HashMap):
+    """
+    HashMap that uses the same quadratic probing as HashMap, but stores its
+    entries as a struct of arrays: keys, values and cached (un-modded) hashes
+    live in three parallel lists instead of one HashEntry object per slot.
+
+    Slot state is encoded in the key list: None marks an empty slot and the
+    _TOMBSTONE sentinel marks a deleted one, so put, get, remove and
+    resize_table never allocate or dereference per-entry objects.
+    """
+
+    def __init__(self, capacity: int, function,
+                 tombstone_fraction: float = 0.25) -> None:
+        """
+        Initialize new HashMap that uses parallel arrays for its entries
+        """
+        # capacity must be a prime number
+        self._capacity = self._round_capacity(capacity)
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
+        self._size = 0
+
+        # deleted slot accounting
+        self._tombstones = 0
+        self._tombstone_fraction = tombstone_fraction
+        self._compactions = 0
+
+        # parallel slot arrays (key None = empty, key _TOMBSTONE = deleted)
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._hashes = [0] * self._capacity
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            key = self._keys[i]
+            if key is None:
+                slot = 'None'
+            elif key is _TOMBSTONE:
+                slot = 'TOMBSTONE'
+            else:
+                slot = f"K: {key} V: {self._values[i]} TS: False"
+            out += str(i) + ': ' + slot + '\n'
+        return out
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        # hoist the arrays into locals for the probe loop
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+
+        home = hash % capacity
+        # first deleted slot seen, reused if the key turns out to be new
+        free = -1
+
+        for step in range(capacity):
+            # calculate index with quadratic probing
+            index = (home + step * step) % capacity
+            slot = keys[index]
+
+            # end of the probe chain, the key is not in the map
+            if slot is None:
+                if free < 0:
+                    free = index
+                break
+            # remember the first deleted slot but keep looking for the key
+            if slot is _TOMBSTONE:
+                if free < 0:
+                    free = index
+            # same key found (cheap hash check first) so update the value
+            elif hashes[index] == hash and slot == key:
+                self._values[index] = value
+                if self._counting:
+                    self._steps += step + 1
+                return
+
+        if self._counting:
+            self._steps += step + 1
+        # store the new entry in the first free slot found
+        if keys[free] is _TOMBSTONE:
+            self._tombstones -= 1
+        keys[free] = key
+        self._values[free] = value
+        hashes[free] = hash
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place, or places the key in the first free slot of its probe chain, in one walk (without checking the load factor)
+        """
+        keys = self._keys
+        hashes = self._hashes
+        values = self._values
+        capacity = self._capacity
+
+        home = hash % capacity
+        free = -1
+
+        # same walk as _insert
+        for step in range(capacity):
+            index = (home + step * step) % capacity
+            slot = keys[index]
+            if slot is None:
+                if free < 0:
+                    free = index
+                break
+            if slot is _TOMBSTONE:
+                if free < 0:
+                    free = index
+            elif hashes[index] == hash and slot == key:
+                values[index] = value = updated_value(values[index], fn, default)
+                if self._counting:
+                    self._steps += step + 1
+                return value
+
+        if self._counting:
+            self._steps += step + 1
+        value = updated_value(MISSING, fn, default)
+        if keys[free] is _TOMBSTONE:
+            self._tombstones -= 1
+        keys[free] = key
+        values[free] = value
+        hashes[free] = hash
+        self._size += 1
+        return value
+
+    def _rehash(self) -> None:
+        """
+        Moves every live entry of the current arrays straight into fresh arrays sized to the (already updated) capacity
+
+        Notes: Cached hashes are reused, so the hash function is never called, and no per-entry objects are touched
+        """
+        # store old array data
+        old_keys, old_values, old_hashes = self._keys, self._values, self._hashes
+
+        capacity = self._capacity
+        keys = self._keys = [None] * capacity
+        values = self._values = [None] * capacity
+        hashes = self._hashes = [0] * capacity
+
+        # every old key is unique so place it in the first empty slot
+        for i in range(len(old_keys)):
+            key = old_keys[i]
+            if key is None or key is _TOMBSTONE:
+                continue
+            hash = old_hashes[i]
+            home = hash % capacity
+            step = 0
+            index = home
+            while keys[index] is not None:
+                step += 1
+                index = (home + step * step) % capacity
+            keys[index] = key
+            values[index] = old_values[i]
+            hashes[index] = hash
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._keys.count(None)
+
+    def _copy_slots(self) -> None:
+        """
+        Replaces the slot arrays with copies
+        """
+        self._keys = self._keys.copy()
+        self._values = self._values.copy()
+        self._hashes = self._hashes.copy()
+
+    def _slot_state(self, index: int) -> tuple:
+        """
+        Returns (state, cached hash) of the slot at index, state being _EMPTY, _LIVE or _DELETED
+        """
+        key = self._keys[index]
+        if key is None:
+            return _EMPTY, None
+        if key is _TOMBSTONE:
+            return _DELETED, None
+        return _LIVE, self._hashes[index]
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Returns the value associated with the key (given its hash), or default if the key is not in the hash map
+        """
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+
+        home = hash % capacity
+
+        for step in range(capacity):
+            # calculate index with quadratic probing
+            index = (home + step * step) % capacity
+            slot = keys[index]
+            # an empty slot ends the probe chain
+            if slot is None:
+                if self._counting:
+                    self._steps += step + 1
+                return default
+            # tombstones never compare equal to a key
+            if hashes[index] == hash and slot == key:
+                if self._counting:
+                    self._steps += step + 1
+                return self._values[index]
+        if self._counting:
+            self._steps += capacity
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Removes the key (given its hash) and its value from the hash map, doing nothing if the key is not present
+        """
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+
+        home = hash % capacity
+
+        for step in range(capacity):
+            # calculate index with quadratic probing
+            index = (home + step * step) % capacity
+            slot = keys[index]
+            if slot is None:
+                if self._counting:
+                    self._steps += step + 1
+                return
+            # mark the slot deleted and drop the value reference
+            if hashes[index] == hash and slot == key:
+                if self._counting:
+                    self._steps += step + 1
+                keys[index] = _TOMBSTONE
+                self._values[index] = None
+                self._size -= 1
+                self._tombstones += 1
+                # clean up once dead slots take up too much of the table
+                if self._tombstones > capacity * self._tombstone_fraction:
+                    self._compact()
+                return
+        if self._counting:
+            self._steps += capacity
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry in the hash map
+        """
+        keyValues = DynamicArray()
+        values = self._values
+        for i, key in enumerate(self._keys):
+            # skip empty and deleted slots
+            if key is not None and key is not _TOMBSTONE:
+                keyValues.append((key, values[i]))
+        return keyValues
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing its capacity
+        """
+        self._size = 0
+        self._tombstones = 0
+        self._version += 1
+        # fresh arrays, a snapshot keeps the old ones so there is nothing to copy later
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._hashes = [0] * self._capacity
+        self._shared = False
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every active entry, in slot order
+        """
+        keys, values = self._keys, self._values
+        for index, key in enumerate(keys):
+            # skip empty and deleted slots
+            if key is not None and key is not _TOMBSTONE:
+                yield key, values[index]
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every active entry, in slot order, with each entry's cached (un-modded) hash
+        """
+        keys, values, hashes = self._keys, self._values, self._hashes
+        for index, key in enumerate(keys):
+            if key is not None and key is not _TOMBSTONE:
+                yield key, values[index], hashes[index]
+
+
+
+class RobinHoodHashMap(ArrayHashMap):
+    """
+    ArrayHashMap that uses Robin Hood linear probing instead of quadratic probing.
+    Every slot also records its entry's displacement: how many slots it sits past its home slot.
+
+        put:     an entry that has travelled further than a slot's resident takes that slot,
+                 and the (richer) resident moves on to find a new one
+        get:     a miss stops at the first slot whose resident is closer to home than the probe has
+                 travelled, since the key would have been placed there
+        remove:  backward-shift deletion - the entries after the removed one slide back a slot,
+                 so there are never any tombstones
+
+    Probe lengths stay short and even at high load factors, so max_load defaults to 0.9
+    """
+
+    def __init__(self, capacity: int, function, max_load: float = 0.9) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood probing, growing once the load factor reaches max_load
+        """
+        # linear probing needs at least one empty slot to stop at
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1")
+
+        super().__init__(capacity, function)
+        self._max_load = max_load
+        # displacement of the entry in each slot (-1 for empty slots)
+        self._dists = [-1] * self._capacity
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        keys = self._keys
+        hashes = self._hashes
+        dists = self._dists
+        capacity = self._capacity
+
+        index = hash % capacity
+        dist = 0
+
+        while True:
+            resident = dists[index]
+
+            # an empty slot (-1) or a resident closer to home means the key is not in the map
+            if resident < dist:
+                self._size += 1
+                if self._counting:
+                    self._steps += dist + 1
+                if resident < 0:
+                    keys[index] = key
+                    self._values[index] = value
+                    hashes[index] = hash
+                    dists[index] = dist
+                else:
+                    # take the richer resident's slot and carry it further along
+                    end = self._place(index + 1, keys[index], self._values[index], hashes[index], resident + 1)
+                    if self._counting:
+                        # the walk stops at the first empty slot, so it never wraps past where it started
+                        self._steps += (end - index - 1) % capacity + 1
+                    keys[index] = key
+                    self._values[index] = value
+                    hashes[index] = hash
+                    dists[index] = dist
+                return
+
+            # the same key sits at the same displacement, so check that first
+            if resident == dist and hashes[index] == hash and keys[index] == key:
+                self._values[index] = value
+                if self._counting:
+                    self._steps += dist + 1
+                return
+
+            index += 1
+            if index == capacity:
+                index = 0
+            dist += 1
+
+    def _place(self, index: int, key: str, value: object, hash: int, dist: int) -> int:
+        """
+        Robin Hood placement of an entry known not to be in the table, starting at index with displacement dist, and returns the empty slot the walk ended in
+
+        Note: No key comparisons are needed, entries only swap places until one reaches an empty slot
+        """
+        keys = self._keys
+        values = self._values
+        hashes = self._hashes
+        dists = self._dists
+        capacity = self._capacity
+        index %= capacity
+
+        while True:
+            resident = dists[index]
+            if resident < dist:
+                if resident < 0:
+                    keys[index] = key
+                    values[index] = value
+                    hashes[index] = hash
+                    dists[index] = dist
+                    return index
+                # swap with the richer resident and keep going with it
+                keys[index], key = key, keys[index]
+                values[index], value = value, values[index]
+                hashes[index], hash = hash, hashes[index]
+                dists[index], dist = dist, resident
+
+            index += 1
+            if index == capacity:
+                index = 0
+            dist += 1
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the slot holding the key, or -1 if the key is not in the map
+        """
+        keys = self._keys
+        hashes = self._hashes
+        dists = self._dists
+        capacity = self._capacity
+
+        index = hash % capacity
+        dist = 0
+
+        while True:
+            resident = dists[index]
+            # empty slot or richer resident ends the search early
+            if resident < dist:
+                if self._counting:
+                    self._steps += dist + 1
+                return -1
+            if resident == dist and hashes[index] == hash and keys[index] == key:
+                if self._counting:
+                    self._steps += dist + 1
+                return index
+
+            index += 1
+            if index == capacity:
+                index = 0
+            dist += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place if _find locates it, otherwise inserts it (a new key has to be placed by _insert, which may shift residents along)
+        """
+        index = self._find(key, hash)
+        if index >= 0:
+            self._values[index] = value = updated_value(self._values[index], fn, default)
+            return value
+        value = updated_value(MISSING, fn, default)
+        # the class method, so stats mode counts the upsert only once
+        RobinHoodHashMap._insert(self, key, value, hash)
+        return value
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Returns the value associated with the key (given its hash), or default if the key is not in the hash map
+        """
+        index = self._find(key, hash)
+        if index < 0:
+            return default
+        return self._values[index]
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Removes the key (given its hash) using backward-shift deletion, doing nothing if the key is not present
+        """
+        index = self._find(key, hash)
+        if index < 0:
+            return
+
+        keys = self._keys
+        values = self._values
+        hashes = self._hashes
+        dists = self._dists
+        capacity = self._capacity
+
+        # slide following entries back one slot until an empty slot or an entry at its home
+        start = index
+        next = index + 1 if index + 1 < capacity else 0
+        while dists[next] > 0:
+            keys[index] = keys[next]
+            values[index] = values[next]
+            hashes[index] = hashes[next]
+            dists[index] = dists[next] - 1
+            index = next
+            next = index + 1 if index + 1 < capacity else 0
+        # every shifted slot plus the one that stopped the shift
+        if self._counting:
+            self._steps += (index - start) % capacity + 1
+
+        keys[index] = None
+        values[index] = None
+        dists[index] = -1
+        self._size -= 1
+
+    def _rehash(self) -> None:
+        """
+        Moves every entry of the current arrays into fresh arrays sized to the (already updated) capacity
+        """
+        old_keys, old_values, old_hashes = self._keys, self._values, self._hashes
+
+        capacity = self._capacity
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = [0] * capacity
+        self._dists = [-1] * capacity
+
+        place = self._place
+        for i in range(len(old_keys)):
+            key = old_keys[i]
+            if key is not None:
+                hash = old_hashes[i]
+                place(hash % capacity, key, old_values[i], hash, 0)
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing its capacity
+        """
+        super().clear()
+        self._dists = [-1] * self._capacity
+
+    def _copy_slots(self) -> None:
+        """
+        Replaces the slot arrays (displacements included) with copies
+        """
+        super()._copy_slots()
+        self._dists = self._dists.copy()
+
+    def _probe_from(self, home: int):
+        """
+        Yields the slots probed from a home slot, in order (linear probing)
+        """
+        capacity = self._capacity
+        for step in range(capacity):
+            yield (home + step) % capacity
+
+    def _miss_steps(self, home: int) -> int:
+        """
+        Returns the slots a get of a missing key examines from a home slot, including the early stop at a richer resident
+        """
+        capacity = self._capacity
+        for dist in range(capacity):
+            if self._dists[(home + dist) % capacity] < dist:
+                return dist + 1
+        return capacity
+
+
+
+# Swiss table control bytes: a live slot stores a 7 bit fragment of its hash (0 - 127),
+# the other two states have the high bit set so they never match a fragment
+_CTRL_EMPTY = 0x80
+_CTRL_DELETED = 0xFE
+# control bytes scanned per probe step
+GROUP_WIDTH = 16
+# odd 64 bit constant (2^64 / golden ratio) that mixes a hash into its 7 bit fragment
+_TAG_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+class SwissHashMap(ArrayHashMap):
+    """
+    ArrayHashMap with a Swiss table style control byte array next to the slot arrays.
+
+    Every slot has one control byte: empty, deleted, or a 7 bit fragment (tag) of the
+    cached hash. A probe step scans a whole group of GROUP_WIDTH control bytes with
+    bytearray.find, which runs in C, and only compares keys in slots whose tag matches:
+
+        control:  [ 17 | 80 | 5a | 17 | FE | 80 | ... ]     looking for tag 17
+                    ^^                 ^^                   <- only these two keys are compared
+                          ^^ empty: if the key isn't in this group it isn't in the map
+
+    Groups are consecutive (linear probing one group at a time) and start at the key's home
+    slot, so they don't need to be aligned and the capacity stays prime. The first
+    GROUP_WIDTH - 1 control bytes are cloned past the end of the array so a group that runs
+    off the end never has to wrap.
+    """
+
+    # linear probing with 16 wide groups stays short up to a 7/8 load factor
+    _max_load = 0.875
+
+    def __init__(self, capacity: int, function,
+                 tombstone_fraction: float = 0.25) -> None:
+        """
+        Initialize new HashMap that uses control bytes and group probing
+        """
+        super().__init__(capacity, function, tombstone_fraction)
+        self._ctrl = self._new_ctrl(self._capacity)
+
+    @staticmethod
+    def _new_ctrl(capacity: int) -> bytearray:
+        """
+        Returns an all-empty control byte array for a capacity, including the cloned tail
+        """
+        return bytearray([_CTRL_EMPTY]) * (capacity + GROUP_WIDTH - 1)
+
+    @staticmethod
+    def _tag(hash: int) -> int:
+        """
+        Returns the 7 bit fragment of a hash stored in the control byte (the top bits after mixing)
+        """
+        return ((hash * _TAG_MULTIPLIER) & _MASK_64) >> 57
+
+    def _set_ctrl(self, index: int, byte: int) -> None:
+        """
+        Sets the control byte of a slot, and its clones in the tail
+        """
+        ctrl = self._ctrl
+        ctrl[index] = byte
+        # a capacity smaller than the group width is cloned more than once
+        index += self._capacity
+        while index < len(ctrl):
+            ctrl[index] = byte
+            index += self._capacity
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the slot holding the key, or -1 if the key is not in the map
+        """
+        ctrl = self._ctrl
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+        tag = self._tag(hash)
+
+        pos = hash % capacity
+        # a table with no empty slot left is covered once every group was looked at
+        groups = capacity // GROUP_WIDTH + 1
+        for group in range(groups):
+            end = pos + GROUP_WIDTH
+            # compare keys only where the tag matches
+            match = ctrl.find(tag, pos, end)
+            while match >= 0:
+                index = match % capacity
+                if hashes[index] == hash and keys[index] == key:
+                    if self._counting:
+                        self._steps += group + 1
+                    return index
+                match = ctrl.find(tag, match + 1, end)
+
+            # an empty slot in the group ends the probe sequence
+            if ctrl.find(_CTRL_EMPTY, pos, end) >= 0:
+                if self._counting:
+                    self._steps += group + 1
+                return -1
+            pos = end % capacity
+        if self._counting:
+            self._steps += groups
+        return -1
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        ctrl = self._ctrl
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+        tag = self._tag(hash)
+
+        pos = hash % capacity
+        # first free (empty or deleted) slot, reused if the key turns out to be new
+        free = -1
+        for group in range(capacity // GROUP_WIDTH + 1):
+            end = pos + GROUP_WIDTH
+            match = ctrl.find(tag, pos, end)
+            while match >= 0:
+                index = match % capacity
+                if hashes[index] == hash and keys[index] == key:
+                    self._values[index] = value
+                    if self._counting:
+                        self._steps += group + 1
+                    return
+                match = ctrl.find(tag, match + 1, end)
+
+            empty = ctrl.find(_CTRL_EMPTY, pos, end)
+            if free < 0:
+                deleted = ctrl.find(_CTRL_DELETED, pos, end)
+                if deleted >= 0 and (empty < 0 or deleted < empty):
+                    free = deleted % capacity
+            if empty >= 0:
+                if free < 0:
+                    free = empty % capacity
+                break
+            pos = end % capacity
+        if self._counting:
+            self._steps += group + 1
+
+        # store the new entry in the first free slot found
+        if keys[free] is _TOMBSTONE:
+            self._tombstones -= 1
+        keys[free] = key
+        self._values[free] = value
+        hashes[free] = hash
+        self._set_ctrl(free, tag)
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place if _find locates it, otherwise inserts it (a second walk of the groups, only for new keys)
+        """
+        index = self._find(key, hash)
+        if index >= 0:
+            self._values[index] = value = updated_value(self._values[index], fn, default)
+            return value
+        value = updated_value(MISSING, fn, default)
+        # the class method, so stats mode counts the upsert only once
+        SwissHashMap._insert(self, key, value, hash)
+        return value
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Returns the value associated with the key (given its hash), or default if the key is not in the hash map
+
+        Note: Same loop as _find, inlined since get is the hot path
+        """
+        ctrl = self._ctrl
+        keys = self._keys
+        hashes = self._hashes
+        capacity = self._capacity
+        tag = ((hash * _TAG_MULTIPLIER) & _MASK_64) >> 57
+
+        pos = hash % capacity
+        groups = capacity // GROUP_WIDTH + 1
+        for group in range(groups):
+            end = pos + GROUP_WIDTH
+            match = ctrl.find(tag, pos, end)
+            while match >= 0:
+                index = match % capacity
+                if hashes[index] == hash and keys[index] == key:
+                    if self._counting:
+                        self._steps += group + 1
+                    return self._values[index]
+                match = ctrl.find(tag, match + 1, end)
+
+            if ctrl.find(_CTRL_EMPTY, pos, end) >= 0:
+                if self._counting:
+                    self._steps += group + 1
+                return default
+            pos = end % capacity
+        if self._counting:
+            self._steps += groups
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Removes the key (given its hash) and its value from the hash map, doing nothing if the key is not present
+        """
+        index = self._find(key, hash)
+        if index < 0:
+            return
+
+        # mark the slot deleted and drop the value reference
+        self._keys[index] = _TOMBSTONE
+        self._values[index] = None
+        self._set_ctrl(index, _CTRL_DELETED)
+        self._size -= 1
+        self._tombstones += 1
+        # clean up once dead slots take up too much of the table
+        if self._tombstones > self._capacity * self._tombstone_fraction:
+            self._compact()
+
+    def _rehash(self) -> None:
+        """
+        Moves every live entry of the current arrays straight into fresh arrays sized to the (already updated) capacity
+
+        Note: Every old key is unique, so each one goes into the first empty slot of its groups without any tag checks
+        """
+        old_keys, old_values, old_hashes = self._keys, self._values, self._hashes
+
+        capacity = self._capacity
+        keys = self._keys = [None] * capacity
+        values = self._values = [None] * capacity
+        hashes = self._hashes = [0] * capacity
+        ctrl = self._ctrl = self._new_ctrl(capacity)
+        set_ctrl = self._set_ctrl
+        tag = self._tag
+
+        for i in range(len(old_keys)):
+            key = old_keys[i]
+            if key is None or key is _TOMBSTONE:
+                continue
+            hash = old_hashes[i]
+            pos = hash % capacity
+            empty = ctrl.find(_CTRL_EMPTY, pos, pos + GROUP_WIDTH)
+            while empty < 0:
+                pos = (pos + GROUP_WIDTH) % capacity
+                empty = ctrl.find(_CTRL_EMPTY, pos, pos + GROUP_WIDTH)
+            index = empty % capacity
+            keys[index] = key
+            values[index] = old_values[i]
+            hashes[index] = hash
+            set_ctrl(index, tag(hash))
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing its capacity
+        """
+        super().clear()
+        self._ctrl = self._new_ctrl(self._capacity)
+
+    def _copy_slots(self) -> None:
+        """
+        Replaces the slot arrays (control bytes included) with copies
+        """
+        super()._copy_slots()
+        self._ctrl = bytearray(self._ctrl)
+
+    def _probe_from(self, home: int):
+        """
+        Yields the slots probed from a home slot, in order (linear, one group of GROUP_WIDTH at a time)
+        """
+        capacity = self._capacity
+        for step in range(capacity):
+            yield (home + step) % capacity
+
+
+class Pow2HashMap(ArrayHashMap):
+    """
+    ArrayHashMap with power of two capacities. The home slot is hash & (capacity - 1) and
+    probing follows the triangular numbers:
+
+        home, home + 1, home + 3, home + 6, home + 10, ...      (all & (capacity - 1))
+
+    which visits every slot of a power of two table exactly once (plain quadratic probing
+    would keep revisiting some and never reach others). Growth is a clean doubling and no
+    probe step needs a modulo.
+
+    Only the low bits of the hash pick the slot, so this mode needs a well mixed hash function
+    ('murmur64', 'fnv1a' or 'builtin'); hash_function_1 / hash_function_2 cluster badly here
+    """
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity used for a requested one: in this mode the next power of two
+        """
+        return next_power_of_two(capacity)
+
+    def _valid_capacity(self, capacity: int) -> bool:
+        """
+        Returns True if capacity can be used as it is: in this mode a power of two
+        """
+        return is_power_of_two(capacity)
+
+    def _grow_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity a full table grows to: double
+        """
+        return capacity * 2
+
+    def _fit_capacity(self, count: int) -> int:
+        """
+        Returns the smallest power of two that is at least count
+        """
+        return next_power_of_two(count)
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._capacity - 1
+
+        index = hash & mask
+        # first deleted slot seen, reused if the key turns out to be new
+        free = -1
+
+        for step in range(1, mask + 2):
+            slot = keys[index]
+
+            # end of the probe chain, the key is not in the map
+            if slot is None:
+                if free < 0:
+                    free = index
+                break
+            # remember the first deleted slot but keep looking for the key
+            if slot is _TOMBSTONE:
+                if free < 0:
+                    free = index
+            # same key found (cheap hash check first) so update the value
+            elif hashes[index] == hash and slot == key:
+                self._values[index] = value
+                if self._counting:
+                    self._steps += step
+                return
+
+            # triangular probing: the step grows by one each time
+            index = (index + step) & mask
+
+        if self._counting:
+            self._steps += step
+        # store the new entry in the first free slot found
+        if keys[free] is _TOMBSTONE:
+            self._tombstones -= 1
+        keys[free] = key
+        self._values[free] = value
+        hashes[free] = hash
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place, or places the key in the first free slot of its probe chain, in one walk (without checking the load factor)
+        """
+        keys = self._keys
+        hashes = self._hashes
+        values = self._values
+        mask = self._capacity - 1
+
+        index = hash & mask
+        free = -1
+
+        # same walk as _insert
+        for step in range(1, mask + 2):
+            slot = keys[index]
+            if slot is None:
+                if free < 0:
+                    free = index
+                break
+            if slot is _TOMBSTONE:
+                if free < 0:
+                    free = index
+            elif hashes[index] == hash and slot == key:
+                values[index] = value = updated_value(values[index], fn, default)
+                if self._counting:
+                    self._steps += step
+                return value
+            index = (index + step) & mask
+
+        if self._counting:
+            self._steps += step
+        value = updated_value(MISSING, fn, default)
+        if keys[free] is _TOMBSTONE:
+            self._tombstones -= 1
+        keys[free] = key
+        values[free] = value
+        hashes[free] = hash
+        self._size += 1
+        return value
+
+    def _rehash(self) -> None:
+        """
+        Moves every live entry of the current arrays straight into fresh arrays sized to the (already updated) capacity
+        """
+        old_keys, old_values, old_hashes = self._keys, self._values, self._hashes
+
+        capacity = self._capacity
+        mask = capacity - 1
+        keys = self._keys = [None] * capacity
+        values = self._values = [None] * capacity
+        hashes = self._hashes = [0] * capacity
+
+        # every old key is unique so place it in the first empty slot
+        for i in range(len(old_keys)):
+            key = old_keys[i]
+            if key is None or key is _TOMBSTONE:
+                continue
+            hash = old_hashes[i]
+            index = hash & mask
+            step = 0
+            while keys[index] is not None:
+                step += 1
+                index = (index + step) & mask
+            keys[index] = key
+            values[index] = old_values[i]
+            hashes[index] = hash
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Returns the value associated with the key (given its hash), or default if the key is not in the hash map
+        """
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._capacity - 1
+
+        index = hash & mask
+        for step in range(1, mask + 2):
+            slot = keys[index]
+            # an empty slot ends the probe chain
+            if slot is None:
+                if self._counting:
+                    self._steps += step
+                return default
+            # tombstones never compare equal to a key
+            if hashes[index] == hash and slot == key:
+                if self._counting:
+                    self._steps += step
+                return self._values[index]
+            index = (index + step) & mask
+        if self._counting:
+            self._steps += mask + 1
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Removes the key (given its hash) and its value from the hash map, doing nothing if the key is not present
+        """
+        keys = self._keys
+        hashes = self._hashes
+        mask = self._capacity - 1
+
+        index = hash & mask
+        for step in range(1, mask + 2):
+            slot = keys[index]
+            if slot is None:
+                if self._counting:
+                    self._steps += step
+                return
+            # mark the slot deleted and drop the value reference
+            if hashes[index] == hash and slot == key:
+                if self._counting:
+                    self._steps += step
+                keys[index] = _TOMBSTONE
+                self._values[index] = None
+                self._size -= 1
+                self._tombstones += 1
+                # clean up once dead slots take up too much of the table
+                if self._tombstones > self._capacity * self._tombstone_fraction:
+                    self._compact()
+                return
+            index = (index + step) & mask
+        if self._counting:
+            self._steps += mask + 1
+
+    def _home(self, hash: int) -> int:
+        """
+        Returns the first slot probed for a hash
+        """
+        return hash & (self._capacity - 1)
+
+    def _probe_from(self, home: int):
+        """
+        Yields the slots probed from a home slot, in order (triangular probing)
+        """
+        mask = self._capacity - 1
+        index = home
+        for step in range(1, mask + 2):
+            yield index
+            index = (index + step) & mask
+
+
+
+class IncrementalHashMap(ArrayHashMap):
+    """
+    ArrayHashMap that resizes (and compacts) incrementally instead of all at once.
+
+    When put would rehash, the map only allocates the new arrays. The old ones are kept
+    and every following put / get / remove first moves the next _migrate_step old slots
+    over, so no single operation does more than a fixed amount of rehash work:
+
+        old:  [ moved | moved | moved | a | b | None | c ... ]     <- entries not moved yet
+                                        ^ next slot to move
+        new:  [ ... entries moved so far, plus everything put since ... ]
+
+    While the move is running a key lives in exactly one of the two tables: lookups try the
+    new table and then the old one. Moved slots are left as tombstones in the old table so
+    the probe chains of keys still waiting to move stay intact.
+
+    resize_table (and reserve / put_many, which use it) is still synchronous: it finishes any
+    running move first, as do the methods that walk the whole table anyway
+    """
+
+    # old slots moved on every operation while a resize is running
+    _migrate_step = 16
+
+    def __init__(self, capacity: int, function,
+                 tombstone_fraction: float = 0.25) -> None:
+        """
+        Initialize new HashMap that resizes incrementally
+        """
+        super().__init__(capacity, function, tombstone_fraction)
+        # the table being moved out of (None when no resize is running)
+        self._old_keys = None
+        self._old_values = None
+        self._old_hashes = None
+        self._old_capacity = 0
+        # next old slot to move
+        self._migrated = 0
+
+    def is_resizing(self) -> bool:
+        """
+        Returns True while entries are still being moved out of an old table
+        """
+        return self._old_keys is not None
+
+    def _make_room(self) -> None:
+        """
+        Starts growing the table (or compacting it at the same capacity), see HashMap._make_room
+        """
+        # the new table fills much slower than the old one empties, so this only happens if a
+        # caller lowered _migrate_step a lot
+        if self._old_keys is not None:
+            self._finish_resize()
+        if self._size >= self._capacity * self._max_load * 0.5:
+            self._start_resize(self._grow_capacity(self._capacity))
+        else:
+            self._compactions += 1
+            self._start_resize(self._capacity)
+
+    def _compact(self) -> None:
+        """
+        Starts an incremental same-capacity rehash that drops every tombstone (unless a resize is already running)
+        """
+        if self._old_keys is None:
+            self._compactions += 1
+            self._start_resize(self._capacity)
+
+    def _start_resize(self, new_capacity: int) -> None:
+        """
+        Makes the current arrays the old table and allocates empty ones with the new capacity
+        """
+        self._old_keys, self._old_values, self._old_hashes = self._keys, self._values, self._hashes
+        self._old_capacity = self._capacity
+        self._migrated = 0
+
+        self._capacity = new_capacity
+        self._keys = [None] * new_capacity
+        self._values = [None] * new_capacity
+        self._hashes = [0] * new_capacity
+        # tombstones of the old table don't count against the new one
+        self._tombstones = 0
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the next count slots of the old table into the new one, dropping the old table when it is done
+        """
+        old_keys, old_values, old_hashes = self._old_keys, self._old_values, self._old_hashes
+        keys, values, hashes = self._keys, self._values, self._hashes
+        capacity = self._capacity
+
+        start = self._migrated
+        end = min(start + count, self._old_capacity)
+        # the operation that does the moving reads every old slot and probes the new table
+        steps = end - start
+        for i in range(start, end):
+            key = old_keys[i]
+            if key is None or key is _TOMBSTONE:
+                continue
+
+            # the key can't be in the new table yet, so take the first free slot
+            hash = old_hashes[i]
+            home = hash % capacity
+            index = home
+            step = 0
+            while keys[index] is not None and keys[index] is not _TOMBSTONE:
+                step += 1
+                index = (home + step * step) % capacity
+            steps += step + 1
+            if keys[index] is _TOMBSTONE:
+                self._tombstones -= 1
+            keys[index] = key
+            values[index] = old_values[i]
+            hashes[index] = hash
+
+            # leave a tombstone so the old probe chains still reach the keys after it
+            old_keys[i] = _TOMBSTONE
+            old_values[i] = None
+
+        self._migrated = end
+        if self._counting:
+            self._steps += steps
+        if end == self._old_capacity:
+            self._old_keys = self._old_values = self._old_hashes = None
+            self._old_capacity = 0
+
+    def _finish_resize(self) -> None:
+        """
+        Moves everything that is left in the old table
+        """
+        if self._old_keys is not None:
+            self._migrate(self._old_capacity)
+
+    def _old_find(self, key: str, hash: int) -> int:
+        """
+        Returns the old table slot holding the key, or -1 if it is not there
+        """
+        keys = self._old_keys
+        hashes = self._old_hashes
+        capacity = self._old_capacity
+
+        home = hash % capacity
+        for step in range(capacity):
+            index = (home + step * step) % capacity
+            slot = keys[index]
+            if slot is None:
+                if self._counting:
+                    self._steps += step + 1
+                return -1
+            if hashes[index] == hash and slot == key:
+                if self._counting:
+                    self._steps += step + 1
+                return index
+        if self._counting:
+            self._steps += capacity
+        return -1
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor (moving the next few old slots first)
+        """
+        if self._old_keys is not None:
+            self._migrate(self._migrate_step)
+        # a key that hasn't moved yet is updated where it is
+        if self._old_keys is not None:
+            index = self._old_find(key, hash)
+            if index >= 0:
+                self._old_values[index] = value
+                return
+        super()._insert(key, value, hash)
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in place, or places the key in the new table (moving the next few old slots first)
+        """
+        if self._old_keys is not None:
+            self._migrate(self._migrate_step)
+        if self._old_keys is not None:
+            index = self._old_find(key, hash)
+            if index >= 0:
+                self._old_values[index] = value = updated_value(self._old_values[index], fn, default)
+                return value
+        return super()._upsert(key, hash, fn, default)
+
+    def _get(self, key: str, hash: int, default: object = None) -> object:
+        """
+        Returns the value associated with the key (given its hash), or default if the key is not in the hash map
+        """
+        if self._old_keys is not None:
+            self._migrate(self._migrate_step)
+        value = super()._get(key, hash, MISSING)
+        if value is not MISSING:
+            return value
+        if self._old_keys is not None:
+            index = self._old_find(key, hash)
+            if index >= 0:
+                return self._old_values[index]
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Removes the key (given its hash) and its value from the hash map, doing nothing if the key is not present
+        """
+        if self._old_keys is not None:
+            self._migrate(self._migrate_step)
+        if self._old_keys is not None:
+            index = self._old_find(key, hash)
+            if index >= 0:
+                self._old_keys[index] = _TOMBSTONE
+                self._old_values[index] = None
+                self._size -= 1
+                return
+        super()._remove(key, hash)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table right away, finishing any incremental resize first
+        """
+        self._finish_resize()
+        super().resize_table(new_capacity)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table (finishing any incremental resize first)
+        """
+        self._finish_resize()
+        return super().empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry in the hash map
+        """
+        self._finish_resize()
+        return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing its capacity (dropping any old table)
+        """
+        self._old_keys = self._old_values = self._old_hashes = None
+        self._old_capacity = 0
+        super().clear()
+
+    def analyze(self) -> dict:
+        """
+        Returns the report of HashMap.analyze, for the table as it is once any incremental resize is finished
+        """
+        self._finish_resize()
+        return super().analyze()
+
+    def snapshot(self) -> HashMapSnapshot:
+        """
+        Returns a read-only view of the map as it is right now (finishing any incremental resize first, so the view has a single table)
+        """
+        self._finish_resize()
+        return super().snapshot()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output (finishing any incremental resize first)
+        """
+        self._finish_resize()
+        return super().__str__()
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every active entry (finishing any incremental resize first, so entries can't move between tables mid-walk)
+        """
+        self._finish_resize()
+        return super()._pairs()
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every active entry (finishing any incremental resize first, like _pairs)
+        """
+        self._finish_resize()
+        return super()._hashed_pairs()
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
@@ -572,3 +2493,226 @@ if __name__ == "__main__":
     print(m)
     for item in m:
         print('K:', item.key, 'V:', item.value)
+
+    print("\nanalyze example 1")
+    print("-----------------")
+    # hash_function_1 sums the letters: 'ab' and 'ba' both start at slot 8 (195 % 11) and 'ba'
+    # moves on to slot 9, 'c' sits alone in slot 0
+    m = HashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'c'):
+        m.put(key, key.upper())
+    report = m.analyze()
+    print(report['probe_lengths_hit'], report['probe_lengths_hit'] == {1: 2, 2: 1})
+    # a miss from slot 8 examines 8, 9 and 1, from slots 0 and 9 it stops at the next slot
+    print(report['probe_lengths_miss'], report['probe_lengths_miss'] == {1: 8, 2: 2, 3: 1})
+    print(report['max_probe_hit'], report['longest_cluster'], round(report['observed_collision_rate'], 2))
+    m.remove('ab')
+    report = m.analyze()
+    print(report['probe_lengths_hit'], report['tombstones'], round(report['tombstone_density'], 2), m.get('ba'))
+
+    print("\nRobinHoodHashMap example 1 (backward-shift delete across the end of the table)")
+    print("-------------------------------------------------------------------------------")
+    # hash_function_1 sums the letters, homes: 'ab' / 'ba' slot 8, 'ca' slot 9, 'ad' / 'bc' slot 10
+    m = RobinHoodHashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'ad', 'bc', 'ca'):
+        m.put(key, key.upper())
+    # 'ca' took slot 10 from 'ad' (further from home), which moved on past the end to slot 1
+    print(m.get_keys_and_values())
+    # removing 'ab' slides 'ba', 'ca', 'bc' and 'ad' back one slot each, 'bc' from slot 0 to slot 10
+    m.remove('ab')
+    print(m.get_keys_and_values())
+    result = m.get_size() == 4 and m.get('ab') is None
+    for key in ('ba', 'ca', 'ad', 'bc'):
+        result &= m.get(key) == key.upper()
+    # no tombstones are left behind: the slot after the shifted run is empty again
+    print(result, m.empty_buckets(), m.analyze()['tombstones'], m.analyze()['probe_lengths_hit'])
+
+    print("\nRobinHoodHashMap example 2 (early miss stop)")
+    print("--------------------------------------------")
+    m = RobinHoodHashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'ad', 'bc', 'ca'):
+        m.put(key, key.upper())
+    m.enable_stats()
+    # 'bb' starts at slot 9: 'ba' and 'ca' there are as far from home as the probe or further, but
+    # 'bc' in slot 0 is closer to home than the probe has travelled, so 'bb' would have been put
+    # there: the get stops after 3 slots instead of walking the cluster to the empty slot 2 (5 slots)
+    print(m.get('bb'), m.get_stats()['get']['probe_steps'] == 3)
+    # a present key at the end of the cluster is still found
+    print(m.get('ad'), m.get_stats()['get']['hits'])
+    print(m.analyze()['probe_lengths_miss'])
+
+    print("\nRobinHoodHashMap example 3 (capacities 1 - 3)")
+    print("---------------------------------------------")
+    for capacity in (1, 2, 3):
+        m = RobinHoodHashMap(capacity, hash_function_1)
+        # 1 and 2 round up to the prime 3, and three keys fill that table completely before it grows
+        for key in ('a', 'b', 'c'):
+            m.put(key, key.upper())
+        full = m.get_capacity()
+        result = all(m.get(key) == key.upper() for key in ('a', 'b', 'c')) and m.get('d') is None
+        m.put('d', 'D')
+        m.remove('b')
+        result &= all(m.get(key) == key.upper() for key in ('a', 'c', 'd')) and m.get('b') is None
+        print(capacity, full, m.get_capacity(), m.get_size(), result)
+
+    print("\nSwissHashMap example 1 (groups crossing the cloned control bytes)")
+    print("-----------------------------------------------------------------")
+    # every key starts at slot 21 of 23 (hash_function_1 sums the letters), so its group of
+    # GROUP_WIDTH control bytes runs past the end of the table into the cloned bytes of slots 0 - 13
+    m = SwissHashMap(23, hash_function_1)
+    for key in ('al', 'bk', 'cj', 'di', 'eh'):
+        m.put(key, key.upper())
+    # 'cj', 'di' and 'eh' are found through the clones of slots 0, 1 and 2
+    print(m.get_keys_and_values())
+    result = all(m.get(key) == key.upper() for key in ('al', 'bk', 'cj', 'di', 'eh'))
+    # the deleted marks of slots 21 and 0 (cloned past the end too) don't end the group
+    m.remove('al')
+    m.remove('cj')
+    result &= m.get('al') is None and m.get('cj') is None and m.get('di') == 'DI' and m.get('eh') == 'EH'
+    # a missing key with the same home stops at the empty clone of slot 3
+    result &= m.get('fg') is None
+    # new keys reuse the first deleted slot of the group (slot 21, then the wrapped slot 0)
+    m.put('fg', 'FG')
+    m.put('gf', 'GF')
+    print(m.get_keys_and_values())
+    result &= m.get('fg') == 'FG' and m.get('gf') == 'GF' and m.get_size() == 5
+    print(result, m.empty_buckets())
+
+    print("\nSwissHashMap example 2 (capacities 1 - 3)")
+    print("-----------------------------------------")
+    for capacity in (1, 2, 3):
+        m = SwissHashMap(capacity, hash_function_1)
+        # the control bytes of the 3 slots are cloned several times to fill one group
+        for key in ('a', 'b', 'c'):
+            m.put(key, key.upper())
+        full = m.get_capacity()
+        result = all(m.get(key) == key.upper() for key in ('a', 'b', 'c')) and m.get('d') is None
+        m.remove('b')
+        m.put('d', 'D')
+        result &= all(m.get(key) == key.upper() for key in ('a', 'c', 'd')) and m.get('b') is None
+        print(capacity, full, m.get_capacity(), m.get_size(), result)
+
+    print("\nPow2HashMap example 1 (triangular probing)")
+    print("------------------------------------------")
+    # hash_function_1 sums the letters: every ordering of 'abc' (and 'bbb') hashes to 294, home slot
+    # 294 & 15 = 6, and the probe offsets 0, 1, 3, 6, 10, 15 give slots 6, 7, 9, 12, 0 and 5
+    m = Pow2HashMap(10, hash_function_1)
+    keys = ('abc', 'acb', 'bac', 'bca', 'cab', 'cba')
+    for key in keys:
+        m.put(key, key.upper())
+    print(m.get_capacity(), m.get_keys_and_values())
+    result = all(m.get(key) == key.upper() for key in keys)
+    # a missing key with the same home walks all six slots to the empty slot 11 (offset 21)
+    result &= m.get('bbb') is None
+    m.remove('bac')
+    result &= m.get('bac') is None and all(m.get(key) == key.upper() for key in keys if key != 'bac')
+    print(result, m.get_size())
+
+    print("\nPow2HashMap example 2 (capacities double)")
+    print("-----------------------------------------")
+    m = Pow2HashMap(10, 'murmur64')
+    capacities = [m.get_capacity()]
+    for i in range(100):
+        m.put('key' + str(i), i)
+        if m.get_capacity() != capacities[-1]:
+            capacities.append(m.get_capacity())
+    print(capacities)
+    # requested capacities round up to a power of two (one below the size is ignored)
+    for capacity in (300, 150, 5):
+        m.resize_table(capacity)
+        print(capacity, m.get_capacity(), m.get_size(), all(m.get('key' + str(i)) == i for i in range(100)))
+
+    print("\nIncrementalHashMap example 1 (operations while a resize is running)")
+    print("-------------------------------------------------------------------")
+    m = IncrementalHashMap(11, hash_function_1)
+    # move a single old slot per operation, so the resize stays visible for a while
+    m._migrate_step = 1
+    expected = {}
+    i = 0
+    while not m.is_resizing():
+        m.put('key' + str(i), i)
+        expected['key' + str(i)] = i
+        i += 1
+    print(m.get_size(), m.get_capacity(), m.is_resizing())
+    # an update of a key still in the old table, a new key, a remove and increments on both tables
+    m.put('key0', 100)
+    m.put('new', -1)
+    m.remove('key1')
+    m.increment('key2', 5)
+    m.increment('count')
+    m.increment('count')
+    expected.update({'key0': 100, 'new': -1, 'count': 2})
+    expected['key2'] += 5
+    del expected['key1']
+    resizing = m.is_resizing()
+    result = all(m.get(key) == value for key, value in expected.items())
+    result &= m.get('key1') is None and m.get('missing') is None and m.get_size() == len(expected)
+    print(resizing, result, m.is_resizing())
+
+    print("\nIncrementalHashMap example 2 (whole-table methods while a resize is running)")
+    print("----------------------------------------------------------------------------")
+    for operation in ('get_keys_and_values', 'snapshot', 'resize_table', 'clear'):
+        m = IncrementalHashMap(11, hash_function_1)
+        m._migrate_step = 1
+        expected = {}
+        i = 0
+        while not m.is_resizing():
+            m.put('key' + str(i), i)
+            expected['key' + str(i)] = i
+            i += 1
+        m.remove('key0')
+        del expected['key0']
+        resizing = m.is_resizing()
+
+        if operation == 'get_keys_and_values':
+            result = dict(to_list(m.get_keys_and_values())) == expected
+        elif operation == 'snapshot':
+            view = m.snapshot()
+            m.put('key1', 'changed')
+            result = dict(to_list(view.get_keys_and_values())) == expected and m.get('key1') == 'changed'
+        elif operation == 'resize_table':
+            m.resize_table(101)
+            result = m.get_capacity() == 101 and dict(to_list(m.get_keys_and_values())) == expected
+        else:
+            m.clear()
+            m.put('key1', 'after')
+            result = m.get_size() == 1 and m.get('key1') == 'after' and m.get('key2') is None
+        print(operation, resizing, m.is_resizing(), result)
+
+    print("\nsnapshot example 1 (the view doesn't see later writes)")
+    print("------------------------------------------------------")
+    for cls in (HashMap, ArrayHashMap, RobinHoodHashMap, SwissHashMap, Pow2HashMap, IncrementalHashMap):
+        m = cls(11, hash_function_1)
+        for i in range(8):
+            m.put('key' + str(i), i)
+        view = m.snapshot()
+        expected = {'key' + str(i): i for i in range(8)}
+        # every kind of write: a new key, an update in place, an increment, a remove, a resize, a clear
+        m.put('new', -1)
+        m.put('key0', 100)
+        m.increment('key1')
+        m.remove('key2')
+        m.resize_table(101)
+        unchanged = dict(view.items()) == expected and view.get_size() == 8 and view.get_capacity() < 101
+        # clear leaves the old arrays to the view, so the next write has nothing to copy
+        m.clear()
+        fresh = not m._shared
+        m.put('key3', 'after clear')
+        unchanged &= dict(to_list(view.get_keys_and_values())) == expected and view.get('new') is None
+        # and the map itself is right too
+        live = fresh and m.get_size() == 1 and m.get('key3') == 'after clear' and m.get('key4') is None
+        print(cls.__name__, unchanged, live, view.contains_key('key2'), view.get('key0'))
+
+    print("\nupsert example 1 (missing keys, present keys and keys mapped to None)")
+    print("---------------------------------------------------------------------")
+    for cls in (HashMap, ArrayHashMap, RobinHoodHashMap, SwissHashMap, Pow2HashMap, IncrementalHashMap):
+        m = cls(11, hash_function_1)
+        m.put('word', 2)
+        m.put('none', None)
+        # missing: increment starts at 0, setdefault stores the default, update_with stores fn(default)
+        missing = [m.increment('new'), m.setdefault('other', 'x'), m.update_with('list', lambda value: value + [1], [])]
+        # present: increment adds, setdefault keeps the value, update_with replaces it with fn(value)
+        present = [m.increment('word', 3), m.setdefault('word', 0), m.update_with('list', lambda value: value + [2])]
+        # a key mapped to None is present too: setdefault keeps None and fn gets None
+        mapped_to_none = [m.setdefault('none', 'default'), m.update_with('none', lambda value: [value])]
+        print(cls.__name__, missing, present, mapped_to_none, m.get_size())
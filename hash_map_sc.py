@@ -19,27 +19,48 @@
 # 
 # Remove would be the same but we would (drum roll please) remove a value after finding its bucket instead of adding a value :D
 
-from a6_include import (DynamicArray, LinkedList,
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from a6_include import (DynamicArray, LinkedList, SLNode,
                         hash_function_1, hash_function_2)
+from hash_functions import get_hash_function, hash_batch
+from hash_map_helpers import MISSING, to_list, updated_value
+from hash_map_mmap import save_map
+from hash_map_stats import (collision_rates, disable_stats, enable_stats,
+                            sorted_histogram)
+from hash_map_views import ItemsView, KeysView, ValuesView
+from primes import (grow_capacity, is_power_of_two, is_prime, ladder_capacity,
+                    next_power_of_two, next_prime)
 
 
 class HashMap:
+    # bumped by every write, so iterators can tell the map changed under them
+    _version = 0
+    # chain nodes examined, added up by the lookup walks while stats mode sets _counting (it zeroes
+    # _steps around each operation). With _counting off the walks don't count at all
+    _steps = 0
+    _counting = False
+
     def __init__(self,
                  capacity: int = 11,
                  function: callable = hash_function_1) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+
+        function can be a hash function or the name of one in the hash_functions registry
         """
         self._buckets = DynamicArray()
 
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        self._capacity = self._round_capacity(capacity)
         for _ in range(self._capacity):
             self._buckets.append(LinkedList())
 
-        self._hash_function = function
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
         self._size = 0
 
     def __str__(self) -> str:
@@ -54,36 +75,40 @@ class HashMap:
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Increment from given number to find the closest prime number
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if capacity == 2 or capacity == 3:
-            return True
+        return is_prime(capacity)
 
-        if capacity == 1 or capacity % 2 == 0:
-            return False
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity used for a requested one: the next prime (Pow2HashMap rounds to a power of two instead)
+        """
+        return self._next_prime(capacity)
 
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
+    def _valid_capacity(self, capacity: int) -> bool:
+        """
+        Returns True if capacity can be used as it is: a prime (a power of two for Pow2HashMap)
+        """
+        return self._is_prime(capacity)
 
-        return True
+    def _grow_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity a full table grows to: the next (roughly double) prime on the ladder
+        """
+        return grow_capacity(capacity)
+
+    def _fit_capacity(self, count: int) -> int:
+        """
+        Returns the smallest capacity on the prime ladder that is at least count
+        """
+        return ladder_capacity(count)
 
     def get_size(self) -> int:
         """
@@ -108,31 +133,123 @@ class HashMap:
         """
         Updates the key/value pair in the hash map. If the given key already exists in the hash map, its associated value must be replaced with the new value. If the given key is not in the hash map, a new key/value pair must be added
 
-        Note: If the current load factor of the table is greater than or equal to 1.0, the table must be resized to double its current capacity
+        Note: If the current load factor of the table is greater than or equal to 1.0, the table is resized to the next capacity on the prime ladder (roughly double, see primes.grow_capacity: 53 -> 97, 113 -> 193)
+        """
+        self._version += 1
+        # get the key's full hash, it is cached in the node
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash: int) -> None:
+        """
+        Same as put, but takes the key's already computed (un-modded) hash
+        """
+        self._make_room()
+        self._insert(key, value, hash)
+
+    def _make_room(self) -> None:
+        """
+        Grows the table before one more key goes in, if the load factor reached 1
         """
         # check if our load factor
-        if self.table_load() >= 1:
-            # resize to double capacity if needed
-            self.resize_table(self._capacity * 2)
+        if self._needs_room():
+            # resize to the next (roughly double) prime on the ladder if needed
+            self.resize_table(self._grow_capacity(self._capacity))
 
-        # calculate hash to get bucket index
-        index = self._hash_function(key) % self._capacity
+    def _needs_room(self) -> bool:
+        """
+        Returns True if one more key needs _make_room first: the load factor reached 1
+        """
+        return self.table_load() >= 1
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        # use hash to get bucket index
+        index = hash % self._capacity
 
         # get bucket value is in
         bucket = self._buckets.get_at_index(index)
 
-        # check if values need to be replaced
-        node = bucket.contains(key)
+        # check if values need to be replaced (nodes with other hashes are skipped)
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
         if node is not None:
             # replace if needed
             node.value = value
             return
         
         # add value to the bucket
-        bucket.insert(key, value)
+        bucket.insert(key, value, hash)
         # update our size
         self._size += 1
 
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the key's value (a missing key starts at 0) and returns the new value
+
+        Note: The chain is walked once and the node changed in place, instead of contains_key + get + put walking it three times
+        """
+        return self._update(key, self._hash_function(key), lambda value: value + delta, 0)
+
+    def setdefault(self, key: str, default: object) -> object:
+        """
+        Returns the key's value, first putting default there if the key is missing
+        """
+        return self._update(key, self._hash_function(key), None, default)
+
+    def update_with(self, key: str, fn, default: object = None) -> object:
+        """
+        Replaces the key's value with fn(value), or puts fn(default) if the key is missing, and returns the new value
+
+        Note: A key mapped to None is present, so fn gets None (get can't tell such a key from a missing one)
+        """
+        return self._update(key, self._hash_function(key), fn, default)
+
+    def _update(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Same as update_with (fn None meaning setdefault), but takes the key's already computed (un-modded) hash
+
+        Note: Only a new key grows the table or bumps the version. Changing an existing key's value leaves open iterators alone, and a setdefault hit only reads
+        """
+        # a full table must not grow for a key that is already there, so look first
+        # (the extra walk is only paid right before a resize)
+        if self._needs_room():
+            current = type(self)._get(self, key, hash, MISSING)
+            if current is MISSING:
+                self._make_room()
+            elif fn is None:
+                return current
+
+        size = self._size
+        value = self._upsert(key, hash, fn, default)
+        # only a new key changes what iterators walk
+        if self._size != size:
+            self._version += 1
+        return value
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's node in place, or adds the key to its bucket, in one walk of the chain (without checking the load factor)
+        """
+        bucket = self._buckets.get_at_index(hash % self._capacity)
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value = updated_value(node.value, fn, default)
+            return value
+
+        value = updated_value(MISSING, fn, default)
+        bucket.insert(key, value, hash)
+        self._size += 1
+        return value
+
 
 
     def resize_table(self, new_capacity: int) -> None:
@@ -145,23 +262,34 @@ class HashMap:
         if new_capacity < 1:
             return
         
-        # store the old bucket data
+        # if value is already prime we don't update capacity
+        if not self._valid_capacity(new_capacity):
+            new_capacity = self._round_capacity(new_capacity)
+        # keep growing (like put would) until the load factor stays below 1
+        while self._size - 1 >= new_capacity:
+            new_capacity = self._grow_capacity(new_capacity)
+        self._capacity = new_capacity
+        self._version += 1
+
+        self._rehash()
+
+    def _rehash(self) -> None:
+        """
+        Moves every node of the current buckets straight into a fresh bucket array sized to the (already updated) capacity
+
+        Note: Keys in the old buckets are already unique, so there are no duplicate or load factor checks. Existing nodes are relinked as is, cached hash included
+        """
         oldData = self._buckets
+        capacity = self._capacity
+        buckets = [LinkedList() for _ in range(capacity)]
 
-        # update capacity
-        self._capacity = new_capacity
-        # if value is already prime
-        if not self._is_prime(new_capacity):
-            # we don't update capacity
-            self._capacity = self._next_prime(new_capacity)
-        # clear buckets
-        self.clear()
-
-        # loop through old data
+        # loop through old data and relink each node into its new bucket
+        # (the iterator has already moved past a node when it is handed out)
         for i in range(oldData.length()):
             for item in oldData.get_at_index(i):
-                # reinsert into new data
-                self.put(item.key, item.value)
+                buckets[item.hash % capacity].insert_node(item)
+
+        self._buckets = DynamicArray(buckets)
 
 
     def table_load(self) -> float:
@@ -194,17 +322,27 @@ class HashMap:
         Note: Similar to put but just not adding anything
         """
         # calculate hash to get bucket index
-        index = self._hash_function(key) % self._capacity
+        return self._get(key, self._hash_function(key))
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        index = hash % self._capacity
 
         # find bucket
         bucket = self._buckets.get_at_index(index)
 
         # get value form bucket
-        item = bucket.contains(key)
+        if self._counting:
+            item, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            item = bucket.contains(key, hash)
 
         # return value is exists and None if not
         if item is None:
-            return None
+            return default
         return item.value 
 
     def contains_key(self, key: str) -> bool:
@@ -220,13 +358,25 @@ class HashMap:
 
         Notes: Again, similar to put but removing instead of adding
         """
+        self._version += 1
         # calculate hash to find bucket
-        index = self._hash_function(key) % self._capacity
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        index = hash % self._capacity
 
         # get bucket
         bucket = self._buckets.get_at_index(index)
         # remove if item exists
-        if bucket.remove(key):
+        if self._counting:
+            removed, steps = bucket.counted_remove(key, hash)
+            self._steps += steps
+        else:
+            removed = bucket.remove(key, hash)
+        if removed:
             self._size -= 1
 
     def get_keys_and_values(self) -> DynamicArray:
@@ -247,18 +397,1180 @@ class HashMap:
         # return array with keys and values
         return keysAndValues
 
+    def keys(self) -> KeysView:
+        """
+        Returns a live view of the keys in the hash map
+
+        Note: The view walks the buckets only while it is iterated, nothing is copied. len() and "in" on it answer straight from the map, and every iteration gets its own iterator. Writing to the map while iterating makes the next step raise RuntimeError
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a live view of the values in the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a live view of the (key, value) pairs in the hash map
+        """
+        return ItemsView(self)
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, bucket by bucket
+        """
+        buckets = self._buckets
+        for i in range(buckets.length()):
+            for node in buckets.get_at_index(i):
+                yield node.key, node.value
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every entry, bucket by bucket, with each node's cached (un-modded) hash
+        """
+        buckets = self._buckets
+        for i in range(buckets.length()):
+            for node in buckets.get_at_index(i):
+                yield node.key, node.value, node.hash
+
     def clear(self) -> None:
         """
         Clears the contents of the hash map. It does not change the underlying hash table capacity
         """
-        # reset bucket data (emtying)
-        self._buckets = DynamicArray()
+        # reset bucket data (emtying), building the new array before it replaces the old one
+        self._buckets = DynamicArray([LinkedList() for _ in range(self.get_capacity())])
         # reset size to 0 (emptying)
         self._size = 0
+        self._version += 1
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair into the hash map, same as calling put on each pair in order
+
+        Note: pairs can be a DynamicArray or any iterable. The table is sized once up front for all of them, so the loop never has to check the load factor or resize
+        """
+        self._version += 1
+        pairs = to_list(pairs)
+        self.reserve(self._size + len(pairs))
+
+        # hash the whole batch at once, then hoist the lookup out of the loop
+        hashes = hash_batch(self._hash_function, [pair[0] for pair in pairs])
+        insert = self._insert
+        for (key, value), hash in zip(pairs, hashes):
+            insert(key, value, hash)
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        keys = to_list(keys)
+        # hash the whole batch at once, then hoist the lookup out of the loop
+        hashes = hash_batch(self._hash_function, keys)
+        get = self._get
+        return DynamicArray([get(key, hash) for key, hash in zip(keys, hashes)])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key that is in the hash map
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        self._version += 1
+        keys = to_list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        remove = self._remove
+        for key, hash in zip(keys, hashes):
+            remove(key, hash)
+
+    def reserve(self, count: int) -> None:
+        """
+        Makes sure the hash map can hold count entries in total without resizing again
+
+        Note: Grows straight to the ladder prime that keeps the load factor at or below 1, and never shrinks the table
+        """
+        if count > self._capacity:
+            self.resize_table(self._fit_capacity(count))
+
+    def analyze(self) -> dict:
+        """
+        Returns a report on how well the keys are spread over the buckets, without building the key/value array:
+
+            chain_lengths               histogram {chain length: number of buckets}
+            average_chain               mean length of the non-empty chains (nodes a successful get walks is about half of it)
+            longest_chain               length of the longest chain
+            expected_collision_rate     share of keys expected to land in an occupied bucket with a uniform hash
+            observed_collision_rate     share of keys that actually share their bucket with an earlier key
+        """
+        chains = {}
+        used = 0
+
+        # one pass over the buckets
+        for i in range(self._capacity):
+            length = self._chain_length(i)
+            chains[length] = chains.get(length, 0) + 1
+            if length:
+                used += 1
+
+        expected, observed = collision_rates(self._size, self._capacity, used)
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'load': self.table_load(),
+            'empty_buckets': self._capacity - used,
+            'chain_lengths': sorted_histogram(chains),
+            'average_chain': self._size / used if used else 0.0,
+            'longest_chain': max(chains),
+            'expected_collision_rate': expected,
+            'observed_collision_rate': observed,
+        }
+
+
+    def save(self, path) -> None:
+        """
+        Writes the map to path in the on-disk format that hash_map_mmap.load_map maps back in without rebuilding it
+
+        Note: The file keeps the capacity and hash function (which must be a registered one, see hash_map_mmap)
+        """
+        save_map(self, path)
+
+    def enable_stats(self) -> None:
+        """
+        Starts counting operations, hits/misses, probe steps and resizes (see hash_map_stats)
+
+        Note: Instrumented methods are swapped in on this map only, and its walks only count steps while they are, so a map with stats off pays nothing. Probe steps are the ones the operations themselves walked, so counting them never repeats a lookup
+        """
+        enable_stats(self)
+
+    def disable_stats(self) -> None:
+        """
+        Stops counting and restores the uninstrumented methods
+        """
+        disable_stats(self)
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the counters, or None if stats are not enabled
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is None:
+            return None
+        return stats.snapshot()
+
+    def reset_stats(self) -> None:
+        """
+        Sets all counters back to zero (stats stay enabled)
+        """
+        stats = getattr(self, '_stats', None)
+        if stats is not None:
+            stats.reset()
+
+    def _chain_length(self, index: int) -> int:
+        """
+        Returns the number of entries in the bucket at index
+        """
+        return self._buckets.get_at_index(index).length()
+
+
+class ArrayChainHashMap(HashMap):
+    """
+    HashMap that uses the same separate chaining as HashMap, but stores each chain as one
+    flat Python list of [key, value, hash, key, value, hash, ...] instead of a LinkedList of
+    SLNode objects:
+
+        bucket 0: None                              <- empty buckets have no list at all
+        bucket 1: ['a', 1, 97]
+        bucket 2: ['b', 2, 98, 'k', 5, 107]
+
+    Chains are created on the first insert into a bucket and dropped again when their last
+    entry is removed, so empty_buckets is a single count of None, and a lookup scans one
+    contiguous list instead of chasing next pointers. Each entry costs three list slots
+    instead of an SLNode object.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new HashMap that stores its chains as flat lists
+        """
+        # capacity must be a prime number
+        self._capacity = self._round_capacity(capacity)
+        # function can be a callable or a name from the hash_functions registry
+        self._hash_function = get_hash_function(function)
+        self._size = 0
+
+        # one flat [key, value, hash, ...] list per non-empty bucket, None for empty ones
+        self._chains = [None] * self._capacity
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i, chain in enumerate(self._chains):
+            entries = [f"({chain[j]}: {chain[j + 1]})" for j in range(0, len(chain), 3)] if chain else []
+            out += str(i) + ': [' + ' -> '.join(entries) + ']\n'
+        return out
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        index = hash % self._capacity
+        chain = self._chains[index]
+
+        # first key in this bucket: create its chain
+        if chain is None:
+            self._chains[index] = [key, value, hash]
+            self._size += 1
+            return
+
+        # update the value if the key is already there (cheap hash check first)
+        for i in range(0, len(chain), 3):
+            if chain[i + 2] == hash and chain[i] == key:
+                chain[i + 1] = value
+                if self._counting:
+                    self._steps += i // 3 + 1
+                return
+
+        if self._counting:
+            self._steps += len(chain) // 3
+        chain += (key, value, hash)
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's value in its chain, or appends the key, in one walk of the chain (without checking the load factor)
+        """
+        index = hash % self._capacity
+        chain = self._chains[index]
+
+        if chain is not None:
+            for i in range(0, len(chain), 3):
+                if chain[i + 2] == hash and chain[i] == key:
+                    chain[i + 1] = value = updated_value(chain[i + 1], fn, default)
+                    if self._counting:
+                        self._steps += i // 3 + 1
+                    return value
+
+        value = updated_value(MISSING, fn, default)
+        if chain is None:
+            self._chains[index] = [key, value, hash]
+        else:
+            if self._counting:
+                self._steps += len(chain) // 3
+            chain += (key, value, hash)
+        self._size += 1
+        return value
+
+    def _rehash(self) -> None:
+        """
+        Moves every entry into a fresh chain array sized to the (already updated) capacity
+
+        Note: Keys are already unique, so entries are appended without any checks
+        """
+        capacity = self._capacity
+        chains = [None] * capacity
+
+        for chain in self._chains:
+            if chain is None:
+                continue
+            for i in range(0, len(chain), 3):
+                index = chain[i + 2] % capacity
+                if chains[index] is None:
+                    chains[index] = chain[i:i + 3]
+                else:
+                    chains[index] += chain[i:i + 3]
+
+        self._chains = chains
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._chains.count(None)
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        chain = self._chains[hash % self._capacity]
+        if chain is not None:
+            for i in range(0, len(chain), 3):
+                if chain[i + 2] == hash and chain[i] == key:
+                    if self._counting:
+                        self._steps += i // 3 + 1
+                    return chain[i + 1]
+            if self._counting:
+                self._steps += len(chain) // 3
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        index = hash % self._capacity
+        chain = self._chains[index]
+        if chain is None:
+            return
+
+        for i in range(0, len(chain), 3):
+            if chain[i + 2] == hash and chain[i] == key:
+                del chain[i:i + 3]
+                # an emptied bucket goes back to None
+                if not chain:
+                    self._chains[index] = None
+                self._size -= 1
+                if self._counting:
+                    self._steps += i // 3 + 1
+                return
+        if self._counting:
+            self._steps += len(chain) // 3
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value pair stored in the hash map. The order of the keys in the dynamic array does not matter
+        """
+        pairs = []
+        for chain in self._chains:
+            if chain is not None:
+                pairs.extend(zip(chain[0::3], chain[1::3]))
+        return DynamicArray(pairs)
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, chain by chain
+        """
+        for chain in self._chains:
+            if chain is not None:
+                yield from zip(chain[0::3], chain[1::3])
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every entry, chain by chain, with each entry's cached (un-modded) hash
+        """
+        for chain in self._chains:
+            if chain is not None:
+                yield from zip(chain[0::3], chain[1::3], chain[2::3])
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. It does not change the underlying hash table capacity
+        """
+        self._chains = [None] * self._capacity
+        self._size = 0
+        self._version += 1
+
+    def _chain_length(self, index: int) -> int:
+        """
+        Returns the number of entries in the bucket at index
+        """
+        chain = self._chains[index]
+        return len(chain) // 3 if chain is not None else 0
+
+
+
+class Pow2HashMap(HashMap):
+    """
+    HashMap with power of two capacities: the bucket is hash & (capacity - 1) instead of
+    hash % capacity, and growth is a clean doubling instead of the next prime on the ladder
+
+    Only the low bits of the hash pick the bucket, so this mode needs a well mixed hash function
+    ('murmur64', 'fnv1a' or 'builtin'); hash_function_1 / hash_function_2 cluster badly here
+    """
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity used for a requested one: in this mode the next power of two
+        """
+        return next_power_of_two(capacity)
+
+    def _valid_capacity(self, capacity: int) -> bool:
+        """
+        Returns True if capacity can be used as it is: in this mode a power of two
+        """
+        return is_power_of_two(capacity)
+
+    def _grow_capacity(self, capacity: int) -> int:
+        """
+        Returns the capacity a full table grows to: double
+        """
+        return capacity * 2
+
+    def _fit_capacity(self, count: int) -> int:
+        """
+        Returns the smallest power of two that is at least count
+        """
+        return next_power_of_two(count)
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor
+        """
+        bucket = self._buckets.get_at_index(hash & (self._capacity - 1))
+
+        # check if values need to be replaced (nodes with other hashes are skipped)
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value
+            return
+
+        bucket.insert(key, value, hash)
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's node in place, or adds the key to its bucket, in one walk of the chain (without checking the load factor)
+        """
+        bucket = self._buckets.get_at_index(hash & (self._capacity - 1))
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value = updated_value(node.value, fn, default)
+            return value
+
+        value = updated_value(MISSING, fn, default)
+        bucket.insert(key, value, hash)
+        self._size += 1
+        return value
+
+    def _rehash(self) -> None:
+        """
+        Moves every node of the current buckets straight into a fresh bucket array sized to the (already updated) capacity
+        """
+        oldData = self._buckets
+        mask = self._capacity - 1
+        buckets = [LinkedList() for _ in range(self._capacity)]
+
+        for i in range(oldData.length()):
+            for item in oldData.get_at_index(i):
+                buckets[item.hash & mask].insert_node(item)
+
+        self._buckets = DynamicArray(buckets)
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        bucket = self._buckets.get_at_index(hash & (self._capacity - 1))
+        if self._counting:
+            item, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            item = bucket.contains(key, hash)
+        if item is None:
+            return default
+        return item.value
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        bucket = self._buckets.get_at_index(hash & (self._capacity - 1))
+        if self._counting:
+            removed, steps = bucket.counted_remove(key, hash)
+            self._steps += steps
+        else:
+            removed = bucket.remove(key, hash)
+        if removed:
+            self._size -= 1
+
+
+
+class IncrementalHashMap(HashMap):
+    """
+    HashMap that grows incrementally instead of all at once.
+
+    When put would resize, the map only allocates the new bucket array (with every bucket
+    still None). The old buckets are kept and every following put / get / remove first moves
+    the chains of the next _migrate_step old buckets over, and creates the next few new
+    LinkedLists, so no single operation does more than a fixed amount of rehash work.
+
+    While the move is running a key lives in exactly one of the two tables: lookups try its
+    new bucket and then its old one. Moved old buckets are set to None.
+
+    resize_table (and reserve / put_many, which use it) is still synchronous: it finishes any
+    running move first, as do the methods that walk the whole table anyway
+    """
+
+    # old buckets moved on every operation while a resize is running
+    _migrate_step = 8
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """
+        Initialize new HashMap that grows incrementally
+        """
+        super().__init__(capacity, function)
+        # the buckets being moved out of (None when no resize is running)
+        self._old_buckets = None
+        self._old_capacity = 0
+        # next old bucket to move, and first new bucket that may still be None
+        self._migrated = 0
+        self._created = 0
+
+    def is_resizing(self) -> bool:
+        """
+        Returns True while entries are still being moved out of an old table
+        """
+        return self._old_buckets is not None
+
+    def _make_room(self) -> None:
+        """
+        Starts growing the table before one more key goes in, if the load factor reached 1
+        """
+        # the new table (at least 1.5x bigger) can't fill up before the old one is empty
+        if self._needs_room():
+            self._start_resize(self._grow_capacity(self._capacity))
+
+    def _needs_room(self) -> bool:
+        """
+        Returns True if one more key needs _make_room first: the load factor reached 1 and no resize is running
+        """
+        return self._old_buckets is None and self.table_load() >= 1
+
+    def _start_resize(self, new_capacity: int) -> None:
+        """
+        Makes the current buckets the old table and allocates an array of not-yet-created buckets
+        """
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrated = 0
+        self._created = 0
+
+        self._capacity = new_capacity
+        self._buckets = DynamicArray([None] * new_capacity)
+
+    def _bucket(self, index: int) -> LinkedList:
+        """
+        Returns the new table's bucket at index, creating it if the migration hasn't yet
+        """
+        bucket = self._buckets.get_at_index(index)
+        if bucket is None:
+            bucket = LinkedList()
+            self._buckets.set_at_index(index, bucket)
+        return bucket
+
+    def _migrate(self, count: int) -> None:
+        """
+        Moves the chains of the next count old buckets into the new table, dropping the old table when it is done
+        """
+        old = self._old_buckets
+        capacity = self._capacity
+
+        start = self._migrated
+        end = min(start + count, self._old_capacity)
+        moved = 0
+        for i in range(start, end):
+            bucket = old.get_at_index(i)
+            moved += bucket.length()
+            # the iterator has already moved past a node when it is handed out
+            for item in bucket:
+                self._bucket(item.hash % capacity).insert_node(item)
+            old.set_at_index(i, None)
+        self._migrated = end
+        # the operation that did the moving walked these nodes too
+        if self._counting:
+            self._steps += moved
+
+        # create the untouched new buckets at the same pace, so they are all there at the end
+        created = -(-end * capacity // self._old_capacity)
+        for i in range(self._created, created):
+            if self._buckets.get_at_index(i) is None:
+                self._buckets.set_at_index(i, LinkedList())
+        self._created = created
+
+        if end == self._old_capacity:
+            self._old_buckets = None
+            self._old_capacity = 0
+
+    def _finish_resize(self) -> None:
+        """
+        Moves everything that is left in the old table
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+    def _old_bucket(self, hash: int):
+        """
+        Returns the key's old bucket, or None if it has been moved already
+        """
+        return self._old_buckets.get_at_index(hash % self._old_capacity)
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor (moving the next few old buckets first)
+        """
+        if self._old_buckets is None:
+            super()._insert(key, value, hash)
+            return
+
+        self._migrate(self._migrate_step)
+        if self._old_buckets is not None:
+            # a key that hasn't moved yet is updated where it is
+            old = self._old_bucket(hash)
+            if old is not None:
+                if self._counting:
+                    node, steps = old.counted_contains(key, hash)
+                    self._steps += steps
+                else:
+                    node = old.contains(key, hash)
+                if node is not None:
+                    node.value = value
+                    return
+
+        bucket = self._bucket(hash % self._capacity)
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value
+            return
+        bucket.insert(key, value, hash)
+        self._size += 1
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's node in place (in whichever table it is), or adds the key to its new bucket (moving the next few old buckets first)
+        """
+        if self._old_buckets is None:
+            return super()._upsert(key, hash, fn, default)
+
+        self._migrate(self._migrate_step)
+        old = self._old_bucket(hash) if self._old_buckets is not None else None
+        bucket = self._bucket(hash % self._capacity)
+        # a key lives in exactly one of the two tables
+        node = None
+        if old is not None:
+            if self._counting:
+                node, steps = old.counted_contains(key, hash)
+                self._steps += steps
+            else:
+                node = old.contains(key, hash)
+        if node is None:
+            if self._counting:
+                node, steps = bucket.counted_contains(key, hash)
+                self._steps += steps
+            else:
+                node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value = updated_value(node.value, fn, default)
+            return value
+
+        value = updated_value(MISSING, fn, default)
+        bucket.insert(key, value, hash)
+        self._size += 1
+        return value
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key
+        """
+        if self._old_buckets is None:
+            return super()._get(key, hash, default)
+
+        self._migrate(self._migrate_step)
+        for bucket in (self._buckets.get_at_index(hash % self._capacity),
+                       self._old_bucket(hash) if self._old_buckets is not None else None):
+            if bucket is not None:
+                if self._counting:
+                    item, steps = bucket.counted_contains(key, hash)
+                    self._steps += steps
+                else:
+                    item = bucket.contains(key, hash)
+                if item is not None:
+                    return item.value
+        return default
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        if self._old_buckets is None:
+            super()._remove(key, hash)
+            return
+
+        self._migrate(self._migrate_step)
+        for bucket in (self._buckets.get_at_index(hash % self._capacity),
+                       self._old_bucket(hash) if self._old_buckets is not None else None):
+            if bucket is None:
+                continue
+            if self._counting:
+                removed, steps = bucket.counted_remove(key, hash)
+                self._steps += steps
+            else:
+                removed = bucket.remove(key, hash)
+            if removed:
+                self._size -= 1
+                return
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table right away, finishing any incremental resize first
+        """
+        self._finish_resize()
+        super().resize_table(new_capacity)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table (finishing any incremental resize first)
+        """
+        self._finish_resize()
+        return super().empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry in the hash map
+        """
+        self._finish_resize()
+        return super().get_keys_and_values()
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry (finishing any incremental resize first, so gets can't move nodes mid-walk)
+        """
+        self._finish_resize()
+        return super()._pairs()
+
+    def _hashed_pairs(self):
+        """
+        Returns a generator of (key, value, hash) for every entry (finishing any incremental resize first, like _pairs)
+        """
+        self._finish_resize()
+        return super()._hashed_pairs()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing its capacity (dropping any old table)
+        """
+        self._old_buckets = None
+        self._old_capacity = 0
+        super().clear()
+
+    def analyze(self) -> dict:
+        """
+        Returns the report of HashMap.analyze, for the table as it is once any incremental resize is finished
+        """
+        self._finish_resize()
+        return super().analyze()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output (finishing any incremental resize first)
+        """
+        self._finish_resize()
+        return super().__str__()
+
+
+
+class SortedBucket:
+    """
+    Bucket that keeps its SLNodes sorted by (cached hash, key) so lookups can binary search
+    Supported methods are the LinkedList ones the HashMap uses: insert, insert_node, remove, contains, length, iterator
+
+    Note: Keys with the same hash (every anagram under hash_function_1) are ordered by the key itself, so keys must be comparable (strings)
+    """
+
+    def __init__(self, nodes=()) -> None:
+        """
+        Initialize the bucket with the given nodes
+        """
+        nodes = sorted(nodes, key=lambda node: (node.hash, node.key))
+        # parallel sorted lists, hashes and keys for the binary search and the nodes themselves
+        self._hashes = [node.hash for node in nodes]
+        self._keys = [node.key for node in nodes]
+        self._nodes = nodes
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'SORTED [' + ' -> '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes, in (hash, key) order."""
+        return iter(self._nodes)
+
+    def _search(self, key: str, hash: int) -> tuple:
+        """
+        Returns (index, found): where the key is, or where it would be inserted
+        """
+        # narrow down to the run of nodes with this hash, then to the key inside it
+        low = bisect_left(self._hashes, hash)
+        high = bisect_right(self._hashes, hash, low)
+        index = bisect_left(self._keys, key, low, high)
+        return index, index < high and self._keys[index] == key
+
+    def insert(self, key: str, value: object, hash: int) -> None:
+        """Insert a new node (the key must not be in the bucket yet)."""
+        self.insert_node(SLNode(key, value, None, hash))
+
+    def insert_node(self, node: SLNode) -> None:
+        """Add an existing node at its sorted position (used when rehashing)."""
+        index, _ = self._search(node.key, node.hash)
+        node.next = None
+        self._hashes.insert(index, node.hash)
+        self._keys.insert(index, node.key)
+        self._nodes.insert(index, node)
+
+    def remove(self, key: str, hash: int) -> bool:
+        """
+        Remove the node with matching key.
+        Return True if removal was successful, False otherwise.
+        """
+        index, found = self._search(key, hash)
+        if not found:
+            return False
+        del self._hashes[index]
+        del self._keys[index]
+        del self._nodes[index]
+        return True
+
+    def contains(self, key: str, hash: int) -> SLNode:
+        """Return node with matching key, or None if no match."""
+        index, found = self._search(key, hash)
+        return self._nodes[index] if found else None
+
+    def counted_remove(self, key: str, hash: int) -> tuple:
+        """Same as remove, but return (removed, comparisons made), like LinkedList.counted_remove."""
+        # a binary search over n nodes makes at most n.bit_length() comparisons
+        steps = len(self._nodes).bit_length()
+        return self.remove(key, hash), steps
+
+    def counted_contains(self, key: str, hash: int) -> tuple:
+        """Same as contains, but return (node or None, comparisons made), like LinkedList.counted_contains."""
+        return self.contains(key, hash), len(self._nodes).bit_length()
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+
+class TreeifyHashMap(HashMap):
+    """
+    HashMap that promotes a chain to a SortedBucket once it holds more than _treeify_threshold
+    nodes, and demotes it back to a LinkedList when it shrinks below _untreeify_threshold.
+
+    A get in a sorted bucket is a binary search on (hash, key), so even when a poor or
+    adversarial hash piles hundreds of keys into one bucket (all anagrams share a bucket under
+    hash_function_1) a lookup stays O(log n). The thresholds are apart so a bucket hovering
+    around one of them doesn't keep converting back and forth.
+    """
+
+    _treeify_threshold = 8
+    _untreeify_threshold = 6
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key without checking the load factor, promoting its bucket if it got too long
+        """
+        index = hash % self._capacity
+        bucket = self._buckets.get_at_index(index)
+
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value
+            return
+
+        bucket.insert(key, value, hash)
+        self._size += 1
+        if bucket.length() > self._treeify_threshold and isinstance(bucket, LinkedList):
+            self._buckets.set_at_index(index, SortedBucket(bucket))
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates the key's node in place, or adds the key to its bucket (promoting it if it got too long), in one search
+        """
+        index = hash % self._capacity
+        bucket = self._buckets.get_at_index(index)
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is not None:
+            node.value = value = updated_value(node.value, fn, default)
+            return value
+
+        value = updated_value(MISSING, fn, default)
+        bucket.insert(key, value, hash)
+        self._size += 1
+        if bucket.length() > self._treeify_threshold and isinstance(bucket, LinkedList):
+            self._buckets.set_at_index(index, SortedBucket(bucket))
+        return value
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash, demoting its bucket if it got short
+        """
+        index = hash % self._capacity
+        bucket = self._buckets.get_at_index(index)
+        if self._counting:
+            removed, steps = bucket.counted_remove(key, hash)
+            self._steps += steps
+        else:
+            removed = bucket.remove(key, hash)
+        if not removed:
+            return
+
+        self._size -= 1
+        if bucket.length() < self._untreeify_threshold and isinstance(bucket, SortedBucket):
+            chain = LinkedList()
+            for node in bucket:
+                chain.insert_node(node)
+            self._buckets.set_at_index(index, chain)
+
+    def _rehash(self) -> None:
+        """
+        Relinks every node into fresh LinkedLists (see HashMap._rehash), then promotes the chains that are too long
+        """
+        super()._rehash()
+        for index in range(self._capacity):
+            bucket = self._buckets.get_at_index(index)
+            if bucket.length() > self._treeify_threshold:
+                self._buckets.set_at_index(index, SortedBucket(bucket))
+
+    def analyze(self) -> dict:
+        """
+        Returns the report of HashMap.analyze, plus sorted_buckets: how many buckets are currently sorted
+        """
+        report = super().analyze()
+        report['sorted_buckets'] = sum(isinstance(self._buckets.get_at_index(i), SortedBucket)
+                                       for i in range(self._capacity))
+        return report
+
+
+
+class ConcurrentHashMap(HashMap):
+    """
+    Thread-safe HashMap with lock striping: bucket i is guarded by lock i % stripes, so
+    threads writing to buckets of different stripes don't wait on each other.
+
+        put / remove    take the key's stripe lock. If a resize swapped the bucket array while
+                        the thread waited for it, the operation starts over on the new array
+        get             takes no lock. Chains are only ever changed by publishing a fully built
+                        node or by re-pointing a single next / value reference, and a resize
+                        copies nodes into a brand new array instead of relinking them, so a
+                        reader always walks a consistent chain (of the array it started on)
+        resize_table    takes every stripe lock (always in the same order), so no write runs
+                        during the rehash
+        clear           takes every stripe lock too, and swaps in an empty bucket array that is
+                        already fully built, so a lock-free get never sees it half filled
+
+    The size is kept as one counter per stripe, summed when it is read.
+
+    The keys() / values() / items() views walk the buckets without locks as well, and stop with
+    RuntimeError once any thread writes to the map; get_keys_and_values copies every entry as of
+    one moment instead.
+
+    Note: Stats mode counters are not synchronized, so only use it from a single thread
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 stripes: int = 16) -> None:
+        """
+        Initialize new HashMap that can be shared between threads, with the given number of stripe locks
+        """
+        self._stripe_count = max(1, stripes)
+        self._locks = [threading.Lock() for _ in range(self._stripe_count)]
+        super().__init__(capacity, function)
+
+    # the size is the sum of the per-stripe counters (HashMap's methods keep reading self._size)
+    @property
+    def _size(self) -> int:
+        return sum(self._counts)
+
+    @_size.setter
+    def _size(self, value: int) -> None:
+        self._counts = [value] + [0] * (self._stripe_count - 1)
+
+    @contextmanager
+    def _all_stripes(self):
+        """
+        Holds every stripe lock for the duration of a with block
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def _make_room(self) -> None:
+        """
+        Grows the table before one more key goes in, if the load factor reached 1
+        """
+        buckets = self._buckets
+        if self._size >= buckets.length():
+            self._grow(buckets)
+
+    def _needs_room(self) -> bool:
+        """
+        Returns True if one more key needs _make_room first: the load factor reached 1
+        """
+        return self._size >= self._buckets.length()
+
+    def _grow(self, buckets: DynamicArray) -> None:
+        """
+        Grows the table, unless another thread already replaced the given bucket array
+        """
+        with self._all_stripes():
+            if self._buckets is buckets:
+                HashMap.resize_table(self, self._grow_capacity(self._capacity))
+
+    def _insert(self, key: str, value: object, hash: int) -> None:
+        """
+        Places or updates the key under its stripe lock, without checking the load factor
+        """
+        while True:
+            buckets = self._buckets
+            index = hash % buckets.length()
+            stripe = index % self._stripe_count
+            with self._locks[stripe]:
+                # resized while we waited for the lock: try again on the new array
+                if buckets is not self._buckets:
+                    continue
+
+                bucket = buckets.get_at_index(index)
+                if self._counting:
+                    node, steps = bucket.counted_contains(key, hash)
+                    self._steps += steps
+                else:
+                    node = bucket.contains(key, hash)
+                if node is not None:
+                    node.value = value
+                    return
+                bucket.insert(key, value, hash)
+                self._counts[stripe] += 1
+                return
+
+    def _upsert(self, key: str, hash: int, fn, default: object) -> object:
+        """
+        Updates or adds the key under its stripe lock, so concurrent increments of one key are never lost
+
+        Note: fn runs while the stripe lock is held, so it must not call back into the map
+        """
+        while True:
+            buckets = self._buckets
+            index = hash % buckets.length()
+            stripe = index % self._stripe_count
+            with self._locks[stripe]:
+                # resized while we waited for the lock: try again on the new array
+                if buckets is not self._buckets:
+                    continue
+
+                bucket = buckets.get_at_index(index)
+                if self._counting:
+                    node, steps = bucket.counted_contains(key, hash)
+                    self._steps += steps
+                else:
+                    node = bucket.contains(key, hash)
+                if node is not None:
+                    node.value = value = updated_value(node.value, fn, default)
+                    return value
+                value = updated_value(MISSING, fn, default)
+                bucket.insert(key, value, hash)
+                self._counts[stripe] += 1
+                return value
+
+    def _get(self, key: str, hash: int, default: object = None):
+        """
+        Same as get, but takes the key's already computed (un-modded) hash, and returns default for a missing key (no lock needed)
+        """
+        # the array is read once, and its own length is the capacity it was built for
+        buckets = self._buckets
+        bucket = buckets.get_at_index(hash % buckets.length())
+        if self._counting:
+            node, steps = bucket.counted_contains(key, hash)
+            self._steps += steps
+        else:
+            node = bucket.contains(key, hash)
+        if node is None:
+            return default
+        return node.value
+
+    def _remove(self, key: str, hash: int) -> None:
+        """
+        Same as remove, but takes the key's already computed (un-modded) hash
+        """
+        while True:
+            buckets = self._buckets
+            index = hash % buckets.length()
+            stripe = index % self._stripe_count
+            with self._locks[stripe]:
+                if buckets is not self._buckets:
+                    continue
+                bucket = buckets.get_at_index(index)
+                if self._counting:
+                    removed, steps = bucket.counted_remove(key, hash)
+                    self._steps += steps
+                else:
+                    removed = bucket.remove(key, hash)
+                if removed:
+                    self._counts[stripe] -= 1
+                return
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table while holding every stripe lock
+        """
+        with self._all_stripes():
+            super().resize_table(new_capacity)
+
+    def _rehash(self) -> None:
+        """
+        Copies every entry into a fresh bucket array sized to the (already updated) capacity, then swaps it in
+
+        Note: Unlike HashMap._rehash the nodes are copied, not relinked, so lock-free readers still walking the old array never end up in a new chain
+        """
+        oldData = self._buckets
+        capacity = self._capacity
+        buckets = [LinkedList() for _ in range(capacity)]
+
+        for i in range(oldData.length()):
+            for node in oldData.get_at_index(i):
+                buckets[node.hash % capacity].insert(node.key, node.value, node.hash)
+
+        self._buckets = DynamicArray(buckets)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry, as of one moment (writes wait meanwhile)
+        """
+        with self._all_stripes():
+            return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. It does not change the underlying hash table capacity
+        """
+        # the empty array is built in full and swapped in with one assignment, so a lock-free get
+        # (or a writer waiting for its stripe) never sees a partly filled one
+        buckets = DynamicArray([LinkedList() for _ in range(self._capacity)])
+        with self._all_stripes():
+            self._buckets = buckets
+            self._size = 0
+            self._version += 1
 
-        # resetting buckets
-        for _ in range(self.get_capacity()):
-            self._buckets.append(LinkedList())
 
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
@@ -272,32 +1584,24 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     # using the instance of seperate chaining hashmap
     map = HashMap()
 
-    # loop through dynamic array
+    # loop through dynamic array, counting every value (one chain walk per element)
+    increment = map.increment
     for i in range(da.length()):
-        key = da.get_at_index(i)
-        num = 1
-        # if we find value
-        if map.contains_key(key):
-            # add to our count
-            num = map.get(key) + 1
-            # put key, num
-        map.put(key, num)
-    
+        increment(da.get_at_index(i))
+
     mode = DynamicArray()
     max = -1
-    map_values = map.get_keys_and_values()
 
-    # loop through mapped values
-    for i in range(map_values.length()):
-        item = map_values.get_at_index(i)
+    # loop through the counts (the items view doesn't copy them into an array first)
+    for key, count in map.items():
         # if new max is found
-        if item[1] > max:
+        if count > max:
             mode = DynamicArray()
             # update max
-            max = item[1]
-        if item[1] == max:
+            max = count
+        if count == max:
             # append item
-            mode.append(item[0])
+            mode.append(key)
 
     return mode, max
 
@@ -502,3 +1806,257 @@ if __name__ == "__main__":
         da = DynamicArray(case)
         mode, frequency = find_mode(da)
         print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}\n")
+
+    print("\nanalyze example 1")
+    print("-----------------")
+    # hash_function_1 sums the letters: 'ab' and 'ba' share bucket 8 (195 % 11), 'c' is alone in bucket 0
+    m = HashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'c'):
+        m.put(key, key.upper())
+    report = m.analyze()
+    print(report['chain_lengths'], report['chain_lengths'] == {0: 9, 1: 1, 2: 1})
+    print(report['empty_buckets'], report['longest_chain'], report['average_chain'], round(report['observed_collision_rate'], 2))
+    m.remove('ab')
+    print(m.analyze()['chain_lengths'], m.get('ba'))
+
+    print("\nPow2HashMap example 1 (bucket = hash & (capacity - 1))")
+    print("------------------------------------------------------")
+    # hash_function_1 sums the letters: 'ab' / 'ba' (195 & 15) and 'c' (99 & 15) all land in
+    # bucket 3 of 16, 'd' (100 & 15) in bucket 4
+    m = Pow2HashMap(10, hash_function_1)
+    for key in ('ab', 'ba', 'c', 'd'):
+        m.put(key, key.upper())
+    report = m.analyze()
+    print(m.get_capacity(), report['chain_lengths'], report['longest_chain'])
+    m.remove('ba')
+    print(m.get('ab'), m.get('ba'), m.get('c'), m.get('d'), m.get_size())
+
+    print("\nPow2HashMap example 2 (capacities double)")
+    print("-----------------------------------------")
+    m = Pow2HashMap(10, 'murmur64')
+    capacities = [m.get_capacity()]
+    for i in range(100):
+        m.put('key' + str(i), i)
+        if m.get_capacity() != capacities[-1]:
+            capacities.append(m.get_capacity())
+    print(capacities)
+    # requested capacities round up to a power of two, and grow until the load factor is below 1
+    for capacity in (300, 50, 5):
+        m.resize_table(capacity)
+        print(capacity, m.get_capacity(), m.get_size(), all(m.get('key' + str(i)) == i for i in range(100)))
+
+    print("\nIncrementalHashMap example 1 (operations while a resize is running)")
+    print("-------------------------------------------------------------------")
+    m = IncrementalHashMap(23, hash_function_1)
+    # move a single old bucket per operation, so the resize stays visible for a while
+    m._migrate_step = 1
+    expected = {}
+    i = 0
+    while not m.is_resizing():
+        m.put('key' + str(i), i)
+        expected['key' + str(i)] = i
+        i += 1
+    print(m.get_size(), m.get_capacity(), m.is_resizing())
+    # an update of a key still in the old table, a new key, a remove and increments on both tables
+    m.put('key0', 100)
+    m.put('new', -1)
+    m.remove('key1')
+    m.increment('key2', 5)
+    m.increment('count')
+    m.increment('count')
+    expected.update({'key0': 100, 'new': -1, 'count': 2})
+    expected['key2'] += 5
+    del expected['key1']
+    resizing = m.is_resizing()
+    result = all(m.get(key) == value for key, value in expected.items())
+    result &= m.get('key1') is None and m.get('missing') is None and m.get_size() == len(expected)
+    print(resizing, result, m.is_resizing())
+
+    print("\nIncrementalHashMap example 2 (whole-table methods while a resize is running)")
+    print("----------------------------------------------------------------------------")
+    for operation in ('get_keys_and_values', 'resize_table', 'clear'):
+        m = IncrementalHashMap(23, hash_function_1)
+        m._migrate_step = 1
+        expected = {}
+        i = 0
+        while not m.is_resizing():
+            m.put('key' + str(i), i)
+            expected['key' + str(i)] = i
+            i += 1
+        m.remove('key0')
+        del expected['key0']
+        resizing = m.is_resizing()
+
+        if operation == 'get_keys_and_values':
+            result = dict(to_list(m.get_keys_and_values())) == expected
+        elif operation == 'resize_table':
+            m.resize_table(101)
+            result = m.get_capacity() == 101 and dict(to_list(m.get_keys_and_values())) == expected
+        else:
+            m.clear()
+            m.put('key1', 'after')
+            result = m.get_size() == 1 and m.get('key1') == 'after' and m.get('key2') is None
+        print(operation, resizing, m.is_resizing(), result)
+
+    print("\nArrayChainHashMap example 1 (flat chains)")
+    print("-----------------------------------------")
+    # hash_function_1 sums the letters: 'ab' / 'ba' share bucket 8 (195 % 11) with 'ad' (197 % 11 = 10)
+    # and 'c' (99 % 11 = 0) on their own
+    m = ArrayChainHashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'ad', 'c'):
+        m.put(key, key.upper())
+    m.put('ba', 'BA2')
+    print(m.get_size(), m.empty_buckets(), m._chains[8], m._chains[10])
+    result = m.get('ab') == 'AB' and m.get('ba') == 'BA2' and m.get('ad') == 'AD' and m.get('ca') is None
+    # removing the first entry of a chain keeps the rest, removing the last one drops the list
+    m.remove('ab')
+    m.remove('ad')
+    m.remove('ad')
+    result &= m._chains[8] == ['ba', 'BA2', 195] and m._chains[10] is None
+    result &= m.get('ab') is None and m.get('ba') == 'BA2' and m.get_size() == 2
+    print(result, m.empty_buckets())
+
+    print("\nArrayChainHashMap example 2 (growth and clear)")
+    print("----------------------------------------------")
+    m = ArrayChainHashMap(11, 'murmur64')
+    for i in range(100):
+        m.put('key' + str(i), i)
+    print(m.get_size(), m.get_capacity(), round(m.table_load(), 2), m.empty_buckets())
+    print(all(m.get('key' + str(i)) == i for i in range(100)), m.get('key100'))
+    # 23 is too small for 100 keys, so it grows along the ladder (53, 97, 193) like put would
+    m.resize_table(23)
+    print(m.get_capacity(), all(m.get('key' + str(i)) == i for i in range(100)))
+    m.clear()
+    print(m.get_size(), m.get_capacity(), m.empty_buckets(), m.get('key1'))
+
+    print("\nTreeifyHashMap example 1 (thresholds 8 / 6)")
+    print("-------------------------------------------")
+    # every ordering of 'abcd' sums to 394 under hash_function_1, so they all share bucket 394 % 53 = 23
+    keys = ['abcd', 'abdc', 'acbd', 'acdb', 'adbc', 'adcb', 'bacd', 'badc', 'bcad', 'bcda']
+    m = TreeifyHashMap(53, hash_function_1)
+    for count, key in enumerate(keys, 1):
+        m.put(key, key.upper())
+        # the bucket is sorted once it holds more than 8 nodes
+        print(count, type(m._buckets.get_at_index(23)).__name__, m.analyze()['sorted_buckets'])
+    result = all(m.get(key) == key.upper() for key in keys) and m.get('bdac') is None
+    print(result, m.get_size())
+    # a resize rebuilds the chains as LinkedLists and sorts the long one again (now bucket 394 % 97 = 6)
+    grown = TreeifyHashMap(53, hash_function_1)
+    for key in keys:
+        grown.put(key, key.upper())
+    grown.resize_table(97)
+    print(type(grown._buckets.get_at_index(6)).__name__, all(grown.get(key) == key.upper() for key in keys))
+
+    print("\nTreeifyHashMap example 2 (removing from a sorted bucket)")
+    print("--------------------------------------------------------")
+    # a missing key changes nothing, and the bucket stays sorted until it drops below 6 nodes
+    m.remove('bdac')
+    for key in keys[:5]:
+        m.remove(key)
+        remaining = keys[keys.index(key) + 1:]
+        result = all(m.get(key) == key.upper() for key in remaining) and m.get(key) is None
+        print(key, m.get_size(), type(m._buckets.get_at_index(23)).__name__, result)
+    # a LinkedList again, which keeps working
+    m.put('abcd', 'again')
+    m.remove('bcda')
+    print(m.get('abcd'), m.get('bcda'), m.get_size())
+
+    print("\nConcurrentHashMap example 1 (writers, readers and growth in several threads)")
+    print("----------------------------------------------------------------------------")
+    import sys
+
+    # switch threads far more often than usual, so writes, lock-free reads and _grow interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    m = ConcurrentHashMap(11, 'murmur64', stripes=4)
+    # keys that are there from the start, every reader must always find them
+    for i in range(50):
+        m.put('fixed' + str(i), i)
+    missed = []
+
+    def write(thread: int) -> None:
+        # distinct keys per thread (the table grows from 11 buckets while they go in), one shared counter,
+        # and a remove of every third key
+        for i in range(2000):
+            m.put(f't{thread}-{i}', i)
+            m.increment('counter')
+            if i % 3 == 0:
+                m.remove(f't{thread}-{i}')
+
+    def read() -> None:
+        for _ in range(20):
+            for i in range(50):
+                if m.get('fixed' + str(i)) != i:
+                    missed.append(i)
+
+    threads = [threading.Thread(target=write, args=(thread,)) for thread in range(4)]
+    threads += [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(interval)
+
+    expected = {'fixed' + str(i): i for i in range(50)}
+    expected['counter'] = 4 * 2000
+    for thread in range(4):
+        expected.update({f't{thread}-{i}': i for i in range(2000) if i % 3 != 0})
+    print(m.get_size(), len(expected), m.get('counter'), m.get_capacity())
+    print(dict(m.items()) == expected, dict(to_list(m.get_keys_and_values())) == expected, missed)
+
+    print("\nConcurrentHashMap example 2 (clear while other threads write and read)")
+    print("-----------------------------------------------------------------------")
+    sys.setswitchinterval(1e-6)
+    errors, lost, sizes = [], [], []
+
+    def write(thread: int) -> None:
+        # mostly lock-free gets (a put waiting for its stripe lock can't start during the clear),
+        # and 50 more puts once the clear is over so the ones made during it aren't cleared away
+        i = after = 0
+        try:
+            while after < 50:
+                if cleared.is_set():
+                    after += 1
+                m.put(f't{thread}-{i}', i)
+                for j in range(4):
+                    m.get(f't{thread}-{i // 2 + j}')
+                i += 1
+        except Exception as error:
+            errors.append(error)
+
+    def clear() -> None:
+        m.clear()
+        cleared.set()
+
+    for _ in range(10):
+        m = ConcurrentHashMap(20011, 'murmur64', stripes=4)
+        cleared = threading.Event()
+        threads = [threading.Thread(target=write, args=(thread,)) for thread in range(4)]
+        threads.append(threading.Thread(target=clear))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # every key that survived the clear went into its own bucket, so get finds it again
+        pairs = to_list(m.get_keys_and_values())
+        lost += [key for key, value in pairs if m.get(key) != value]
+        sizes.append(m.get_size() == len(pairs))
+    sys.setswitchinterval(interval)
+
+    print(errors, lost, all(sizes))
+
+    print("\nupsert example 1 (missing keys, present keys and keys mapped to None)")
+    print("---------------------------------------------------------------------")
+    for cls in (HashMap, ArrayChainHashMap, Pow2HashMap, IncrementalHashMap, TreeifyHashMap, ConcurrentHashMap):
+        m = cls(11, hash_function_1)
+        m.put('word', 2)
+        m.put('none', None)
+        # missing: increment starts at 0, setdefault stores the default, update_with stores fn(default)
+        missing = [m.increment('new'), m.setdefault('other', 'x'), m.update_with('list', lambda value: value + [1], [])]
+        # present: increment adds, setdefault keeps the value, update_with replaces it with fn(value)
+        present = [m.increment('word', 3), m.setdefault('word', 0), m.update_with('list', lambda value: value + [2])]
+        # a key mapped to None is present too: setdefault keeps None and fn gets None
+        mapped_to_none = [m.setdefault('none', 'default'), m.update_with('none', lambda value: [value])]
+        print(cls.__name__, missing, present, mapped_to_none, m.get_size())
@@ -0,0 +1,336 @@
+# Description: HashMap Implementation - Sharded map built in parallel across processes
+
+# <-- Notes -->
+# One HashMap is one Python object graph, so building it runs on a single core no matter how
+# many the machine has. ShardedHashMap splits the keys between N independent shards (each a
+# regular separate chaining or open addressing map) by their hash:
+#
+#       shard = mix(hash(key)) % N          every key lives in exactly one shard
+#
+# The shard index comes from the high bits of hash * _SHARD_MULTIPLIER rather than from
+# hash % N, because each shard then indexes its own table with hash % capacity (or
+# hash & (capacity - 1) for the power of two maps): with hash % N a shard would only ever see
+# keys that agree in their low bits, and a power of two shard would use 1/N of its slots.
+#
+# build() makes the shards in a ProcessPoolExecutor, in two rounds:
+#
+#   1. the input is cut into chunks. Each worker hashes one chunk (batch hashed, see
+#      hash_functions.hash_batch) and splits it into N parts, one per shard
+#   2. each worker builds one shard from that shard's parts of every chunk (sized once with
+#      reserve, then filled without load checks) and sends the finished map back
+#
+# Parts are handed over as parallel (keys, values, hashes) lists, which pickle faster than one
+# tuple per entry, and their hashes are reused so every key is hashed exactly once. Chunks are
+# processed in input order, so a key that appears twice keeps its last value, like put_many.
+#
+# After build() the shards live in this process. get_many / put_many / remove_many hash the
+# whole batch once, group it by shard and hand every shard its group in one go.
+#
+# Worker processes don't share Python's salted string hash (unless PYTHONHASHSEED is set), so
+# build() refuses the "builtin" hash function when it uses more than one process.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+from a6_include import DynamicArray, hash_function_1
+from hash_functions import get_hash_function, hash_batch, require_stable_hash
+from hash_map_helpers import to_list
+from hash_map_oa import ArrayHashMap
+from hash_map_views import ItemsView, KeysView, ValuesView
+
+# odd 64 bit constant (2^64 / golden ratio) that spreads a hash over the high bits of the product
+_SHARD_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+def _shard_index(hash: int, shards: int) -> int:
+    """
+    Returns the shard a key with this (un-modded) hash belongs to
+    """
+    return (((hash * _SHARD_MULTIPLIER) & _MASK_64) >> 32) % shards
+
+
+def _partition(pairs: list, shards: int, function) -> list:
+    """
+    Hashes a chunk of (key, value) pairs and returns one (keys, values, hashes) part per shard
+
+    Note: Runs in a worker process during build()
+    """
+    parts = [([], [], []) for _ in range(shards)]
+    hashes = hash_batch(function, [pair[0] for pair in pairs])
+    for (key, value), hash in zip(pairs, hashes):
+        keys, values, part_hashes = parts[_shard_index(hash, shards)]
+        keys.append(key)
+        values.append(value)
+        part_hashes.append(hash)
+    return parts
+
+
+def _build_shard(map_class, function, parts: list):
+    """
+    Returns a new map_class map holding every (keys, values, hashes) part, in order
+
+    Note: Runs in a worker process during build()
+    """
+    shard = map_class(11, function)
+    shard.reserve(sum(len(keys) for keys, _, _ in parts))
+    insert = shard._insert
+    for keys, values, hashes in parts:
+        for key, value, hash in zip(keys, values, hashes):
+            insert(key, value, hash)
+    return shard
+
+
+class ShardedHashMap:
+    """
+    HashMap split into independent shards by key hash, so it can be built on several cores
+
+    Any separate chaining or open addressing map works as a shard (map_class), as long as it
+    pickles for build() (ConcurrentHashMap, with its locks, does not)
+    """
+
+    def __init__(self,
+                 shards: int = 8,
+                 map_class=ArrayHashMap,
+                 capacity: int = 11,
+                 function=hash_function_1) -> None:
+        """
+        Initialize new empty ShardedHashMap with the given number of map_class shards
+
+        capacity is split evenly between the shards. function can be a hash function or the
+        name of one in the hash_functions registry (every shard uses the same one)
+        """
+        if shards < 1:
+            raise ValueError("a ShardedHashMap needs at least one shard")
+        self._hash_function = get_hash_function(function)
+        self._shards = [map_class(max(1, capacity // shards), self._hash_function) for _ in range(shards)]
+        # bumped by every write, so iterators can tell the map changed under them
+        self._version = 0
+
+    @classmethod
+    def build(cls,
+              pairs,
+              shards: int = 8,
+              processes: int = None,
+              map_class=ArrayHashMap,
+              function=hash_function_1,
+              chunk_size: int = None) -> "ShardedHashMap":
+        """
+        Returns a new ShardedHashMap holding every (key, value) pair, with the shards built in parallel
+
+        Notes: pairs can be a DynamicArray or any iterable. processes defaults to the number of CPUs; with 1 everything runs in this process (no pool). chunk_size defaults to enough pairs for four chunks per process
+        """
+        sharded = cls(shards, map_class, function=function)
+        function = sharded._hash_function
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes > 1:
+            require_stable_hash(function)
+
+        pairs = to_list(pairs)
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(pairs) // (processes * 4)))
+        chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+
+        if processes == 1:
+            partitions = [_partition(chunk, shards, function) for chunk in chunks]
+            sharded._shards = [_build_shard(map_class, function, [parts[i] for parts in partitions])
+                               for i in range(shards)]
+            return sharded
+
+        with ProcessPoolExecutor(processes) as pool:
+            # round 1: hash and split the chunks, round 2: one shard per task
+            partitions = list(pool.map(_partition, chunks, repeat(shards), repeat(function)))
+            shard_parts = [[parts[i] for parts in partitions] for i in range(shards)]
+            del partitions
+            sharded._shards = list(pool.map(_build_shard, repeat(map_class), repeat(function), shard_parts))
+        return sharded
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return '\n'.join(f'shard {i}: {shard.get_size()} entries / {shard.get_capacity()} slots'
+                         for i, shard in enumerate(self._shards))
+
+    def _shard(self, hash: int):
+        """
+        Returns the shard a key with this (un-modded) hash belongs to
+        """
+        return self._shards[_shard_index(hash, len(self._shards))]
+
+    def _group(self, keys: list) -> tuple:
+        """
+        Returns (hashes, groups): the hash of every key, and for every shard the positions of its keys, in order
+        """
+        hashes = hash_batch(self._hash_function, keys)
+        shards = len(self._shards)
+        groups = [[] for _ in range(shards)]
+        for position, hash in enumerate(hashes):
+            groups[_shard_index(hash, shards)].append(position)
+        return hashes, groups
+
+    def get_size(self) -> int:
+        """
+        Return size of map (all shards together)
+        """
+        return sum(shard.get_size() for shard in self._shards)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map (all shards together)
+        """
+        return sum(shard.get_capacity() for shard in self._shards)
+
+    def shard_sizes(self) -> DynamicArray:
+        """
+        Returns a dynamic array with the number of entries in each shard (to check the keys are spread evenly)
+        """
+        return DynamicArray([shard.get_size() for shard in self._shards])
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the key's shard, adding it if the key is not in the hash map
+        """
+        self._version += 1
+        hash = self._hash_function(key)
+        self._shard(hash)._put(key, value, hash)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key. If the key is not in the hash map, the method returns None
+        """
+        hash = self._hash_function(key)
+        return self._shard(hash)._get(key, hash)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise it returns False
+        """
+        return self.get(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map, doing nothing if the key is not present
+        """
+        self._version += 1
+        hash = self._hash_function(key)
+        self._shard(hash)._remove(key, hash)
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair into the hash map, same as calling put on each pair in order
+
+        Note: pairs can be a DynamicArray or any iterable. Each shard is sized once for its part of the batch and then filled without load checks
+        """
+        self._version += 1
+        pairs = to_list(pairs)
+        hashes, groups = self._group([pair[0] for pair in pairs])
+        for shard, group in zip(self._shards, groups):
+            if not group:
+                continue
+            shard.reserve(shard.get_size() + len(group))
+            insert = shard._insert
+            for position in group:
+                key, value = pairs[position]
+                insert(key, value, hashes[position])
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of each given key (None for missing keys), in the same order as the keys
+
+        Note: keys can be a DynamicArray or any iterable. Lookups are done shard by shard
+        """
+        keys = to_list(keys)
+        hashes, groups = self._group(keys)
+        values = [None] * len(keys)
+        for shard, group in zip(self._shards, groups):
+            get = shard._get
+            for position in group:
+                values[position] = get(keys[position], hashes[position])
+        return DynamicArray(values)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key that is in the hash map
+
+        Note: keys can be a DynamicArray or any iterable
+        """
+        self._version += 1
+        keys = to_list(keys)
+        hashes, groups = self._group(keys)
+        for shard, group in zip(self._shards, groups):
+            remove = shard._remove
+            for position in group:
+                remove(keys[position], hashes[position])
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of (key, value) tuples for every entry, shard by shard
+        """
+        return DynamicArray(list(self._pairs()))
+
+    def keys(self) -> KeysView:
+        """
+        Returns a live view of the keys in the hash map
+        """
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """
+        Returns a live view of the values in the hash map
+        """
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """
+        Returns a live view of the (key, value) pairs in the hash map
+        """
+        return ItemsView(self)
+
+    def _pairs(self):
+        """
+        Returns a generator of (key, value) for every entry, shard by shard
+        """
+        return chain.from_iterable(shard._pairs() for shard in self._shards)
+
+    def clear(self) -> None:
+        """
+        Clears every shard without changing its capacity
+        """
+        self._version += 1
+        for shard in self._shards:
+            shard.clear()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nbuild example (4 shards, 2 processes)")
+    print("-------------------------------------")
+    m = ShardedHashMap.build([('str' + str(i), i * 100) for i in range(1000)], shards=4, processes=2)
+    print(m.get_size(), m.get('str0'), m.get('str999'), m.get('str1000'))
+    print(m.shard_sizes())
+
+    print("\nput / remove example")
+    print("--------------------")
+    m.put('str1000', 'new')
+    m.remove('str0')
+    print(m.get_size(), m.get('str0'), m.get('str1000'), m.contains_key('str1'))
+
+    print("\nbatch example")
+    print("-------------")
+    m.put_many([('key' + str(i), i) for i in range(10)])
+    print(m.get_many(['key3', 'str5', 'missing', 'key9']))
+    m.remove_many(['key' + str(i) for i in range(5)])
+    print(m.get_size(), sorted(m.keys())[:5])
+
+    print("\nchaining shards example")
+    print("-----------------------")
+    import hash_map_sc
+    m = ShardedHashMap.build([(str(i), i) for i in range(100)], shards=3, processes=1,
+                             map_class=hash_map_sc.HashMap, function='murmur64')
+    print(m)
+    print(len(m.items()), ('42', 42) in m.items())
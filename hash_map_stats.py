@@ -0,0 +1,272 @@
+# Description: Diagnostics shared by the HashMaps - helpers for the analyze() reports and
+#              the opt-in operation counters (stats mode)
+
+# <-- Notes -->
+# A collision is a key whose home bucket (hash % capacity) already holds an earlier key, so for
+# n keys spread over m buckets:
+#
+#       observed collisions = n - (number of distinct home buckets)
+#       expected collisions = n - m * (1 - (1 - 1/m)^n)        (if the hash spread keys uniformly)
+#
+# Comparing the two shows whether slow lookups come from the hash function (observed far above
+# expected) or simply from a high load factor (both high).
+
+import time
+
+
+def expected_collisions(size: int, capacity: int) -> float:
+    """
+    Returns the expected number of collisions for size keys hashed uniformly into capacity buckets
+    """
+    if size == 0 or capacity == 0:
+        return 0.0
+    return size - capacity * (1 - (1 - 1 / capacity) ** size)
+
+
+def collision_rates(size: int, capacity: int, homes: int) -> tuple:
+    """
+    Returns (expected, observed) collisions per key, given how many distinct home buckets the keys use
+    """
+    if size == 0:
+        return 0.0, 0.0
+    return expected_collisions(size, capacity) / size, (size - homes) / size
+
+
+def histogram_mean(histogram: dict) -> float:
+    """
+    Returns the mean of a {value: count} histogram (0.0 when it is empty)
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return 0.0
+    return sum(value * count for value, count in histogram.items()) / total
+
+
+def sorted_histogram(histogram: dict) -> dict:
+    """
+    Returns the histogram with its values in increasing order
+    """
+    return dict(sorted(histogram.items()))
+
+
+# ------------------- OPERATION COUNTERS (STATS MODE) ---------------------- #
+
+# <-- Notes -->
+# Stats mode is opt in: enable_stats stores instrumented versions of _get, _insert, _remove,
+# _upsert and resize_table on the map instance, where they shadow the class methods (put / get /
+# remove / the batch methods / increment, setdefault and update_with all go through those), and
+# disable_stats deletes them again.
+#
+# The probe steps come from the engines themselves. enable_stats also sets the map's _counting
+# flag, and while it is set every walk adds what it examined to the map's _steps counter: slots
+# (OA), chain nodes or sorted bucket comparisons (SC), control byte groups (SwissHashMap), slots
+# and stash entries (cuckoo). That includes the work a walk does besides finding the key: Robin
+# Hood displacement and backward shifts, cuckoo kicks, and the slots / nodes an incremental map
+# migrates during the operation. An instrumented method zeroes _steps, calls the real method and
+# records what it added up, so stats mode never walks a probe sequence a second time.
+#
+# With stats off the walks count nothing. The OA and cuckoo walks already know how far they got
+# from their own loop variables and only write that back behind "if self._counting", and the SC
+# maps only switch to the chains' counted_contains / counted_remove (which return the nodes they
+# examined) when it is set. DiskHashMap needs no flag: every page its walks read goes through its
+# page cache, so _steps is read off the cache's hit and miss counters.
+#
+# Whether an operation found its key is read off the result: a get that returned a value, a put
+# or upsert that left the size unchanged (the key was already there), a remove that shrank it.
+#
+# resizes counts every growth of the table. On the incremental maps that is every migration
+# started by _start_resize (as well as every resize_table call), and resize_time adds up the
+# allocation of the new table plus every _migrate step of the migration, spread over the
+# operations that did them, so it is the total work of the resize rather than the longest pause.
+
+
+class OperationStats:
+    """
+    Counters collected by a HashMap in stats mode
+    """
+
+    OPERATIONS = ('get', 'put', 'remove')
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Set all counters back to zero."""
+        # operation -> [calls, hits, misses, probe steps, max probe steps]
+        self._counters = {operation: [0, 0, 0, 0, 0] for operation in self.OPERATIONS}
+        self.resizes = 0
+        self.resize_time = 0.0
+
+    def record(self, operation: str, found: bool, steps: int) -> None:
+        """Count one operation, whether it found its key, and the probe/chain steps it took."""
+        counters = self._counters[operation]
+        counters[0] += 1
+        counters[1 if found else 2] += 1
+        counters[3] += steps
+        if steps > counters[4]:
+            counters[4] = steps
+
+    def snapshot(self) -> dict:
+        """Return a copy of the counters as a plain dictionary."""
+        out = {}
+        for operation, (calls, hits, misses, steps, max_steps) in self._counters.items():
+            out[operation] = {
+                'calls': calls,
+                'hits': hits,
+                'misses': misses,
+                'probe_steps': steps,
+                'max_probe_steps': max_steps,
+                'average_probe_steps': steps / calls if calls else 0.0,
+            }
+        out['resizes'] = self.resizes
+        out['resize_time'] = self.resize_time
+        return out
+
+
+# instance attributes that stats mode installs (_start_resize and _migrate only on the incremental maps)
+_INSTRUMENTED = ('_get', '_insert', '_remove', '_upsert', 'resize_table', '_start_resize', '_migrate', '_counting')
+
+
+def enable_stats(hash_map) -> OperationStats:
+    """
+    Switches a map into stats mode (if it isn't already) and returns its counters
+
+    Note: The probe steps of an operation are the ones its own walks added to the map's _steps (see the notes above)
+    """
+    if getattr(hash_map, '_stats', None) is not None:
+        return hash_map._stats
+
+    stats = OperationStats()
+    record = stats.record
+    get, insert, remove = hash_map._get, hash_map._insert, hash_map._remove
+    resize_table = hash_map.resize_table
+
+    def counted_get(key, hash):
+        hash_map._steps = 0
+        value = get(key, hash)
+        record('get', value is not None, hash_map._steps)
+        return value
+
+    def counted_insert(key, value, hash):
+        size = hash_map._size
+        hash_map._steps = 0
+        insert(key, value, hash)
+        record('put', hash_map._size == size, hash_map._steps)
+
+    def counted_remove(key, hash):
+        size = hash_map._size
+        hash_map._steps = 0
+        remove(key, hash)
+        record('remove', hash_map._size != size, hash_map._steps)
+
+    # increment / setdefault / update_with count as puts (maps without them skip this one)
+    upsert = getattr(hash_map, '_upsert', None)
+
+    def counted_upsert(key, hash, fn, default):
+        size = hash_map._size
+        hash_map._steps = 0
+        value = upsert(key, hash, fn, default)
+        record('put', hash_map._size == size, hash_map._steps)
+        return value
+
+    # True while resize_table runs, so the migration it finishes isn't timed twice
+    in_resize_table = [False]
+
+    def timed_resize_table(new_capacity):
+        in_resize_table[0] = True
+        start = time.perf_counter()
+        try:
+            resize_table(new_capacity)
+        finally:
+            in_resize_table[0] = False
+        stats.resize_time += time.perf_counter() - start
+        stats.resizes += 1
+
+    # the incremental maps grow without resize_table: a resize starts in _start_resize and its
+    # slots / buckets are moved a few at a time by _migrate during the following operations
+    start_resize = getattr(hash_map, '_start_resize', None)
+    migrate = getattr(hash_map, '_migrate', None)
+
+    def timed_start_resize(new_capacity):
+        # a same-capacity start is a compaction, which isn't a resize on the other maps either
+        grows = new_capacity != hash_map._capacity
+        start = time.perf_counter()
+        start_resize(new_capacity)
+        stats.resize_time += time.perf_counter() - start
+        if grows:
+            stats.resizes += 1
+
+    def timed_migrate(count):
+        if in_resize_table[0]:
+            return migrate(count)
+        start = time.perf_counter()
+        migrate(count)
+        stats.resize_time += time.perf_counter() - start
+
+    hash_map._get = counted_get
+    hash_map._insert = counted_insert
+    hash_map._remove = counted_remove
+    if upsert is not None:
+        hash_map._upsert = counted_upsert
+    hash_map.resize_table = timed_resize_table
+    if start_resize is not None and migrate is not None:
+        hash_map._start_resize = timed_start_resize
+        hash_map._migrate = timed_migrate
+    # the walks only count their steps while this is set (the class default is False)
+    hash_map._counting = True
+    hash_map._stats = stats
+    return stats
+
+
+def disable_stats(hash_map) -> None:
+    """
+    Switches a map back to the uninstrumented class methods
+    """
+    for name in _INSTRUMENTED:
+        hash_map.__dict__.pop(name, None)
+    hash_map._stats = None
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    from a6_include import hash_function_1
+    from hash_map_oa import HashMap, RobinHoodHashMap
+
+    print("\nstats example 1 (quadratic probing)")
+    print("-----------------------------------")
+    # hash_function_1 sums the letters: 'ab' and 'ba' both start at slot 8, 'ba' ends up in slot 9
+    m = HashMap(11, hash_function_1)
+    m.enable_stats()
+    m.put('ab', 1)
+    m.put('ba', 2)
+    # 'ca' starts at slot 9 and stops at the empty slot 10
+    print(m.get('ba'), m.get('ca'))
+    m.remove('ab')
+    # walks over the deleted slot 8 to the key in slot 9
+    m.put('ba', 3)
+    stats = m.get_stats()
+    for operation in ('get', 'put', 'remove'):
+        counters = stats[operation]
+        print(operation, counters['calls'], counters['hits'], counters['misses'], counters['probe_steps'], counters['max_probe_steps'])
+    print(stats['put']['probe_steps'] == 1 + 2 + 2, stats['get']['probe_steps'] == 2 + 2, stats['remove']['probe_steps'] == 1)
+
+    print("\nstats example 2 (Robin Hood shifts count as steps)")
+    print("--------------------------------------------------")
+    # homes: 'ab' / 'ba' slot 8, 'ca' slot 9, 'ad' / 'bc' slot 10
+    m = RobinHoodHashMap(11, hash_function_1)
+    for key in ('ab', 'ba', 'ad', 'bc'):
+        m.put(key, key)
+    m.enable_stats()
+    # 'ca' walks 9 - 10 and takes slot 10 from 'ad', which moves on over slot 0 to slot 1
+    m.put('ca', 'ca')
+    print(m.get_stats()['put']['probe_steps'], m.get_stats()['put']['probe_steps'] == 2 + 2)
+    # finding 'ab' takes 1 slot, then 'ba', 'ca', 'bc' and 'ad' shift back (across the end of the
+    # table) until slot 2, which is empty
+    m.remove('ab')
+    print(m.get_stats()['remove']['probe_steps'], m.get_stats()['remove']['probe_steps'] == 1 + 5)
+    print(m.get_keys_and_values())
+    m.disable_stats()
+    print(m.get_stats())
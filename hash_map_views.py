@@ -0,0 +1,176 @@
+# Description: Lazy views shared by the HashMaps - keys(), values() and items() that walk the
+#              table on demand, and the iterator behind them and behind iter(map)
+
+# <-- Notes -->
+# A view holds nothing but a reference to its map, so m.items() costs O(1) memory however big
+# the map is (get_keys_and_values builds a DynamicArray with one tuple per entry instead).
+# Every iter() on a view (or on an open addressing / cuckoo map) returns a new MapIterator with
+# its own cursor, so nested loops and several scans at once don't get in each other's way.
+#
+# Each map keeps a version counter that put / remove / clear / resize_table (and the batch
+# methods) bump. An iterator remembers the version it started at and raises RuntimeError on
+# its next step if the map has been written to since, instead of skipping or repeating entries
+# after a resize moved them:
+#
+#       for key in m.keys():
+#           m.remove(key)       -->    RuntimeError: hash map changed during iteration
+#
+# The maps provide the walk itself: _pairs() returns a generator of (key, value) pairs for
+# the live entries, in table order.
+
+
+class MapIterator:
+    """
+    Iterator over a hash map that stops with RuntimeError once the map is written to
+    """
+
+    def __init__(self, hash_map, entries) -> None:
+        """
+        Wrap the entries generator of hash_map, starting at the map's current version
+        """
+        self._map = hash_map
+        self._version = hash_map._version
+        self._entries = entries
+
+    def __iter__(self) -> "MapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Check the map is unchanged, then obtain the next entry."""
+        if self._map._version != self._version:
+            raise RuntimeError("hash map changed during iteration")
+        return next(self._entries)
+
+
+class KeysView:
+    """
+    Live view of the keys of a hash map
+    """
+
+    def __init__(self, hash_map) -> None:
+        """Initialize a view of hash_map."""
+        self._map = hash_map
+
+    def __len__(self) -> int:
+        """Return the number of entries in the map."""
+        return self._map.get_size()
+
+    def __contains__(self, key: str) -> bool:
+        """Return True if the key is in the map (a hash lookup, not a scan)."""
+        return self._map.contains_key(key)
+
+    def __iter__(self) -> MapIterator:
+        """Return a new iterator over the keys."""
+        return MapIterator(self._map, (key for key, _ in self._map._pairs()))
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'keys(' + str(list(self)) + ')'
+
+
+class ValuesView:
+    """
+    Live view of the values of a hash map
+    """
+
+    def __init__(self, hash_map) -> None:
+        """Initialize a view of hash_map."""
+        self._map = hash_map
+
+    def __len__(self) -> int:
+        """Return the number of entries in the map."""
+        return self._map.get_size()
+
+    def __contains__(self, value: object) -> bool:
+        """Return True if some entry has this value (values aren't hashed, so this is a scan)."""
+        return any(item == value for item in self)
+
+    def __iter__(self) -> MapIterator:
+        """Return a new iterator over the values."""
+        return MapIterator(self._map, (value for _, value in self._map._pairs()))
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'values(' + str(list(self)) + ')'
+
+
+class ItemsView:
+    """
+    Live view of the (key, value) pairs of a hash map
+    """
+
+    def __init__(self, hash_map) -> None:
+        """Initialize a view of hash_map."""
+        self._map = hash_map
+
+    def __len__(self) -> int:
+        """Return the number of entries in the map."""
+        return self._map.get_size()
+
+    def __contains__(self, item: tuple) -> bool:
+        """Return True if the map holds the key with this value (a hash lookup, not a scan)."""
+        key, value = item
+        return self._map.contains_key(key) and self._map.get(key) == value
+
+    def __iter__(self) -> MapIterator:
+        """Return a new iterator over the (key, value) pairs."""
+        return MapIterator(self._map, self._map._pairs())
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'items(' + str(list(self)) + ')'
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    import hash_map_cuckoo
+    import hash_map_oa
+    import hash_map_sc
+    from a6_include import hash_function_1
+
+    maps = (hash_map_oa.HashMap(11, hash_function_1), hash_map_sc.HashMap(11, hash_function_1),
+            hash_map_cuckoo.HashMap(11))
+
+    print("\nviews example 1 (len and in)")
+    print("----------------------------")
+    for m in maps:
+        for key in ('ab', 'ba', 'c'):
+            m.put(key, key.upper())
+        keys, values, items = m.keys(), m.values(), m.items()
+        print(len(keys), len(values), len(items),
+              'ab' in keys, 'zz' in keys, 'BA' in values, 'ba' in values,
+              ('c', 'C') in items, ('c', 'X') in items, ('zz', None) in items)
+        # views are live: they see writes made after they were created
+        m.put('d', 'D')
+        print(len(keys), 'd' in keys, sorted(keys), sorted(values))
+
+    print("\nviews example 2 (independent iterators)")
+    print("---------------------------------------")
+    for m in maps:
+        # a nested loop over the same view walks every pair of keys
+        pairs = [(first, second) for first in m.keys() for second in m.keys()]
+        # two iterators advanced in turn don't share a cursor
+        first, second = iter(m.items()), iter(m.items())
+        steps = [next(first), next(first), next(second)]
+        print(len(pairs) == m.get_size() ** 2, steps[2] == steps[0], steps[1] != steps[0],
+              len(list(first)) == m.get_size() - 2, len(list(second)) == m.get_size() - 1)
+
+    print("\nviews example 3 (writes during iteration)")
+    print("-----------------------------------------")
+    for m in maps:
+        raised = []
+        for write in (lambda: m.put('e', 'E'), lambda: m.remove('e'), lambda: m.put('ab', 'new'), m.clear):
+            iterator = iter(m.keys())
+            next(iterator)
+            write()
+            try:
+                next(iterator)
+                raised.append(False)
+            except RuntimeError:
+                raised.append(True)
+        # a new iterator after the writes is fine
+        m.put('f', 'F')
+        print(raised, list(m.keys()), m.get_size())
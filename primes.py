@@ -0,0 +1,153 @@
+# Description: Prime capacities for the HashMaps - a precomputed growth ladder
+#              plus a fast primality test for arbitrary capacities
+
+# <-- Notes -->
+# Both HashMaps need prime capacities. Searching for the next prime with trial division at
+# every construction and every resize adds up when lots of small maps are created, so:
+#
+#   * automatic growth and reserve() pick from PRIME_CAPACITIES, a fixed ladder of primes that
+#     roughly double (each one sits about halfway between two powers of two, as far from both as possible)
+#   * any other capacity (user supplied, or past the end of the ladder) goes through next_prime,
+#     which answers small numbers from a lookup table and uses deterministic Miller-Rabin above that
+#
+#       ladder:  ... 53 -> 97 -> 193 -> 389 -> 769 -> 1543 ...
+#
+# The power of two maps (Pow2HashMap) skip primes altogether and simply double, see
+# next_power_of_two at the bottom.
+
+
+PRIME_CAPACITIES = (
+    3, 5, 11, 23, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593,
+    49157, 98317, 196613, 393241, 786433, 1572869, 3145739, 6291469,
+    12582917, 25165843, 50331653, 100663319, 201326611, 402653189,
+    805306457, 1610612741, 3221225473, 6442450939
+)
+
+# numbers below this are answered from the sieve table
+_SMALL_LIMIT = 1 << 12
+
+# Miller-Rabin with these bases is exact for every n < 3.3 * 10^24
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _sieve(limit: int) -> bytearray:
+    """
+    Return a table where entry n is 1 if n is prime (sieve of Eratosthenes)
+    """
+    table = bytearray([1]) * limit
+    table[0] = table[1] = 0
+    for n in range(2, int(limit ** 0.5) + 1):
+        if table[n]:
+            table[n * n::n] = bytes(len(range(n * n, limit, n)))
+    return table
+
+
+_SMALL_PRIMES = _sieve(_SMALL_LIMIT)
+
+
+def is_prime(n: int) -> bool:
+    """
+    Determine if given integer is a prime number (deterministic Miller-Rabin)
+    """
+    if n < _SMALL_LIMIT:
+        return n >= 0 and _SMALL_PRIMES[n] == 1
+
+    # n - 1 = d * 2^r with d odd
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def next_prime(n: int) -> int:
+    """
+    Increment from given number to find the closest prime number
+
+    Note: Same results as the HashMaps' original _next_prime (odd numbers only, so 2 gives 3)
+    """
+    if n % 2 == 0:
+        n += 1
+    while not is_prime(n):
+        n += 2
+    return n
+
+
+def ladder_capacity(n: int) -> int:
+    """
+    Return the smallest capacity on the ladder that is at least n (or the next prime past the ladder)
+    """
+    for capacity in PRIME_CAPACITIES:
+        if capacity >= n:
+            return capacity
+    return next_prime(n)
+
+
+def grow_capacity(capacity: int) -> int:
+    """
+    Return the capacity a full table grows to: the next ladder rung, which is roughly double
+
+    Note: The rung must be at least 1.5x the current capacity, so a capacity just below a rung (from a user supplied size) still grows about twofold
+    """
+    return ladder_capacity(capacity + capacity // 2)
+
+
+def is_power_of_two(n: int) -> bool:
+    """
+    Determine if given integer is a power of two
+    """
+    return n > 0 and n & (n - 1) == 0
+
+
+def next_power_of_two(n: int) -> int:
+    """
+    Return the smallest power of two that is at least n (1 for n below 1)
+    """
+    if n <= 1:
+        return 1
+    return 1 << (n - 1).bit_length()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nis_prime example 1")
+    print("------------------")
+    # below _SMALL_LIMIT from the sieve table, above it with Miller-Rabin (3215031751 fools bases
+    # 2, 3, 5 and 7 but not the full witness list)
+    print([n for n in range(-2, 30) if is_prime(n)])
+    print(is_prime(4093), is_prime(4095), is_prime(4097), is_prime(6442450939), is_prime(2 ** 61 - 1), is_prime(3215031751))
+
+    print("\nnext_prime example 1")
+    print("--------------------")
+    print([next_prime(n) for n in (0, 1, 2, 3, 4, 24, 90, 4094, 100000)])
+
+    print("\nladder example 1")
+    print("----------------")
+    # every rung roughly doubles and is at least 1.5x the one before
+    print(all(PRIME_CAPACITIES[i + 1] >= PRIME_CAPACITIES[i] * 3 // 2 for i in range(len(PRIME_CAPACITIES) - 1)))
+    print(all(is_prime(capacity) for capacity in PRIME_CAPACITIES))
+    print([ladder_capacity(n) for n in (1, 3, 4, 53, 54, 6442450939, 6442450940)])
+
+    print("\ngrow_capacity example 1")
+    print("-----------------------")
+    # a capacity just below a rung (like 89) skips it, so growth is still about twofold
+    for capacity in (3, 11, 53, 89, 97, 113, 1543):
+        print(capacity, '->', grow_capacity(capacity))
+
+    print("\npower of two example 1")
+    print("----------------------")
+    print([n for n in range(-1, 70) if is_power_of_two(n)])
+    print([next_power_of_two(n) for n in (-5, 0, 1, 2, 3, 16, 17, 1000)])